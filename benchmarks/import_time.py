@@ -0,0 +1,75 @@
+"""Import time benchmark for the options package.
+
+Every run imports options.options in a fresh interpreter, so nothing is shared through sys.modules, and fails if the
+median wall time goes over the budget or if any of the heavy modules that must only load lazily were imported.
+
+    python benchmarks/import_time.py --runs 10 --budget 0.75
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Seconds allowed for `import options.options` on a warm filesystem cache
+IMPORT_BUDGET_SECONDS = 0.75
+
+# Modules that importing options.options must not pull in
+LAZY_MODULES = ['pandas', 'pandas_market_calendars', 'scipy.stats']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [name for name in {lazy_modules!r} if name in sys.modules]}}))
+"""
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_import(module: str = 'options.options', runs: int = 10) -> dict:
+    """Imports a module in `runs` fresh interpreters and reports the timings and any lazily loaded modules that leaked in"""
+
+    probe = PROBE.format(module=module, lazy_modules=LAZY_MODULES)
+    timings = []
+    loaded = set()
+
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', probe], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['elapsed'])
+        loaded.update(result['loaded'])
+
+    return {
+        'module': module,
+        'runs': runs,
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'loaded_lazy_modules': sorted(loaded),
+    }
+
+def main() -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='options.options')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_SECONDS, help='Maximum median import time in seconds')
+    args = parser.parse_args()
+
+    report = measure_import(module=args.module, runs=args.runs)
+    print(json.dumps(report, indent=2))
+
+    failed = False
+    if report['median'] > args.budget:
+        print(f"FAIL: median import time {report['median']:.3f}s is over the {args.budget:.3f}s budget")
+        failed = True
+    if report['loaded_lazy_modules']:
+        print(f"FAIL: importing {args.module} eagerly loaded {', '.join(report['loaded_lazy_modules'])}")
+        failed = True
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
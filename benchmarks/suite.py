@@ -0,0 +1,289 @@
+"""Throughput and peak memory benchmarks for pricing, greeks, time to expiry, volatility estimators and strategies.
+
+Every case runs at each size from 1 up to 1M contracts (or bars), capped per case where the code under test builds one
+Python object per contract. A case is timed as the best of several repeats and its peak memory is measured in a separate,
+untimed call under tracemalloc. Results are compared against a stored baseline and the run fails if any case lost more
+than the allowed share of its throughput or grew its peak memory beyond the allowed share.
+
+    python benchmarks/suite.py                          # run and compare against benchmarks/baseline.json
+    python benchmarks/suite.py --max-size 1000          # quick run on the small sizes only
+    python benchmarks/suite.py --case greeks            # only the cases whose name contains "greeks"
+    python benchmarks/suite.py --update-baseline        # record this machine's numbers as the new baseline
+
+Baselines are machine specific, so record one on the machine the comparisons run on.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from datetime import date, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from options.enums import OptionExerciseType, TradeSide
+from options.funcs import time_to_expiry, time_to_expiry_vectorized
+from options.models import greeks
+from options.models import volatility
+from options.models.pricing_models import black_scholes_call_price
+from options.options import CallOption, PutOption
+from options.positions import Position, Strategy
+from options.verticals import LongCallVerticalSpread
+
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'baseline.json')
+
+SIZES = [1, 1_000, 100_000, 1_000_000]
+
+# Share of baseline throughput a case may lose, and share of baseline peak memory it may gain, before the run fails. Timings
+# of the small sizes swing by a third between runs on shared machines, so the throughput tolerance only catches real
+# slowdowns; tighten it with --throughput-tolerance on dedicated hardware.
+THROUGHPUT_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+
+# Each case is repeated until this much time has been spent on it, and at least MIN_REPEATS times
+MIN_TIME_SECONDS = 0.2
+MIN_REPEATS = 3
+
+START_DATE = date(2024, 1, 2)
+
+class BenchmarkCase(NamedTuple):
+    """A named workload. setup(n) builds the inputs for n contracts outside of the timed region and returns the call to time."""
+
+    name: str
+    setup: Callable[[int], Callable[[], object]]
+    max_size: int = SIZES[-1]
+
+def _market(n: int, seed: int = 0) -> Dict[str, np.ndarray]:
+
+    rng = np.random.default_rng(seed)
+    return {
+        'S': rng.uniform(80, 120, n),
+        'K': rng.uniform(80, 120, n),
+        'sigma': rng.uniform(0.1, 0.6, n),
+        'r': 0.05,
+        'T': rng.uniform(0.05, 2.0, n),
+        'q': 0.01,
+    }
+
+def _ohlc_bars(n: int, seed: int = 0) -> pd.DataFrame:
+
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal(n)))
+    open_ = close * np.exp(0.002 * rng.standard_normal(n))
+    high = np.maximum(open_, close) * np.exp(np.abs(0.005 * rng.standard_normal(n)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(0.005 * rng.standard_normal(n)))
+
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close})
+
+def _expiries(n: int, seed: int = 0) -> List[date]:
+
+    rng = np.random.default_rng(seed)
+    return [START_DATE + timedelta(days=int(days)) for days in rng.integers(1, 730, n)]
+
+def _positions(n: int, seed: int = 0) -> List[Position]:
+
+    rng = np.random.default_rng(seed)
+    positions = []
+    for strike, days, is_call, is_long in zip(rng.uniform(80, 120, n), rng.integers(1, 730, n), rng.random(n) < 0.5, rng.random(n) < 0.5):
+        option_type = CallOption if is_call else PutOption
+        option = option_type(underlying='SPY', strike=float(strike), exercise_type=OptionExerciseType.EUROPEAN, expiry_date=START_DATE + timedelta(days=int(days)))
+        positions.append(Position(side=TradeSide.LONG if is_long else TradeSide.SHORT, quantity=1, option=option, cost=1.0))
+
+    return positions
+
+def _black_scholes_call_price(n: int):
+    m = _market(n)
+    return lambda: black_scholes_call_price(m['S'], m['K'], m['sigma'], m['r'], m['T'], m['q'])
+
+def _greek(name: str, with_option_type: bool):
+
+    function = getattr(greeks, name)
+
+    def setup(n: int):
+        m = _market(n)
+        if with_option_type:
+            return lambda: function('call', m['S'], m['K'], m['sigma'], m['r'], m['T'], m['q'])
+        return lambda: function(m['S'], m['K'], m['sigma'], m['r'], m['T'], m['q'])
+
+    return setup
+
+def _time_to_expiry(n: int):
+    expiries = _expiries(n)
+    time_to_expiry(expiries[0], START_DATE)
+    return lambda: [time_to_expiry(expiry, START_DATE) for expiry in expiries]
+
+def _time_to_expiry_vectorized(n: int):
+    expiries = np.array(_expiries(n), dtype='datetime64[D]')
+    time_to_expiry_vectorized(expiries[:1], START_DATE)
+    return lambda: time_to_expiry_vectorized(expiries, START_DATE)
+
+def _volatility(name: str):
+
+    function = getattr(volatility, name)
+
+    def setup(n: int):
+        bars = _ohlc_bars(n)
+        return lambda: function(bars, trading_days=252, rolling_period=30)
+
+    return setup
+
+def _strategy_profits_at_expiry(n: int):
+    strategy = Strategy(_positions(n))
+    prices = np.linspace(50, 150, 101)
+    return lambda: strategy.profits_at_expiry(prices)
+
+def _vertical_spread_construction(n: int):
+    strikes = np.random.default_rng(0).uniform(80, 120, n)
+    expiry = START_DATE + timedelta(days=30)
+    return lambda: [LongCallVerticalSpread('SPY', expiry, float(strike), float(strike) + 5) for strike in strikes]
+
+CASES = [
+    BenchmarkCase('black_scholes_call_price', _black_scholes_call_price),
+    BenchmarkCase('greeks.delta_bs', _greek('delta_bs', True)),
+    BenchmarkCase('greeks.gamma_bs', _greek('gamma_bs', False)),
+    BenchmarkCase('greeks.theta_bs', _greek('theta_bs', True)),
+    BenchmarkCase('greeks.vega_bs', _greek('vega_bs', False)),
+    BenchmarkCase('greeks.rho_bs', _greek('rho_bs', True)),
+    BenchmarkCase('time_to_expiry', _time_to_expiry, max_size=100_000),
+    BenchmarkCase('time_to_expiry_vectorized', _time_to_expiry_vectorized),
+    BenchmarkCase('volatility.garman_klass_vol', _volatility('garman_klass_vol')),
+    BenchmarkCase('volatility.parkinson_vol', _volatility('parkinson_vol')),
+    BenchmarkCase('volatility.roger_satchell_vol', _volatility('roger_satchell_vol')),
+    BenchmarkCase('volatility.close_to_close_vol', _volatility('close_to_close_vol')),
+    BenchmarkCase('volatility.yang_zhang_vol', _volatility('yang_zhang_vol')),
+    BenchmarkCase('Strategy.profits_at_expiry', _strategy_profits_at_expiry, max_size=100_000),
+    BenchmarkCase('VerticalSpread construction', _vertical_spread_construction, max_size=100_000),
+]
+
+def measure(run: Callable[[], object], n: int) -> Dict[str, float]:
+    """Best time per call, throughput in contracts per second and peak traced memory of one call"""
+
+    run()
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MIN_REPEATS or time.perf_counter() - started < MIN_TIME_SECONDS:
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'seconds': best,
+        'throughput': n / best,
+        'peak_memory': peak_memory,
+        'repeats': len(timings),
+    }
+
+def run_case(case: BenchmarkCase, max_size: int = SIZES[-1]) -> Dict[str, Dict[str, float]]:
+    """Runs one case at every size up to max_size in this process. Returns results keyed by size."""
+
+    return {str(n): measure(case.setup(n), n) for n in SIZES if n <= min(max_size, case.max_size)}
+
+def run_suite(max_size: int = SIZES[-1], case_filter: str = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Runs every selected case, each in a fresh interpreter so no case inherits the allocator state or warm caches left
+    behind by the ones before it and results do not depend on which cases were selected. Returns results keyed by case
+    name, then by size.
+    """
+
+    results = {}
+    for case in CASES:
+        if case_filter is not None and case_filter not in case.name:
+            continue
+
+        command = [sys.executable, os.path.abspath(__file__), '--worker', case.name, '--max-size', str(max_size)]
+        output = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+        results[case.name] = json.loads(output.strip().splitlines()[-1])
+
+        for n, result in results[case.name].items():
+            print(f"{case.name:<32} {int(n):>9,} {result['throughput']:>16,.0f}/s {result['peak_memory'] / 2**20:>10.2f} MB", flush=True)
+
+    return results
+
+def compare(results: Dict, baseline: Dict, throughput_tolerance: float = THROUGHPUT_TOLERANCE, memory_tolerance: float = MEMORY_TOLERANCE) -> List[str]:
+    """Lists every case and size that regressed against the baseline. Cases missing from the baseline are not compared."""
+
+    regressions = []
+    for name, sizes in results.items():
+        for n, result in sizes.items():
+            reference = baseline.get(name, {}).get(n)
+            if reference is None:
+                continue
+
+            if result['throughput'] < reference['throughput'] * (1 - throughput_tolerance):
+                regressions.append(f"{name} at {n}: throughput {result['throughput']:,.0f}/s against a baseline of {reference['throughput']:,.0f}/s")
+
+            # A few KB of allocator noise would otherwise fail the single contract cases
+            if result['peak_memory'] > reference['peak_memory'] * (1 + memory_tolerance) + 64 * 1024:
+                regressions.append(f"{name} at {n}: peak memory {result['peak_memory']:,} bytes against a baseline of {reference['peak_memory']:,} bytes")
+
+    return regressions
+
+def main() -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-size', type=int, default=SIZES[-1], help='Largest number of contracts to run')
+    parser.add_argument('--case', default=None, help='Only run the cases whose name contains this string')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results to the baseline instead of comparing')
+    parser.add_argument('--throughput-tolerance', type=float, default=THROUGHPUT_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--output', default=None, help='Also write the results as JSON to this path')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        case = next(case for case in CASES if case.name == args.worker)
+        print(json.dumps(run_case(case, max_size=args.max_size)))
+        return 0
+
+    results = run_suite(max_size=args.max_size, case_filter=args.case)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to record one")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+    regressions = compare(results, baseline, args.throughput_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"FAIL: {regression}")
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
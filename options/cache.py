@@ -0,0 +1,223 @@
+import functools
+import threading
+import numpy as np
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Dict, Hashable, Iterable, Iterator, Set, Tuple, Union
+
+class PricingCache:
+    """Bounded LRU cache of model prices and greeks keyed on the contract and the quantized market state. Market inputs
+    are rounded to a multiple of `quantum` before being used in the key, so inputs that differ by float noise share an entry.
+    Whole batches, such as the greeks of every leg of a strategy, are cached as one entry keyed on all of their contracts.
+    """
+
+    def __init__(self, maxsize: int = 100_000, quantum: float = 1e-8) -> None:
+
+        assert maxsize >= 1, "The cache has to hold at least one entry"
+        assert quantum > 0, "The quantum has to be positive"
+
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+        self._entries: OrderedDict = OrderedDict()
+        self._keys_by_underlying: Dict[str, Set[Hashable]] = {}
+        self._underlyings_by_key: Dict[Hashable, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def _quantize(self, value) -> Hashable:
+        """A market input rounded to the quantum, with arrays reduced to their shape and the bytes of the rounded values"""
+
+        if np.ndim(value) == 0:
+            return int(round(value / self.quantum))
+
+        quantized = np.rint(np.asarray(value, dtype=float) / self.quantum).astype(np.int64)
+        return quantized.shape, quantized.tobytes()
+
+    def key(self, option, quantity: str, S: float, sigma: float, r: float, T: float, q: float) -> Hashable:
+        """Cache key of one priced quantity of one contract, for scalar or array market inputs"""
+
+        # Without an explicit T the price depends on today's date through the time to expiry
+        time_key = ('today', date.today().toordinal()) if T is None else self._quantize(T)
+
+        return (
+            option.underlying, option.strike, option.expiry_date, option.option_class, option.exercise_type, quantity,
+            self._quantize(S), self._quantize(sigma), self._quantize(r), time_key, self._quantize(q)
+        )
+
+    def batch_key(self, quantity: str, contracts: Iterable[np.ndarray], market: Iterable) -> Hashable:
+        """Cache key of a batched evaluation, from the raw bytes of the contract columns and the quantized market inputs"""
+
+        columns = (np.ascontiguousarray(column) for column in contracts)
+        contract_key = tuple((column.dtype.str, column.shape, column.tobytes()) for column in columns)
+        return ('batch', quantity, contract_key, tuple(self._quantize(value) for value in market))
+
+    def get_or_compute(self, key: Hashable, underlying: Union[str, Tuple[str, ...]], compute: Callable[[], float]) -> float:
+        """Looks key up and otherwise stores compute(). underlying may be a tuple of every underlying a batch entry depends
+        on, so invalidating any of them drops the entry. Array results are stored read only.
+        """
+
+        if key is None:
+            self.bypasses += 1
+            return compute()
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = _read_only(compute())
+        underlyings = underlying if isinstance(underlying, tuple) else (underlying,)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._underlyings_by_key[key] = underlyings
+            for name in underlyings:
+                self._keys_by_underlying.setdefault(name, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                evicted_key, _ = self._entries.popitem(last=False)
+                for name in self._underlyings_by_key.pop(evicted_key):
+                    self._keys_by_underlying[name].discard(evicted_key)
+                self.evictions += 1
+
+        return value
+
+    def invalidate(self, underlying: str = None) -> int:
+        """Drops the entries of one underlying, for instance when its market data updates, or every entry if no underlying
+        is given. Returns the number of entries dropped.
+        """
+
+        with self._lock:
+            if underlying is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self._keys_by_underlying.clear()
+                self._underlyings_by_key.clear()
+                return dropped
+
+            keys = self._keys_by_underlying.pop(underlying, set())
+            for key in keys:
+                self._entries.pop(key, None)
+                for name in self._underlyings_by_key.pop(key, ()):
+                    if name != underlying:
+                        self._keys_by_underlying[name].discard(key)
+
+            return len(keys)
+
+    def stats(self) -> Dict[str, float]:
+
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'bypasses': self.bypasses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"PricingCache({len(self)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses)"
+
+def _read_only(value):
+    """Marks the arrays of a result read only, so a caller cannot change what later hits get back"""
+
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, tuple):
+        for item in value:
+            _read_only(item)
+
+    return value
+
+_active_cache: PricingCache = None
+
+def enable_pricing_cache(maxsize: int = 100_000, quantum: float = 1e-8) -> PricingCache:
+    """Turns on the shared pricing cache. It serves the price and greek methods of CallOption and PutOption for scalar and
+    array inputs, and so Position and positions.Strategy, VerticalSpread through its positions, OptionChain.model_greeks
+    and with it the greeks of strategy.Strategy, and the value and greeks of every MultiLegSpread. The engines themselves,
+    black_scholes_batch, SpreadBatch and risk_matrix, always compute.
+    """
+
+    global _active_cache
+    _active_cache = PricingCache(maxsize=maxsize, quantum=quantum)
+
+    return _active_cache
+
+def disable_pricing_cache() -> None:
+
+    global _active_cache
+    _active_cache = None
+
+def get_pricing_cache() -> PricingCache:
+    return _active_cache
+
+@contextmanager
+def pricing_cache(maxsize: int = 100_000, quantum: float = 1e-8) -> Iterator[PricingCache]:
+    """Enables a fresh pricing cache for the duration of a block, restoring whatever was active before"""
+
+    global _active_cache
+    previous = _active_cache
+    cache = PricingCache(maxsize=maxsize, quantum=quantum)
+    _active_cache = cache
+
+    try:
+        yield cache
+    finally:
+        _active_cache = previous
+
+def cached_pricing(quantity: str):
+    """Decorator for the pricing methods of an option. When a pricing cache is enabled results are looked up in it and
+    otherwise the method runs untouched, so the cache costs nothing unless it is switched on.
+    """
+
+    def decorator(method):
+
+        @functools.wraps(method)
+        def wrapper(self, S, sigma, r, T = None, q = 0):
+            # Every pricing method takes T as optional and measures it from today when left out
+            if T is None:
+                T = self.time_to_expiry(start_date=date.today())
+
+            cache = _active_cache
+            if cache is None:
+                return method(self, S, sigma, r, T, q)
+
+            key = cache.key(self, quantity, S, sigma, r, T, q)
+            return cache.get_or_compute(key, self.underlying, lambda: method(self, S, sigma, r, T, q))
+
+        return wrapper
+
+    return decorator
+
+def cached_batch(quantity: str, underlyings: Tuple[str, ...], contracts: Iterable[np.ndarray], market: Iterable, compute: Callable):
+    """Result of a batched evaluation through the active pricing cache, or compute() straight away when none is enabled
+
+    Args:
+        quantity (str): Name of what is computed, e.g. 'chain_greeks'
+        underlyings (Tuple[str, ...]): Underlyings the batch depends on, so invalidating any of them drops the entry
+        contracts (Iterable[np.ndarray]): Columns describing the contracts of the batch
+        market (Iterable): Market inputs, scalars or arrays
+        compute (Callable): Evaluates the batch
+
+    Returns:
+        The cached or freshly computed result
+    """
+
+    cache = _active_cache
+    if cache is None:
+        return compute()
+
+    return cache.get_or_compute(cache.batch_key(quantity, contracts, market), tuple(underlyings), compute)
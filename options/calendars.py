@@ -0,0 +1,93 @@
+import numpy as np
+
+from datetime import date
+from typing import Iterable, Union
+
+DateLike = Union[date, str, np.datetime64]
+
+class MarketCalendarBackend:
+    """Calendar backed by pandas_market_calendars. The package (and pandas with it) is only imported the first time
+    sessions are actually requested, so importing the options package stays cheap.
+    """
+
+    def __init__(self, name: str = "NYSE", calendar = None) -> None:
+        self.name = name
+        self._calendar = calendar
+
+    @property
+    def calendar(self):
+        if self._calendar is None:
+            import pandas_market_calendars as mcal
+            self._calendar = mcal.get_calendar(self.name)
+
+        return self._calendar
+
+    def sessions(self, start_date: DateLike, end_date: DateLike) -> np.ndarray:
+        """Session dates between the two dates inclusive as a sorted datetime64[D] array"""
+
+        start_date, end_date = str(np.datetime64(start_date, 'D')), str(np.datetime64(end_date, 'D'))
+
+        if hasattr(self.calendar, 'valid_days'):
+            days = self.calendar.valid_days(start_date=start_date, end_date=end_date)
+        else:
+            days = self.calendar.schedule(start_date=start_date, end_date=end_date).index
+
+        if getattr(days, 'tz', None) is not None:
+            days = days.tz_localize(None)
+
+        return np.asarray(days.values).astype('datetime64[D]')
+
+    def schedule(self, start_date: DateLike, end_date: DateLike):
+        return self.calendar.schedule(start_date=start_date, end_date=end_date)
+
+    def __repr__(self) -> str:
+        return f"MarketCalendarBackend({self.name!r})"
+
+class WeekdayCalendar:
+    """Lightweight numpy-only calendar where every weekday that is not an explicit holiday is a session. Useful for
+    short lived workers and scripts that cannot afford to import pandas.
+    """
+
+    def __init__(self, holidays: Iterable[DateLike] = (), name: str = "WEEKDAY") -> None:
+        self.name = name
+        self.holidays = np.asarray(list(holidays), dtype='datetime64[D]')
+
+    def sessions(self, start_date: DateLike, end_date: DateLike) -> np.ndarray:
+        """Session dates between the two dates inclusive as a sorted datetime64[D] array"""
+
+        days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        return days[np.is_busday(days, holidays=self.holidays)]
+
+    def __repr__(self) -> str:
+        return f"WeekdayCalendar({self.name!r}, {len(self.holidays)} holidays)"
+
+def as_calendar_backend(calendar):
+    """Returns calendar itself if it is a backend with a sessions method, and otherwise wraps a pandas_market_calendars
+    style calendar, anything with valid_days or schedule, in a MarketCalendarBackend. Calendars from mcal.get_calendar, as
+    passed before the backends existed, keep working this way.
+    """
+
+    if hasattr(calendar, 'sessions'):
+        return calendar
+
+    if hasattr(calendar, 'valid_days') or hasattr(calendar, 'schedule'):
+        return MarketCalendarBackend(name=getattr(calendar, 'name', type(calendar).__name__), calendar=calendar)
+
+    raise TypeError(f"{type(calendar).__name__} is not a calendar, it needs a sessions, valid_days or schedule method")
+
+nyse_calendar = MarketCalendarBackend("NYSE")
+
+_default_calendar = nyse_calendar
+
+def get_default_calendar():
+    return _default_calendar
+
+def set_default_calendar(calendar) -> None:
+    """Sets the calendar used by time_to_expiry whenever no calendar is passed explicitly
+
+    Args:
+        calendar: Any object with a name attribute and a sessions(start_date, end_date) method
+    """
+
+    global _default_calendar
+    _default_calendar = calendar
@@ -0,0 +1,589 @@
+import json
+import numpy as np
+
+from datetime import date
+from typing import Dict, Iterator, List, Sequence, Union
+from options.cache import cached_batch
+from options.options import CallOption, PutOption
+from options.positions import Position
+from options.enums import OptionClass, OptionExerciseType, TradeSide
+from options.funcs import time_to_expiry, time_to_expiry_vectorized
+from options.models.batch import black_scholes_batch, BlackScholesBatch
+from options.models.pricing_models import bjerksund_stensland_2002_call, bjerksund_stensland_2002_put
+from options.models.finite_difference import crank_nicolson
+from options.models.lattice import LatticeResult, binomial_greeks
+
+ArrayLike = Union[float, np.ndarray]
+
+# Fixed width columns backing every OptionChain. One contract costs 39 bytes across these columns.
+CHAIN_DTYPES = {
+    'underlying_id': np.int32,
+    'strike': np.float64,
+    'expiry_ordinal': np.int32,
+    'option_class': np.int8,
+    'exercise_type': np.int8,
+    'side': np.int8,
+    'quantity': np.int32,
+    'cost': np.float64,
+    'transaction_cost': np.float64,
+}
+
+# Layout of a saved chain: the magic bytes, the header length as a little endian uint64, a JSON header, then every column
+# as raw little endian bytes, each starting on a BOOK_ALIGNMENT boundary so each one can be viewed straight out of a memory map
+BOOK_MAGIC = b'OPTBOOK1'
+BOOK_ALIGNMENT = 64
+
+def _aligned(offset: int) -> int:
+    return -(-offset // BOOK_ALIGNMENT) * BOOK_ALIGNMENT
+
+def model_batch(S: ArrayLike, K: ArrayLike, sigma: ArrayLike, r: ArrayLike, T: ArrayLike, q: ArrayLike, is_call: ArrayLike,
+                exercise_type: ArrayLike) -> BlackScholesBatch:
+    """Per contract price and greeks from the models the option classes use. European contracts go through
+    black_scholes_batch. American contracts are priced with Bjerksund-Stensland (2002) and take their greeks from
+    binomial_greeks, with one tree per distinct time to expiry. Every input broadcasts against the others.
+
+    Args:
+        S (ArrayLike): Underlying prices
+        K (ArrayLike): Strike prices
+        sigma (ArrayLike): Volatilities
+        r (ArrayLike): Risk free rates
+        T (ArrayLike): Times to expiry in years
+        q (ArrayLike): Continuous dividend yields
+        is_call (ArrayLike): Boolean flags, True for calls and False for puts
+        exercise_type (ArrayLike): OptionExerciseType values
+
+    Returns:
+        BlackScholesBatch: Price and greeks of each contract
+    """
+
+    S, K, sigma, r, T, q, is_call, exercise_type = np.broadcast_arrays(
+        np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(sigma, dtype=float), np.asarray(r, dtype=float),
+        np.asarray(T, dtype=float), np.asarray(q, dtype=float), np.asarray(is_call, dtype=bool), np.asarray(exercise_type)
+    )
+
+    american = exercise_type == OptionExerciseType.AMERICAN.value
+    unsupported = ~american & (exercise_type != OptionExerciseType.EUROPEAN.value)
+    if unsupported.any():
+        name = OptionExerciseType(int(exercise_type[unsupported].flat[0])).name.lower()
+        raise ValueError(f"{name} contracts have no batched model, only european and american ones do")
+
+    batch = black_scholes_batch(S=S, K=K, sigma=sigma, r=r, T=T, q=q, is_call=is_call)
+    if not american.any():
+        return batch
+
+    fields = batch._asdict()
+    for expiry in np.unique(T[american]):
+        rows = american & (T == expiry)
+        greeks = binomial_greeks(S=S[rows], K=K[rows], sigma=sigma[rows], r=r[rows], T=float(expiry), q=q[rows], is_call=is_call[rows])
+        for name in ('delta', 'gamma', 'vega', 'rho', 'theta'):
+            fields[name][rows] = getattr(greeks, name)
+
+    for call, pricer in ((True, bjerksund_stensland_2002_call), (False, bjerksund_stensland_2002_put)):
+        rows = american & (is_call == call)
+        if rows.any():
+            fields['price'][rows] = pricer(S=S[rows], K=K[rows], sigma=sigma[rows], r=r[rows], T=T[rows], q=q[rows])
+
+    return BlackScholesBatch(**fields)
+
+class OptionView:
+    """Lightweight, read only view onto one contract of an OptionChain that behaves like a CallOption or PutOption. Model
+    prices and greeks are evaluated by the chain's batched functions on this one row.
+    """
+
+    __slots__ = ('_chain', '_index')
+
+    def __init__(self, chain: 'OptionChain', index: int) -> None:
+        self._chain = chain
+        self._index = index
+
+    @property
+    def underlying(self) -> str:
+        return self._chain.underlyings[self._chain.underlying_id[self._index]]
+
+    @property
+    def strike(self) -> float:
+        return float(self._chain.strike[self._index])
+
+    @property
+    def expiry_date(self) -> date:
+        return date.fromordinal(int(self._chain.expiry_ordinal[self._index]))
+
+    @property
+    def option_class(self) -> OptionClass:
+        return OptionClass(int(self._chain.option_class[self._index]))
+
+    @property
+    def exercise_type(self) -> OptionExerciseType:
+        return OptionExerciseType(int(self._chain.exercise_type[self._index]))
+
+    def to_option(self) -> Union[CallOption, PutOption]:
+        option_type = CallOption if self.option_class == OptionClass.CALL else PutOption
+        return option_type(underlying=self.underlying, strike=self.strike, exercise_type=self.exercise_type, expiry_date=self.expiry_date)
+
+    def intrinsic_value(self, price: float) -> float:
+        return self.to_option().intrinsic_value(price=price)
+
+    def values_at_expiry(self, prices: np.array) -> np.array:
+        return self.to_option().values_at_expiry(prices=prices)
+
+    def time_to_expiry(self, start_date: date) -> float:
+        return time_to_expiry(expiry_date=self.expiry_date, start_date=start_date)
+
+    def _evaluate(self, name: str, S, sigma, r, T, q) -> Union[float, np.ndarray]:
+        """Evaluates this contract with the chain's batched models, repeating its row once per element of the broadcast
+        market inputs. Returns a float for scalar inputs and an array of their broadcast shape otherwise.
+        """
+
+        market = {'S': S, 'sigma': sigma, 'r': r, 'T': T, 'q': q}
+        shape = np.broadcast_shapes(*(np.shape(x) for x in market.values() if x is not None))
+        rows = self._chain[np.full(int(np.prod(shape)), self._index)]
+        flat = {key: None if x is None else np.broadcast_to(np.asarray(x, dtype=float), shape).ravel() for key, x in market.items()}
+
+        values = rows.prices(**flat) if name == 'price' else getattr(rows.model_greeks(**flat), name)
+        return float(values[0]) if shape == () else values.reshape(shape)
+
+    def black_scholes_price(self, S: float, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._evaluate('price', S, sigma, r, T, q)
+
+    def delta(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._evaluate('delta', S, sigma, r, T, q)
+
+    def gamma(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._evaluate('gamma', S, sigma, r, T, q)
+
+    def vega(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._evaluate('vega', S, sigma, r, T, q)
+
+    def rho(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._evaluate('rho', S, sigma, r, T, q)
+
+    def theta(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._evaluate('theta', S, sigma, r, T, q)
+
+    def __repr__(self) -> str:
+        return repr(self.to_option())
+
+class PositionView:
+    """Lightweight, read only view onto one row of an OptionChain that behaves like a Position. Values, profits and greeks
+    are signed by side and scaled by quantity, as the chain's own batched functions compute them.
+    """
+
+    __slots__ = ('_chain', '_index')
+
+    def __init__(self, chain: 'OptionChain', index: int) -> None:
+        self._chain = chain
+        self._index = index
+
+    @property
+    def option(self) -> OptionView:
+        return OptionView(self._chain, self._index)
+
+    @property
+    def underlying(self) -> str:
+        return self._chain.underlyings[self._chain.underlying_id[self._index]]
+
+    @property
+    def side(self) -> TradeSide:
+        return TradeSide(int(self._chain.side[self._index]))
+
+    @property
+    def quantity(self) -> int:
+        return int(self._chain.quantity[self._index])
+
+    @property
+    def cost(self) -> float:
+        return float(self._chain.cost[self._index])
+
+    @property
+    def transaction_cost(self) -> float:
+        return float(self._chain.transaction_cost[self._index])
+
+    @property
+    def _signed_quantity(self) -> float:
+        return float(self._chain.signed_quantity[self._index])
+
+    def to_position(self) -> Position:
+        return Position(side=self.side, quantity=self.quantity, option=self.option.to_option(), cost=self.cost, transaction_cost=self.transaction_cost)
+
+    def intrinsic_value(self, price: float) -> float:
+        return self._signed_quantity * self.option.intrinsic_value(price=price)
+
+    def values_at_expiry(self, prices: np.array) -> np.array:
+        return self._chain[self._index:self._index + 1].values_at_expiry(prices=prices)[0]
+
+    def profit_at_expiry(self, price: float) -> float:
+        return self.intrinsic_value(price=price) - self.side.value * self.cost - self.transaction_cost
+
+    def profits_at_expiry(self, prices: np.array) -> np.array:
+        return self._chain[self._index:self._index + 1].profits_at_expiry(prices=prices)
+
+    def black_scholes_value(self, S: float, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._signed_quantity * self.option.black_scholes_price(S, sigma, r, T, q)
+
+    def black_scholes_profit(self, S: float, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self.black_scholes_value(S, sigma, r, T, q) - self.side.value * self.cost
+
+    def delta(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._signed_quantity * self.option.delta(S, sigma, r, T, q)
+
+    def gamma(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._signed_quantity * self.option.gamma(S, sigma, r, T, q)
+
+    def vega(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._signed_quantity * self.option.vega(S, sigma, r, T, q)
+
+    def rho(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._signed_quantity * self.option.rho(S, sigma, r, T, q)
+
+    def theta(self, S, sigma: float, r: float, T: float = None, q: float = 0) -> float:
+        return self._signed_quantity * self.option.theta(S, sigma, r, T, q)
+
+    def __repr__(self) -> str:
+        return f"{self.side.name} {self.quantity} {self.option!r}"
+
+class OptionChain:
+    """Columnar container of option positions. Every field is held in one contiguous numpy array and underlyings are
+    interned, so a chain holds hundreds of thousands of contracts cheaply and chain-wide operations run vectorized.
+    Indexing with an integer returns a PositionView; indexing with a slice, mask or index array returns a new OptionChain.
+    """
+
+    def __init__(self, underlyings: Sequence[str], underlying_id: np.ndarray, strike: np.ndarray, expiry_ordinal: np.ndarray, option_class: np.ndarray,
+                 exercise_type: np.ndarray, side: np.ndarray, quantity: np.ndarray, cost: np.ndarray, transaction_cost: np.ndarray = None) -> None:
+
+        if transaction_cost is None:
+            transaction_cost = np.zeros(len(strike))
+
+        self.underlyings = list(underlyings)
+        self.underlying_id = np.ascontiguousarray(underlying_id, dtype=CHAIN_DTYPES['underlying_id'])
+        self.strike = np.ascontiguousarray(strike, dtype=CHAIN_DTYPES['strike'])
+        self.expiry_ordinal = np.ascontiguousarray(expiry_ordinal, dtype=CHAIN_DTYPES['expiry_ordinal'])
+        self.option_class = np.ascontiguousarray(option_class, dtype=CHAIN_DTYPES['option_class'])
+        self.exercise_type = np.ascontiguousarray(exercise_type, dtype=CHAIN_DTYPES['exercise_type'])
+        self.side = np.ascontiguousarray(side, dtype=CHAIN_DTYPES['side'])
+        self.quantity = np.ascontiguousarray(quantity, dtype=CHAIN_DTYPES['quantity'])
+        self.cost = np.ascontiguousarray(cost, dtype=CHAIN_DTYPES['cost'])
+        self.transaction_cost = np.ascontiguousarray(transaction_cost, dtype=CHAIN_DTYPES['transaction_cost'])
+
+        lengths = {len(self._column(name)) for name in CHAIN_DTYPES}
+        assert len(lengths) <= 1, "All of the chain columns must have the same length"
+
+    def _column(self, name: str) -> np.ndarray:
+        return getattr(self, name)
+
+    @classmethod
+    def from_positions(cls, positions: List[Position]) -> 'OptionChain':
+        """Builds a chain out of a list of Position objects
+
+        Args:
+            positions (List[Position]): Positions to pack into the chain
+
+        Returns:
+            OptionChain: Columnar chain holding the same positions
+        """
+
+        underlyings = []
+        underlying_lookup = {}
+        underlying_id = np.empty(len(positions), dtype=CHAIN_DTYPES['underlying_id'])
+
+        for i, position in enumerate(positions):
+            underlying = position.option.underlying
+            if underlying not in underlying_lookup:
+                underlying_lookup[underlying] = len(underlyings)
+                underlyings.append(underlying)
+            underlying_id[i] = underlying_lookup[underlying]
+
+        return cls(
+            underlyings=underlyings,
+            underlying_id=underlying_id,
+            strike=[position.option.strike for position in positions],
+            expiry_ordinal=[position.option.expiry_date.toordinal() for position in positions],
+            option_class=[position.option.option_class.value for position in positions],
+            exercise_type=[position.option.exercise_type.value for position in positions],
+            side=[position.side.value for position in positions],
+            quantity=[position.quantity for position in positions],
+            cost=[position.cost for position in positions],
+            transaction_cost=[position.transaction_cost for position in positions]
+        )
+
+    @classmethod
+    def from_options(cls, options: List[Union[CallOption, PutOption]], side: TradeSide = TradeSide.LONG, quantity: int = 1) -> 'OptionChain':
+        """Builds a chain out of bare options, all held on the same side and quantity"""
+
+        return cls.from_positions([Position(side=side, quantity=quantity, option=option) for option in options])
+
+    @classmethod
+    def concatenate(cls, chains: List['OptionChain']) -> 'OptionChain':
+        """Joins several chains into one, re-interning their underlyings"""
+
+        underlyings = []
+        underlying_lookup = {}
+        underlying_ids = []
+
+        for chain in chains:
+            remap = np.empty(len(chain.underlyings), dtype=CHAIN_DTYPES['underlying_id'])
+            for i, underlying in enumerate(chain.underlyings):
+                if underlying not in underlying_lookup:
+                    underlying_lookup[underlying] = len(underlyings)
+                    underlyings.append(underlying)
+                remap[i] = underlying_lookup[underlying]
+            underlying_ids.append(remap[chain.underlying_id])
+
+        columns = {name: np.concatenate([chain._column(name) for chain in chains]) for name in CHAIN_DTYPES if name != 'underlying_id'}
+        return cls(underlyings=underlyings, underlying_id=np.concatenate(underlying_ids), **columns)
+
+    @classmethod
+    def from_book(cls, book) -> 'OptionChain':
+        """Packs a book into a chain. The book can be a chain already, a list of positions or anything holding its legs in a
+        positions attribute, such as a Strategy or a VerticalSpread.
+        """
+
+        if isinstance(book, OptionChain):
+            return book
+
+        return cls.from_positions(getattr(book, 'positions', book))
+
+    def save(self, path: str) -> None:
+        """Writes the chain to a compact binary file of fixed width columns with the underlyings interned in the header,
+        which load can memory map without copying
+        """
+
+        # Column offsets are relative to the end of the header, so the header never depends on its own length
+        columns = {}
+        offset = 0
+        for name, dtype in CHAIN_DTYPES.items():
+            dtype = np.dtype(dtype).newbyteorder('<')
+            columns[name] = {'dtype': dtype.str, 'offset': offset}
+            offset = _aligned(offset + len(self) * dtype.itemsize)
+
+        header = json.dumps({'length': len(self), 'underlyings': self.underlyings, 'columns': columns}).encode()
+        data_start = _aligned(len(BOOK_MAGIC) + 8 + len(header))
+
+        with open(path, 'wb') as file:
+            file.write(BOOK_MAGIC)
+            file.write(np.array(len(header), dtype='<u8').tobytes())
+            file.write(header)
+
+            for name, column in columns.items():
+                file.write(b'\0' * (data_start + column['offset'] - file.tell()))
+                np.ascontiguousarray(self._column(name), dtype=column['dtype']).tofile(file)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'OptionChain':
+        """Opens a chain written by save. Memory mapped chains are read only views onto the file, so opening costs next to
+        nothing whatever the size of the book and worker processes loading the same file share its pages.
+
+        Args:
+            path (str): File written by OptionChain.save
+            mmap (bool, optional): Whether to memory map the columns rather than read them into memory. Defaults to True.
+
+        Returns:
+            OptionChain: The saved chain
+        """
+
+        with open(path, 'rb') as file:
+            magic = file.read(len(BOOK_MAGIC))
+            assert magic == BOOK_MAGIC, f"{path} is not a saved option book"
+
+            header_length = int(np.frombuffer(file.read(8), dtype='<u8')[0])
+            header = json.loads(file.read(header_length))
+
+        data_start = _aligned(len(BOOK_MAGIC) + 8 + header_length)
+
+        length = header['length']
+        if mmap and length > 0:
+            data = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            with open(path, 'rb') as file:
+                data = np.frombuffer(bytearray(file.read()), dtype=np.uint8)
+
+        columns = {}
+        for name, column in header['columns'].items():
+            dtype = np.dtype(column['dtype'])
+            start = data_start + column['offset']
+            columns[name] = data[start:start + length * dtype.itemsize].view(dtype)
+
+        return cls(underlyings=header['underlyings'], **columns)
+
+    def __len__(self) -> int:
+        return len(self.strike)
+
+    def __getitem__(self, key) -> Union[PositionView, 'OptionChain']:
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("Chain index out of range")
+            return PositionView(self, int(key))
+
+        columns = {name: self._column(name)[key] for name in CHAIN_DTYPES}
+        return OptionChain(underlyings=self.underlyings, **columns)
+
+    def __iter__(self) -> Iterator[PositionView]:
+        for i in range(len(self)):
+            yield PositionView(self, i)
+
+    def __repr__(self) -> str:
+        return f"OptionChain({len(self)} contracts, {len(self.underlyings)} underlyings)"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._column(name).nbytes for name in CHAIN_DTYPES)
+
+    @property
+    def is_call(self) -> np.ndarray:
+        return self.option_class == OptionClass.CALL.value
+
+    @property
+    def signed_quantity(self) -> np.ndarray:
+        return self.side * self.quantity.astype(float)
+
+    def to_positions(self) -> List[Position]:
+        return [view.to_position() for view in self]
+
+    def filter(self, underlying: str = None, expiry_date: date = None, option_class: OptionClass = None) -> 'OptionChain':
+        """Returns the sub-chain matching every criterion given"""
+
+        mask = np.ones(len(self), dtype=bool)
+        if underlying is not None:
+            if underlying not in self.underlyings:
+                return self[np.zeros(len(self), dtype=bool)]
+            mask &= self.underlying_id == self.underlyings.index(underlying)
+        if expiry_date is not None:
+            mask &= self.expiry_ordinal == expiry_date.toordinal()
+        if option_class is not None:
+            mask &= self.option_class == option_class.value
+
+        return self[mask]
+
+    def spot_array(self, spots: Dict[str, float]) -> np.ndarray:
+        """Maps a dictionary of underlying prices onto one price per contract"""
+
+        spot_by_id = np.array([spots[underlying] for underlying in self.underlyings], dtype=float)
+        return spot_by_id[self.underlying_id]
+
+    def market_array(self, value: Union[ArrayLike, Dict[str, float]]) -> np.ndarray:
+        """Expands a market input given as a scalar, an array or a dictionary keyed by underlying into one value per contract"""
+
+        if isinstance(value, dict):
+            return self.spot_array(value)
+
+        return np.broadcast_to(np.asarray(value, dtype=float), self.strike.shape)
+
+    def time_to_expiry(self, start_date: date) -> np.ndarray:
+        """Time to expiry of every contract, looked up against the precomputed calendar index"""
+
+        # Ordinals count days from 0001-01-01 whereas datetime64 counts from the unix epoch
+        expiry_dates = (self.expiry_ordinal - date(1970, 1, 1).toordinal()).astype('datetime64[D]')
+        return time_to_expiry_vectorized(expiry_dates=expiry_dates, start_dates=start_date)
+
+    def intrinsic_values(self, S: ArrayLike) -> np.ndarray:
+        """Intrinsic value of one contract of each row given the underlying price of each row"""
+
+        moneyness = np.asarray(S, dtype=float) - self.strike
+        return np.maximum(np.where(self.is_call, moneyness, -moneyness), 0)
+
+    def values_at_expiry(self, prices: np.array) -> np.array:
+        """Signed, quantity scaled value of each row at each price. Returns an array of shape (len(chain), len(prices))"""
+
+        moneyness = np.asarray(prices, dtype=float)[np.newaxis, :] - self.strike[:, np.newaxis]
+        payoffs = np.maximum(np.where(self.is_call[:, np.newaxis], moneyness, -moneyness), 0)
+        return self.signed_quantity[:, np.newaxis] * payoffs
+
+    def profits_at_expiry(self, prices: np.array) -> np.array:
+        """Total profit of the chain at each expiry price, net of costs and transaction costs"""
+
+        total_cost = np.sum(self.side * self.cost) + np.sum(self.transaction_cost)
+        return self.values_at_expiry(prices=prices).sum(axis=0) - total_cost
+
+    def black_scholes(self, S: ArrayLike, sigma: ArrayLike, r: ArrayLike, T: ArrayLike = None, q: ArrayLike = 0) -> BlackScholesBatch:
+        """Per contract Black-Scholes price and greeks for the whole chain in one batched call. Values are per unit contract
+        and unsigned; multiply by signed_quantity for position level figures.
+        """
+
+        if T is None:
+            T = self.time_to_expiry(start_date=date.today())
+
+        return black_scholes_batch(S=S, K=self.strike, sigma=sigma, r=r, T=T, q=q, is_call=self.is_call)
+
+    def model_greeks(self, S: ArrayLike, sigma: ArrayLike, r: ArrayLike, T: ArrayLike = None, q: ArrayLike = 0) -> BlackScholesBatch:
+        """Per contract price and greeks honouring each row's exercise type, see model_batch. Values are per unit contract
+        and unsigned like black_scholes.
+        """
+
+        if T is None:
+            T = self.time_to_expiry(start_date=date.today())
+
+        return cached_batch(
+            'chain_greeks', tuple(self.underlyings), (self.strike, self.is_call, self.exercise_type), (S, sigma, r, T, q),
+            lambda: model_batch(S=S, K=self.strike, sigma=sigma, r=r, T=T, q=q, is_call=self.is_call, exercise_type=self.exercise_type)
+        )
+
+    def prices(self, S: ArrayLike, sigma: ArrayLike, r: ArrayLike, T: ArrayLike = None, q: ArrayLike = 0) -> np.ndarray:
+        """Per contract model price honouring each row's exercise type. European rows use Black-Scholes and american rows
+        use Bjerksund-Stensland (2002), each priced in one batched call.
+        """
+
+        if T is None:
+            T = self.time_to_expiry(start_date=date.today())
+
+        S, sigma, r, T, q = (np.broadcast_to(np.asarray(x, dtype=float), self.strike.shape) for x in (S, sigma, r, T, q))
+        prices = self.black_scholes(S=S, sigma=sigma, r=r, T=T, q=q).price
+
+        american = self.exercise_type == OptionExerciseType.AMERICAN.value
+        for is_call, pricer in ((True, bjerksund_stensland_2002_call), (False, bjerksund_stensland_2002_put)):
+            rows = american & (self.is_call == is_call)
+            if rows.any():
+                prices[rows] = pricer(S=S[rows], K=self.strike[rows], sigma=sigma[rows], r=r[rows], T=T[rows], q=q[rows])
+
+        return prices
+
+    def finite_difference(self, S: Union[ArrayLike, Dict[str, float]], sigma: Union[ArrayLike, Dict[str, float]], r: float, T: ArrayLike = None,
+                          q: Union[ArrayLike, Dict[str, float]] = 0, space_steps: int = 400,
+                          time_steps: int = 100) -> LatticeResult:
+        """Per contract price, delta, gamma and theta from the Crank-Nicolson engine, honouring each row's exercise type.
+        Rows sharing an underlying, an expiry and an exercise type are solved together on one grid, so a whole chain costs
+        one solve per expiry rather than one lattice per contract. S, T and q have to agree within each of these groups.
+
+        Args:
+            S (Union[ArrayLike, Dict[str, float]]): Underlying price, one per contract, or a dictionary keyed by underlying
+            sigma (Union[ArrayLike, Dict[str, float]]): Volatility, one per contract, or a dictionary keyed by underlying
+            r (float): Risk free rate
+            T (ArrayLike, optional): Time to expiry, or one per contract. Defaults to None, which uses each row's time to
+                expiry from today.
+            q (Union[ArrayLike, Dict[str, float]], optional): Dividend yield, one per contract, or a dictionary keyed by
+                underlying. Defaults to 0.
+            space_steps (int, optional): Number of log-spot intervals of each grid. Defaults to 400.
+            time_steps (int, optional): Number of time steps of each grid. Defaults to 100.
+
+        Returns:
+            LatticeResult: Unsigned per contract price, delta, gamma and theta
+        """
+
+        assert not np.any(self.exercise_type == OptionExerciseType.BERMUDAN.value), "A chain does not carry bermudan exercise dates"
+
+        if T is None:
+            T = self.time_to_expiry(start_date=date.today())
+
+        S, sigma, T, q = (self.market_array(x) for x in (S, sigma, T, q))
+        results = np.zeros((4, len(self)))
+
+        keys = np.stack([self.underlying_id.astype(np.int64), self.expiry_ordinal.astype(np.int64), self.exercise_type.astype(np.int64)], axis=1)
+        groups, group_index = np.unique(keys, axis=0, return_inverse=True)
+        group_index = group_index.ravel()
+
+        for group, (_, _, exercise_type) in enumerate(groups):
+            rows = np.flatnonzero(group_index == group)
+            first = rows[0]
+
+            # One grid is solved per group, so the spot, expiry and dividend yield of its first row stand for every row
+            assert np.allclose(S[rows], S[first]), "Contracts on one underlying and expiry have to share the underlying price"
+            assert np.allclose(T[rows], T[first]), "Contracts on one underlying and expiry have to share the time to expiry"
+            assert np.allclose(q[rows], q[first]), "Contracts on one underlying and expiry have to share the dividend yield"
+
+            result = crank_nicolson(
+                S=S[first], K=self.strike[rows], sigma=sigma[rows], r=r, T=T[first], q=q[first], is_call=self.is_call[rows],
+                space_steps=space_steps, time_steps=time_steps, exercise_type=OptionExerciseType(exercise_type)
+            )
+            results[:, rows] = result
+
+        return LatticeResult(*results)
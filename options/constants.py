@@ -1 +1,5 @@
-NUMBER_OF_TRADING_DAYS = 252
\ No newline at end of file
+NUMBER_OF_TRADING_DAYS = 252
+
+# Range of dates precomputed by the trading calendar index
+CALENDAR_INDEX_START = "2000-01-01"
+CALENDAR_INDEX_END = "2050-12-31"
\ No newline at end of file
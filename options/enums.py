@@ -15,4 +15,9 @@ class OptionClass(Enum):
 class TradeSide(Enum):
 
     LONG = 1
-    SHORT = -1
\ No newline at end of file
+    SHORT = -1
+
+class AveragingType(Enum):
+
+    ARITHMETIC = 1
+    GEOMETRIC = 2
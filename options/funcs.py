@@ -1,19 +1,151 @@
+import os
 import numpy as np
-import pandas_market_calendars as mcal
 
-from options.constants import NUMBER_OF_TRADING_DAYS
+from options.constants import NUMBER_OF_TRADING_DAYS, CALENDAR_INDEX_START, CALENDAR_INDEX_END
+from options.calendars import nyse_calendar, get_default_calendar, as_calendar_backend
+from options.instrumentation import instrumented
 
 from datetime import date
-from typing import List
+from typing import Dict, List, Union
 
-nyse_calendar = mcal.get_calendar("NYSE")
+DateLike = Union[date, str, np.datetime64]
 
-def time_to_expiry(expiry_date: date, start_date: date, calendar = nyse_calendar) -> float:
+class TradingCalendarIndex:
+    """Sorted array of the session dates of a market calendar. Counting the sessions between two dates becomes two
+    binary searches instead of building a schedule DataFrame.
+    """
 
-    market_calendar = calendar.schedule(start_date = start_date, end_date = expiry_date)
-    number_of_days = market_calendar.shape[0]
+    def __init__(self, sessions: np.ndarray) -> None:
+        self.sessions = np.sort(np.asarray(sessions, dtype='datetime64[D]'))
+
+    @classmethod
+    def from_market_calendar(cls, calendar, start_date: DateLike = CALENDAR_INDEX_START, end_date: DateLike = CALENDAR_INDEX_END) -> 'TradingCalendarIndex':
+        """Builds the index from a calendar backend
+
+        Args:
+            calendar: Calendar backend exposing sessions(start_date, end_date), or a pandas_market_calendars calendar
+            start_date (DateLike, optional): First date covered by the index. Defaults to CALENDAR_INDEX_START.
+            end_date (DateLike, optional): Last date covered by the index. Defaults to CALENDAR_INDEX_END.
+
+        Returns:
+            TradingCalendarIndex: Index of every session between the two dates
+        """
+
+        return cls(as_calendar_backend(calendar).sessions(start_date, end_date))
+
+    @classmethod
+    def load(cls, path: str) -> 'TradingCalendarIndex':
+        return cls(np.load(path))
+
+    def save(self, path: str) -> None:
+        np.save(path, self.sessions)
+
+    @property
+    def first_date(self) -> np.datetime64:
+        return self.sessions[0]
+
+    @property
+    def last_date(self) -> np.datetime64:
+        return self.sessions[-1]
+
+    def covers(self, start_dates: np.ndarray, end_dates: np.ndarray) -> bool:
+        return bool(np.all(start_dates >= self.first_date) and np.all(end_dates <= self.last_date))
+
+    @instrumented
+    def count_sessions(self, start_dates, end_dates) -> np.ndarray:
+        """Number of sessions in the closed interval [start_date, end_date] for each pair of dates
+
+        Args:
+            start_dates: Date or array of dates
+            end_dates: Date or array of dates
+
+        Returns:
+            np.ndarray: Session counts, zero wherever the end date is before the start date
+        """
+
+        start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+        end_dates = np.asarray(end_dates, dtype='datetime64[D]')
+
+        counts = np.searchsorted(self.sessions, end_dates, side='right') - np.searchsorted(self.sessions, start_dates, side='left')
+        return np.maximum(counts, 0)
+
+_calendar_indices: Dict[object, TradingCalendarIndex] = {}
+
+@instrumented
+def get_calendar_index(calendar = None, cache_path: str = None) -> TradingCalendarIndex:
+    """Returns the session index of a calendar, building it on first use. If a cache path is supplied the index is loaded
+    from it when present and written to it after being built, so later processes skip the build entirely.
+
+    Args:
+        calendar (optional): Calendar backend to index. Defaults to the default calendar.
+        cache_path (str, optional): .npy file used to persist the index. Defaults to None.
+
+    Returns:
+        TradingCalendarIndex: Session index of the calendar
+    """
+
+    if calendar is None:
+        calendar = get_default_calendar()
+
+    if calendar not in _calendar_indices:
+        if cache_path is not None and os.path.exists(cache_path):
+            index = TradingCalendarIndex.load(cache_path)
+        else:
+            index = TradingCalendarIndex.from_market_calendar(calendar)
+            if cache_path is not None:
+                index.save(cache_path)
+
+        _calendar_indices[calendar] = index
+
+    return _calendar_indices[calendar]
+
+@instrumented
+def _index_covering(calendar, start_dates: np.ndarray, end_dates: np.ndarray) -> TradingCalendarIndex:
+
+    if calendar is None:
+        calendar = get_default_calendar()
+
+    index = get_calendar_index(calendar)
+    if index.covers(start_dates, end_dates):
+        return index
+
+    # Dates outside of the precomputed range, widen the index once so later lookups stay cheap
+    first_date = min(index.first_date, np.min(start_dates))
+    last_date = max(index.last_date, np.max(end_dates))
+    index = TradingCalendarIndex.from_market_calendar(calendar, start_date=first_date, end_date=last_date)
+    _calendar_indices[calendar] = index
+
+    return index
+
+@instrumented
+def time_to_expiry(expiry_date: date, start_date: date, calendar = None) -> float:
+
+    start_dates = np.asarray(start_date, dtype='datetime64[D]')
+    end_dates = np.asarray(expiry_date, dtype='datetime64[D]')
+
+    number_of_days = _index_covering(calendar, start_dates, end_dates).count_sessions(start_dates, end_dates)
 
     tte = number_of_days / NUMBER_OF_TRADING_DAYS
 
-    return tte
+    return float(tte)
+
+@instrumented
+def time_to_expiry_vectorized(expiry_dates: List[date], start_dates: Union[date, List[date]], calendar = None) -> np.ndarray:
+    """Vectorized time_to_expiry over arrays of expiry dates and start dates, which broadcast against each other
+
+    Args:
+        expiry_dates (List[date]): Expiry dates
+        start_dates (Union[date, List[date]]): Start dates, or a single start date shared by every expiry
+        calendar (optional): Calendar backend to count sessions on. Defaults to the default calendar, NYSE unless changed
+            with set_default_calendar.
+
+    Returns:
+        np.ndarray: Times to expiry in trading years
+    """
+
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+    end_dates = np.asarray(expiry_dates, dtype='datetime64[D]')
+
+    number_of_days = _index_covering(calendar, start_dates, end_dates).count_sessions(start_dates, end_dates)
 
+    return number_of_days / NUMBER_OF_TRADING_DAYS
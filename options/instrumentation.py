@@ -0,0 +1,250 @@
+import functools
+import logging
+import sys
+import threading
+import time
+import numpy as np
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class FunctionStats:
+    """Running call count, time and batch sizes of one instrumented function. Times include the functions it calls."""
+
+    __slots__ = ('calls', 'total_time', 'total_elements', 'max_elements')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_time = 0.0
+        self.total_elements = 0
+        self.max_elements = 0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'calls': self.calls,
+            'total_time': self.total_time,
+            'mean_time': self.total_time / self.calls if self.calls else 0.0,
+            'total_elements': self.total_elements,
+            'mean_batch_size': self.total_elements / self.calls if self.calls else 0.0,
+            'max_batch_size': self.max_elements,
+        }
+
+# Functions marked with @instrumented, keyed by their qualified name
+_registry: Dict[str, Callable] = {}
+
+_stats: Dict[str, FunctionStats] = {}
+_stats_lock = threading.Lock()
+
+# Tables of the profile() blocks open on each thread, innermost last. Only their own thread writes to them.
+_local = threading.local()
+
+# Number of open profile() blocks across threads, and whether they switched instrumentation on
+_profile_lock = threading.Lock()
+_open_profiles = 0
+_profiles_enabled = False
+
+# (namespace, attribute, original) of every patch applied while instrumentation is enabled
+_patches: List[Tuple[object, str, Callable]] = []
+_enabled = False
+
+def instrumented(function: Callable) -> Callable:
+    """Marks a function for instrumentation and returns it unchanged, so it runs at full speed while instrumentation is
+    off. enable_instrumentation swaps timed wrappers in for every marked function.
+    """
+
+    _registry[f"{function.__module__}.{function.__qualname__}"] = function
+    return function
+
+def _batch_size(args: tuple, kwargs: dict) -> int:
+    """Number of contracts in a call, taken as the size of its largest array or list argument"""
+
+    size = 1
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, np.ndarray):
+            size = max(size, value.size)
+        elif isinstance(value, (list, tuple)):
+            size = max(size, len(value))
+
+    return size
+
+def _record(table: Dict[str, FunctionStats], name: str, elapsed: float, elements: int) -> None:
+
+    stats = table.get(name)
+    if stats is None:
+        stats = table[name] = FunctionStats()
+    stats.calls += 1
+    stats.total_time += elapsed
+    stats.total_elements += elements
+    stats.max_elements = max(stats.max_elements, elements)
+
+def _timed(name: str, function: Callable) -> Callable:
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            elements = _batch_size(args, kwargs)
+
+            with _stats_lock:
+                _record(_stats, name, elapsed, elements)
+
+            for table in getattr(_local, 'profiles', ()):
+                _record(table, name, elapsed, elements)
+
+    return wrapper
+
+def is_instrumentation_enabled() -> bool:
+    return _enabled
+
+def enable_instrumentation() -> None:
+    """Replaces every instrumented function with a timed wrapper. Modules that imported a function by name are patched
+    as well, so calls are recorded whichever module they come through. Only modules imported by then are patched.
+    """
+
+    global _enabled
+    if _enabled:
+        return
+
+    _enabled = True
+
+    wrappers = {id(function): _timed(name, function) for name, function in _registry.items()}
+
+    package = __name__.split('.')[0]
+    for module_name, module in list(sys.modules.items()):
+        if module is None or module_name.split('.')[0] != package:
+            continue
+
+        for attribute, value in list(vars(module).items()):
+            if id(value) in wrappers and callable(value):
+                _patches.append((module, attribute, value))
+                setattr(module, attribute, wrappers[id(value)])
+
+    # Methods live on their class rather than in a module namespace
+    for name, function in _registry.items():
+        owner_name, _, attribute = function.__qualname__.rpartition('.')
+        if not owner_name:
+            continue
+
+        owner = sys.modules[function.__module__]
+        for part in owner_name.split('.'):
+            owner = getattr(owner, part)
+
+        _patches.append((owner, attribute, function))
+        setattr(owner, attribute, wrappers[id(function)])
+
+def disable_instrumentation() -> None:
+    """Puts the original functions back. Recorded stats are kept until reset_instrumentation_stats."""
+
+    global _enabled
+    _enabled = False
+
+    while _patches:
+        namespace, attribute, original = _patches.pop()
+        setattr(namespace, attribute, original)
+
+def reset_instrumentation_stats() -> None:
+
+    with _stats_lock:
+        _stats.clear()
+
+def instrumentation_stats() -> Dict[str, Dict[str, float]]:
+    """Calls, cumulative and mean time in seconds and batch sizes of every instrumented function called so far"""
+
+    with _stats_lock:
+        return {name: stats.to_dict() for name, stats in _stats.items()}
+
+def format_instrumentation_stats(stats: Dict[str, Dict[str, float]] = None, limit: int = 10) -> str:
+    """One line summary of the functions with the most cumulative time"""
+
+    stats = instrumentation_stats() if stats is None else stats
+    slowest = sorted(stats.items(), key=lambda item: item[1]['total_time'], reverse=True)[:limit]
+
+    entries = [
+        f"{name.rpartition('.')[2]} calls={entry['calls']} time={1000 * entry['total_time']:.2f}ms batch={entry['mean_batch_size']:.0f}"
+        for name, entry in slowest
+    ]
+
+    return "options instrumentation: " + (" | ".join(entries) if entries else "no calls recorded")
+
+def log_instrumentation_stats(level: int = logging.INFO, limit: int = 10) -> None:
+    logger.log(level, format_instrumentation_stats(limit=limit))
+
+class PeriodicStatsLogger:
+    """Background thread logging the instrumentation stats every interval_seconds until stopped"""
+
+    def __init__(self, interval_seconds: float = 60, level: int = logging.INFO, limit: int = 10) -> None:
+        assert interval_seconds > 0, "The logging interval has to be positive"
+
+        self.interval_seconds = interval_seconds
+        self.level = level
+        self.limit = limit
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            log_instrumentation_stats(level=self.level, limit=self.limit)
+
+    def start(self) -> 'PeriodicStatsLogger':
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='options-instrumentation-logger', daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'PeriodicStatsLogger':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+@contextmanager
+def profile() -> Iterator[Dict[str, Dict[str, float]]]:
+    """Instruments a block of code and reports only the calls made inside it on the current thread. The yielded dictionary
+    is filled in with the stats of the block when it exits. Calls are still added to the running totals. Blocks may be
+    nested or open on several threads at once, and instrumentation is switched back off once the last of them exits
+    unless it was already on.
+
+        with profile() as stats:
+            strategy.black_scholes_profit_vary_underlying(S, sigma, r)
+        print(format_instrumentation_stats(stats))
+    """
+
+    global _open_profiles, _profiles_enabled
+
+    with _profile_lock:
+        if _open_profiles == 0:
+            _profiles_enabled = not is_instrumentation_enabled()
+            enable_instrumentation()
+        _open_profiles += 1
+
+    if not hasattr(_local, 'profiles'):
+        _local.profiles = []
+
+    block_stats: Dict[str, FunctionStats] = {}
+    _local.profiles.append(block_stats)
+
+    report = {}
+    try:
+        yield report
+    finally:
+        _local.profiles.remove(block_stats)
+
+        with _profile_lock:
+            _open_profiles -= 1
+            if _open_profiles == 0 and _profiles_enabled:
+                disable_instrumentation()
+
+        for name, stats in block_stats.items():
+            report[name] = stats.to_dict()
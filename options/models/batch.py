@@ -0,0 +1,60 @@
+import numpy as np
+
+from typing import NamedTuple, Union
+from options.models.numerics import norm_cdf, norm_pdf
+
+ArrayLike = Union[float, np.ndarray]
+
+class BlackScholesBatch(NamedTuple):
+    """Struct-of-arrays result of a batched Black-Scholes evaluation. Every field has the broadcast shape of the inputs."""
+
+    price: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta: np.ndarray
+    rho: np.ndarray
+
+def black_scholes_batch(S: ArrayLike, K: ArrayLike, sigma: ArrayLike, r: ArrayLike, T: ArrayLike, q: ArrayLike = 0, is_call: ArrayLike = True) -> BlackScholesBatch:
+    """Prices a whole set of european contracts and computes all five greeks in a single pass. d1, d2, the discount factors
+    and the normal cdf/pdf are computed exactly once per contract and shared between the price and the greeks.
+
+    Args:
+        S (ArrayLike): Underlying prices
+        K (ArrayLike): Strike prices
+        sigma (ArrayLike): Volatilities
+        r (ArrayLike): Risk free rates
+        T (ArrayLike): Times to expiry in years
+        q (ArrayLike, optional): Continuous dividend yields. Defaults to 0.
+        is_call (ArrayLike, optional): Boolean flags, True for calls and False for puts. Defaults to True.
+
+    Returns:
+        BlackScholesBatch: price, delta, gamma, vega, theta and rho arrays
+    """
+
+    S, K, sigma, r, T, q, is_call = np.broadcast_arrays(
+        np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(sigma, dtype=float),
+        np.asarray(r, dtype=float), np.asarray(T, dtype=float), np.asarray(q, dtype=float), np.asarray(is_call, dtype=bool)
+    )
+
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+    d_one = (np.log(S/K) + (r - q + 0.5 * sigma**2) * T) / sigma_sqrt_T
+    d_two = d_one - sigma_sqrt_T
+
+    # Calls use N(d), puts use N(-d) with the sign flipped, so one sign array covers both
+    sign = np.where(is_call, 1.0, -1.0)
+    discounted_S = S * np.exp(-q * T)
+    discounted_K = K * np.exp(-r * T)
+    cdf_d_one = norm_cdf(sign * d_one)
+    cdf_d_two = norm_cdf(sign * d_two)
+    pdf_d_one = norm_pdf(d_one)
+
+    price = sign * (discounted_S * cdf_d_one - discounted_K * cdf_d_two)
+    delta = sign * (discounted_S / S) * cdf_d_one
+    gamma = discounted_S * pdf_d_one / (S * S * sigma_sqrt_T)
+    vega = discounted_S * sqrt_T * pdf_d_one
+    theta = -discounted_S * pdf_d_one * sigma / (2 * sqrt_T) + sign * (q * discounted_S * cdf_d_one - r * discounted_K * cdf_d_two)
+    rho = sign * T * discounted_K * cdf_d_two
+
+    return BlackScholesBatch(price=price, delta=delta, gamma=gamma, vega=vega, theta=theta, rho=rho)
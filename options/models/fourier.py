@@ -0,0 +1,196 @@
+import numpy as np
+
+from scipy.interpolate import CubicSpline
+from scipy.optimize import least_squares
+from typing import Callable, NamedTuple, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+# Characteristic function of the log terminal price, phi(u) = E[exp(i * u * log(S_T))]
+CharacteristicFunction = Callable[[np.ndarray], np.ndarray]
+
+class HestonParameters(NamedTuple):
+    """Heston (1993) model: initial variance v0, mean reversion speed kappa towards the long run variance theta, vol of
+    variance xi and correlation rho between the spot and variance shocks
+    """
+
+    v0: float
+    kappa: float
+    theta: float
+    xi: float
+    rho: float
+
+# Calibration bounds of each Heston parameter, in the order of HestonParameters
+HESTON_BOUNDS = (
+    (1e-4, 1e-3, 1e-4, 1e-2, -0.999),
+    (4.0, 20.0, 4.0, 5.0, 0.999),
+)
+
+class FFTPriceGrid(NamedTuple):
+    """Call prices of one expiry on the evenly spaced log-strike grid of a Carr-Madan transform"""
+
+    strikes: np.ndarray
+    calls: np.ndarray
+
+class HestonCalibration(NamedTuple):
+
+    parameters: HestonParameters
+    rmse: float
+    evaluations: int
+    success: bool
+
+def black_scholes_characteristic_function(u: np.ndarray, S: float, sigma: float, r: float, T: float, q: float = 0) -> np.ndarray:
+
+    drift = np.log(S) + (r - q - 0.5 * sigma**2) * T
+    return np.exp(1j * u * drift - 0.5 * sigma**2 * u**2 * T)
+
+def heston_characteristic_function(u: np.ndarray, S: float, parameters: HestonParameters, r: float, T: float, q: float = 0) -> np.ndarray:
+    """Heston characteristic function in the form of Albrecher et al. (2007), which stays on the principal branch of the
+    complex logarithm for long expiries where Heston's original form jumps
+    """
+
+    v0, kappa, theta, xi, rho = parameters
+
+    beta = kappa - 1j * rho * xi * u
+    d = np.sqrt(beta**2 + xi**2 * (1j * u + u**2))
+    g = (beta - d) / (beta + d)
+    decay = np.exp(-d * T)
+
+    C = kappa * theta / xi**2 * ((beta - d) * T - 2 * np.log((1 - g * decay) / (1 - g)))
+    D = (beta - d) / xi**2 * (1 - decay) / (1 - g * decay)
+
+    return np.exp(1j * u * (np.log(S) + (r - q) * T) + C + D * v0)
+
+def carr_madan_call_grid(characteristic_function: CharacteristicFunction, S: float, r: float, T: float, n: int = 4096, eta: float = 0.25,
+                         alpha: float = 1.5) -> FFTPriceGrid:
+    """Prices calls on n log-strikes centred on the spot with one FFT (Carr and Madan, 1999). The damped call price
+    exp(alpha * k) * C(k) has a closed form Fourier transform in terms of the characteristic function, which is sampled on
+    n frequencies eta apart and integrated with Simpson weights. The log-strikes come out 2 * pi / (n * eta) apart.
+
+    Args:
+        characteristic_function (CharacteristicFunction): Characteristic function of log(S_T) under the pricing measure
+        S (float): Underlying price, the centre of the strike grid
+        r (float): Risk free rate
+        T (float): Time to expiry in years
+        n (int, optional): Number of points, a power of two. Defaults to 4096.
+        eta (float, optional): Frequency spacing. Defaults to 0.25.
+        alpha (float, optional): Damping exponent, which needs E[S_T ** (alpha + 1)] to be finite. Defaults to 1.5.
+
+    Returns:
+        FFTPriceGrid: Strikes and call prices
+    """
+
+    spacing = 2 * np.pi / (n * eta)
+    first_log_strike = np.log(S) - 0.5 * n * spacing
+
+    v = eta * np.arange(n)
+    transform = np.exp(-r * T) * characteristic_function(v - (alpha + 1) * 1j) / (alpha**2 + alpha - v**2 + 1j * (2 * alpha + 1) * v)
+
+    simpson = (3 + (-1.0)**np.arange(1, n + 1)) / 3
+    simpson[0] = 1 / 3
+
+    log_strikes = first_log_strike + spacing * np.arange(n)
+    calls = np.exp(-alpha * log_strikes) / np.pi * np.fft.fft(np.exp(-1j * v * first_log_strike) * transform * eta * simpson).real
+
+    return FFTPriceGrid(strikes=np.exp(log_strikes), calls=calls)
+
+def fft_prices(characteristic_function: CharacteristicFunction, K: ArrayLike, S: float, r: float, T: float, q: float = 0, is_call: ArrayLike = True,
+               n: int = 4096, eta: float = 0.25, alpha: float = 1.5) -> np.ndarray:
+    """Prices every listed strike of one expiry from a single FFT. Calls are read off the FFT grid with a cubic spline in
+    log-strike and puts follow from put-call parity.
+
+    Args:
+        characteristic_function (CharacteristicFunction): Characteristic function of log(S_T) under the pricing measure
+        K (ArrayLike): Strike prices
+        S (float): Underlying price
+        r (float): Risk free rate
+        T (float): Time to expiry in years
+        q (float, optional): Continuous dividend yield. Defaults to 0.
+        is_call (ArrayLike, optional): Boolean flags, True for calls and False for puts. Defaults to True.
+        n (int, optional): Number of FFT points. Defaults to 4096.
+        eta (float, optional): Frequency spacing. Defaults to 0.25.
+        alpha (float, optional): Damping exponent. Defaults to 1.5.
+
+    Returns:
+        np.ndarray: Option prices, one per strike
+    """
+
+    K, is_call = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(is_call, dtype=bool))
+    grid = carr_madan_call_grid(characteristic_function, S=S, r=r, T=T, n=n, eta=eta, alpha=alpha)
+
+    log_strikes = np.log(grid.strikes)
+    log_K = np.log(K)
+    assert log_K.min() > log_strikes[1] and log_K.max() < log_strikes[-2], "Strikes fall outside of the FFT grid, increase n or eta"
+
+    # Only the stretch of the grid spanning the listed strikes goes into the spline
+    low = max(np.searchsorted(log_strikes, log_K.min()) - 3, 0)
+    high = min(np.searchsorted(log_strikes, log_K.max()) + 3, len(log_strikes))
+    calls = CubicSpline(log_strikes[low:high], grid.calls[low:high])(log_K)
+
+    return np.where(is_call, calls, calls - S * np.exp(-q * T) + K * np.exp(-r * T))
+
+def black_scholes_fft_prices(K: ArrayLike, S: float, sigma: float, r: float, T: float, q: float = 0, is_call: ArrayLike = True, **fft_options) -> np.ndarray:
+
+    characteristic_function = lambda u: black_scholes_characteristic_function(u, S=S, sigma=sigma, r=r, T=T, q=q)
+    return fft_prices(characteristic_function, K=K, S=S, r=r, T=T, q=q, is_call=is_call, **fft_options)
+
+def heston_fft_prices(K: ArrayLike, S: float, parameters: HestonParameters, r: float, T: float, q: float = 0, is_call: ArrayLike = True, **fft_options) -> np.ndarray:
+
+    characteristic_function = lambda u: heston_characteristic_function(u, S=S, parameters=parameters, r=r, T=T, q=q)
+    return fft_prices(characteristic_function, K=K, S=S, r=r, T=T, q=q, is_call=is_call, **fft_options)
+
+def heston_chain_prices(K: np.ndarray, T: np.ndarray, S: float, parameters: HestonParameters, r: float, q: float = 0, is_call: ArrayLike = True,
+                        **fft_options) -> np.ndarray:
+    """Heston prices of a whole chain with one FFT per distinct expiry"""
+
+    K, T, is_call = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float), np.asarray(is_call, dtype=bool))
+    prices = np.empty(K.shape)
+
+    for expiry in np.unique(T):
+        rows = T == expiry
+        prices[rows] = heston_fft_prices(K[rows], S=S, parameters=parameters, r=r, T=expiry, q=q, is_call=is_call[rows], **fft_options)
+
+    return prices
+
+def calibrate_heston(prices: np.ndarray, K: np.ndarray, T: np.ndarray, S: float, r: float, q: float = 0, is_call: ArrayLike = True,
+                     weights: np.ndarray = None, initial: HestonParameters = None, max_evaluations: int = 500, **fft_options) -> HestonCalibration:
+    """Fits the Heston parameters to a chain of option prices by weighted least squares. Each evaluation of the model
+    prices the whole chain with one FFT per expiry, so a full chain calibrates in a fraction of a second.
+
+    Args:
+        prices (np.ndarray): Quoted option prices
+        K (np.ndarray): Strike of every quote
+        T (np.ndarray): Time to expiry of every quote
+        S (float): Underlying price
+        r (float): Risk free rate
+        q (float, optional): Continuous dividend yield. Defaults to 0.
+        is_call (ArrayLike, optional): Boolean flags, True for calls and False for puts. Defaults to True.
+        weights (np.ndarray, optional): Weight of every quote, e.g. 1 / vega to fit in implied vol rather than price.
+            Defaults to None.
+        initial (HestonParameters, optional): Starting point, for instance the previous calibration. Defaults to None.
+        max_evaluations (int, optional): Cap on the number of chain evaluations, not counting those spent on the finite
+            difference Jacobian. Defaults to 500.
+
+    Returns:
+        HestonCalibration: Fitted parameters, root mean square price error, evaluations used and whether it converged
+    """
+
+    prices = np.asarray(prices, dtype=float)
+    weights = np.ones_like(prices) if weights is None else np.asarray(weights, dtype=float)
+
+    if initial is None:
+        # Typical equity index parameters
+        initial = HestonParameters(v0=0.04, kappa=2.0, theta=0.04, xi=0.5, rho=-0.5)
+
+    def residuals(x: np.ndarray) -> np.ndarray:
+        model = heston_chain_prices(K, T, S=S, parameters=HestonParameters(*x), r=r, q=q, is_call=is_call, **fft_options)
+        return weights * (model - prices)
+
+    start = np.clip(np.asarray(initial, dtype=float), HESTON_BOUNDS[0], HESTON_BOUNDS[1])
+    result = least_squares(residuals, start, bounds=HESTON_BOUNDS, max_nfev=max_evaluations, x_scale='jac')
+
+    parameters = HestonParameters(*(float(x) for x in result.x))
+    model = heston_chain_prices(K, T, S=S, parameters=parameters, r=r, q=q, is_call=is_call, **fft_options)
+    rmse = float(np.sqrt(np.mean((model - prices)**2)))
+
+    return HestonCalibration(parameters=parameters, rmse=rmse, evaluations=int(result.nfev), success=bool(result.success))
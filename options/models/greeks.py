@@ -1,60 +1,64 @@
-import numpy as np
-
-from scipy.stats import norm
+from options.instrumentation import instrumented
+from options.models.numerics import exp, norm_cdf, norm_pdf, sqrt
 from options.models.pricing_models import d1, d2
 
+@instrumented
 def delta_bs(option_type: str, S: float, K: float, sigma: float, r: float, T: float, q: float) -> float:
     assert option_type in ['call', 'put'], "The name of the option type must be either call or put."
-    d_one = d1(S, K, sigma, r, T)
+    d_one = d1(S, K, sigma, r, T, q)
 
     if option_type == 'call':
 
-        delta = np.exp(-q * T) * norm.cdf(d_one)
+        delta = exp(-q * T) * norm_cdf(d_one)
 
     elif option_type == 'put':
 
-        delta = np.exp(-q*T) * (norm.cdf(d1) - 1)
+        delta = exp(-q*T) * (norm_cdf(d_one) - 1)
 
     return delta
 
+@instrumented
 def gamma_bs(S: float, K: float, sigma: float, r: float, T: float, q: float) -> float:
 
-    d_one = d1(S, K, sigma, r, T)
+    d_one = d1(S, K, sigma, r, T, q)
 
-    numerator = np.exp(-q*T) * norm.pdf(d_one)
-    denominator = sigma * S * np.sqrt(T)
+    numerator = exp(-q*T) * norm_pdf(d_one)
+    denominator = sigma * S * sqrt(T)
 
     return numerator/denominator
 
+@instrumented
 def theta_bs(option_type: str, S: float, K: float, sigma: float, r: float, T: float, q: float) -> float:
-    d_one = d1(S, K, sigma, r, T)
+    d_one = d1(S, K, sigma, r, T, q)
     d_two = d_one - sigma * (T ** 0.5)
 
-    first = (sigma * S * np.exp(-q*T))/(2*np.sqrt(T))
-    second = q*S*np.exp(-q*T)
-    third = r*K*np.exp(-r*T)
+    first = (sigma * S * exp(-q*T))/(2*sqrt(T))
+    second = q*S*exp(-q*T)
+    third = r*K*exp(-r*T)
     if option_type == 'call':
-        theta = -first * norm.pdf(d_one) + second * norm.cdf(d_one) - third * norm.cdf(d_two)
+        theta = -first * norm_pdf(d_one) + second * norm_cdf(d_one) - third * norm_cdf(d_two)
     elif option_type == 'put':
-        theta = -first*norm.pdf(-d_one) - second*norm.cdf(-d_one) + third*norm.cdf(-d_two)
+        theta = -first*norm_pdf(-d_one) - second*norm_cdf(-d_one) + third*norm_cdf(-d_two)
 
     return theta
 
 
+@instrumented
 def vega_bs(S: float, K: float, sigma: float, r: float, T: float, q: float) -> float:
 
-    d_one = d1(S, K, sigma, r, T)
-    vega = S * np.sqrt(T) * np.exp(-q*T) * norm.pdf(d_one)
+    d_one = d1(S, K, sigma, r, T, q)
+    vega = S * sqrt(T) * exp(-q*T) * norm_pdf(d_one)
 
     return vega
 
+@instrumented
 def rho_bs(option_type: str, S: float, K: float, sigma: float, r: float, T: float, q: float) -> float:
 
-    d_two = d2(S, K, sigma, r, T)
+    d_two = d2(S, K, sigma, r, T, q)
 
     if option_type == 'call':
-        rho = K * T * np.exp(-r * T) * norm.cdf(d_two)
+        rho = K * T * exp(-r * T) * norm_cdf(d_two)
     elif option_type == 'put':
-        rho = -K * T * np.exp(-r * T) * norm.cdf(-d_two)
+        rho = -K * T * exp(-r * T) * norm_cdf(-d_two)
 
     return rho
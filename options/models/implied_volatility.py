@@ -0,0 +1,120 @@
+import numpy as np
+
+from typing import NamedTuple, Union
+from options.models.batch import black_scholes_batch
+
+ArrayLike = Union[float, np.ndarray]
+
+# Bracket searched for every quote. Quotes whose vol falls outside of it are reported as failures.
+MIN_VOL = 1e-4
+MAX_VOL = 5.0
+
+class ImpliedVolatilityResult(NamedTuple):
+    """Per contract output of the batched implied volatility solver. sigma is nan wherever converged is False."""
+
+    sigma: np.ndarray
+    iterations: np.ndarray
+    converged: np.ndarray
+
+def _initial_guess(call_price: np.ndarray, discounted_S: np.ndarray, discounted_K: np.ndarray, T: np.ndarray) -> np.ndarray:
+    """Corrado-Miller rational approximation of the implied vol of a call, clipped into the search bracket"""
+
+    half_moneyness = 0.5 * (discounted_S - discounted_K)
+    excess = call_price - half_moneyness
+    radicand = np.maximum(excess**2 - (discounted_S - discounted_K)**2 / np.pi, 0)
+    total_vol = np.sqrt(2 * np.pi) / (discounted_S + discounted_K) * (excess + np.sqrt(radicand))
+
+    guess = total_vol / np.sqrt(T)
+    guess = np.where(np.isfinite(guess) & (guess > 0), guess, 0.3)
+
+    return np.clip(guess, MIN_VOL, MAX_VOL)
+
+def implied_volatility_batch(price: ArrayLike, S: ArrayLike, K: ArrayLike, r: ArrayLike, T: ArrayLike, q: ArrayLike = 0, is_call: ArrayLike = True,
+                             tol: float = 1e-8, max_iterations: int = 50) -> ImpliedVolatilityResult:
+    """Inverts Black-Scholes for a whole set of quotes at once. Every quote is solved on its out of the money side,
+    starts from a rational approximation and is refined with vectorized Newton steps on vega. Each quote keeps its own
+    bracket and falls back to bisection whenever a Newton step would leave it, so convergence is guaranteed for quotes inside
+    the no-arbitrage bounds. Only quotes that have not converged yet are repriced on each iteration.
+
+    Args:
+        price (ArrayLike): Option prices to invert
+        S (ArrayLike): Underlying prices
+        K (ArrayLike): Strike prices
+        r (ArrayLike): Risk free rates
+        T (ArrayLike): Times to expiry in years
+        q (ArrayLike, optional): Continuous dividend yields. Defaults to 0.
+        is_call (ArrayLike, optional): Boolean flags, True for calls and False for puts. Defaults to True.
+        tol (float, optional): Price tolerance relative to the quote. Defaults to 1e-8.
+        max_iterations (int, optional): Maximum number of iterations per quote. Defaults to 50.
+
+    Returns:
+        ImpliedVolatilityResult: Implied vols, iteration counts and convergence flags per quote
+    """
+
+    price, S, K, r, T, q, is_call = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(r, dtype=float),
+        np.asarray(T, dtype=float), np.asarray(q, dtype=float), np.asarray(is_call, dtype=bool)
+    )
+    shape = price.shape
+    price, S, K, r, T, q, is_call = (x.ravel() for x in (price, S, K, r, T, q, is_call))
+
+    discounted_S = S * np.exp(-q * T)
+    discounted_K = K * np.exp(-r * T)
+
+    # Every quote is solved on its out of the money side, moving in the money quotes across with put-call parity, which
+    # keeps the target price free of the intrinsic value that would otherwise swamp the time value
+    otm_is_call = discounted_K >= discounted_S
+    parity = discounted_S - discounted_K
+    target = np.where(is_call == otm_is_call, price, np.where(otm_is_call, price + parity, price - parity))
+    call_price = np.where(otm_is_call, target, target + parity)
+
+    # Quotes outside of the no-arbitrage bounds have no implied vol
+    upper_bound = np.where(otm_is_call, discounted_S, discounted_K)
+    valid = (target > 0) & (target < upper_bound) & (T > 0)
+
+    sigma = np.full(price.shape, np.nan)
+    iterations = np.zeros(price.shape, dtype=np.int32)
+    converged = np.zeros(price.shape, dtype=bool)
+
+    active = np.flatnonzero(valid)
+    sigma[active] = _initial_guess(call_price[active], discounted_S[active], discounted_K[active], T[active])
+    low = np.full(active.shape, MIN_VOL)
+    high = np.full(active.shape, MAX_VOL)
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+
+        current = sigma[active]
+        batch = black_scholes_batch(S=S[active], K=K[active], sigma=current, r=r[active], T=T[active], q=q[active], is_call=otm_is_call[active])
+        difference = batch.price - target[active]
+        iterations[active] += 1
+
+        done = np.abs(difference) <= tol * target[active]
+        converged[active[done]] = True
+
+        high = np.where(difference > 0, current, high)
+        low = np.where(difference <= 0, current, low)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = current - difference / batch.vega
+        outside = ~np.isfinite(newton) | (newton <= low) | (newton >= high)
+        updated = np.where(outside, 0.5 * (low + high), newton)
+
+        # Bracket collapsed without reaching the price tolerance, the answer is as good as it gets
+        done |= (high - low) < tol * current
+        converged[active[done]] = True
+
+        sigma[active[~done]] = updated[~done]
+        active, low, high = active[~done], low[~done], high[~done]
+
+    sigma[~converged] = np.nan
+
+    return ImpliedVolatilityResult(sigma=sigma.reshape(shape), iterations=iterations.reshape(shape), converged=converged.reshape(shape))
+
+def implied_volatility(option_type: str, price: float, S: float, K: float, r: float, T: float, q: float = 0) -> float:
+    assert option_type in ['call', 'put'], "The name of the option type must be either call or put."
+
+    result = implied_volatility_batch(price=price, S=S, K=K, r=r, T=T, q=q, is_call=option_type == 'call')
+
+    return float(result.sigma)
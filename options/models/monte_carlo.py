@@ -0,0 +1,171 @@
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+from options.enums import AveragingType
+from options.models.numerics import norm_cdf
+
+class MonteCarloResult(NamedTuple):
+    """Monte Carlo estimate with its standard error and the number of independent samples behind it"""
+
+    price: float
+    standard_error: float
+    samples: int
+
+class _ChunkSums(NamedTuple):
+    """Sufficient statistics of one chunk, so chunks can be combined in any order and across processes"""
+
+    count: int
+    payoff: float
+    payoff_squared: float
+    control: float
+    control_squared: float
+    cross: float
+
+def simulate_gbm_paths(S: float, sigma: float, r: float, T: float, steps: int, paths: int, rng: np.random.Generator, q: float = 0,
+                       antithetic: bool = False) -> np.ndarray:
+    """Simulates geometric brownian motion paths on an evenly spaced grid
+
+    Args:
+        S (float): Underlying price today
+        sigma (float): Volatility
+        r (float): Risk free rate
+        T (float): Time horizon in years
+        steps (int): Number of time steps, the fixings are at T/steps, 2T/steps, ..., T
+        paths (int): Number of paths. With antithetic variates this must be even and the second half mirrors the first.
+        rng (np.random.Generator): Source of randomness
+        q (float, optional): Continuous dividend yield. Defaults to 0.
+        antithetic (bool, optional): Whether to pair each path with its mirror image. Defaults to False.
+
+    Returns:
+        np.ndarray: Underlying prices of shape (paths, steps), excluding today's price
+    """
+
+    dt = T / steps
+
+    if antithetic:
+        assert paths % 2 == 0, "Antithetic sampling needs an even number of paths"
+        shocks = rng.standard_normal((paths // 2, steps))
+        shocks = np.concatenate([shocks, -shocks])
+    else:
+        shocks = rng.standard_normal((paths, steps))
+
+    log_increments = (r - q - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * shocks
+
+    return S * np.exp(np.cumsum(log_increments, axis=1))
+
+def geometric_asian_price(S: float, K: float, sigma: float, r: float, T: float, steps: int, q: float = 0, is_call: bool = True) -> float:
+    """Closed form price of a discretely monitored geometric average price option with fixings at T/steps, ..., T"""
+
+    dt = T / steps
+    mean = np.log(S) + (r - q - 0.5 * sigma**2) * dt * (steps + 1) / 2
+    variance = sigma**2 * dt * (steps + 1) * (2 * steps + 1) / (6 * steps)
+    stdev = np.sqrt(variance)
+
+    d_one = (mean - np.log(K) + variance) / stdev
+    d_two = d_one - stdev
+    forward = np.exp(mean + 0.5 * variance)
+
+    if is_call:
+        return np.exp(-r * T) * (forward * norm_cdf(d_one) - K * norm_cdf(d_two))
+
+    return np.exp(-r * T) * (K * norm_cdf(-d_two) - forward * norm_cdf(-d_one))
+
+def _simulate_chunk(seed: np.random.SeedSequence, paths: int, S: float, K: float, sigma: float, r: float, T: float, steps: int, q: float,
+                    is_call: bool, averaging: AveragingType, antithetic: bool) -> _ChunkSums:
+
+    rng = np.random.default_rng(seed)
+    prices = simulate_gbm_paths(S=S, sigma=sigma, r=r, T=T, steps=steps, paths=paths, rng=rng, q=q, antithetic=antithetic)
+    sign = 1.0 if is_call else -1.0
+
+    geometric_average = np.exp(np.mean(np.log(prices), axis=1))
+    if averaging == AveragingType.ARITHMETIC:
+        average = np.mean(prices, axis=1)
+    else:
+        average = geometric_average
+
+    discount = np.exp(-r * T)
+    payoff = discount * np.maximum(sign * (average - K), 0)
+    control = discount * np.maximum(sign * (geometric_average - K), 0)
+
+    if antithetic:
+        # Each path and its mirror image form one independent sample
+        half = paths // 2
+        payoff = 0.5 * (payoff[:half] + payoff[half:])
+        control = 0.5 * (control[:half] + control[half:])
+
+    return _ChunkSums(
+        count=len(payoff),
+        payoff=float(np.sum(payoff)),
+        payoff_squared=float(np.sum(payoff**2)),
+        control=float(np.sum(control)),
+        control_squared=float(np.sum(control**2)),
+        cross=float(np.sum(payoff * control))
+    )
+
+def asian_option_monte_carlo(S: float, K: float, sigma: float, r: float, T: float, steps: int, q: float = 0, is_call: bool = True,
+                             averaging: AveragingType = AveragingType.ARITHMETIC, paths: int = 100_000, chunk_size: int = 10_000,
+                             antithetic: bool = True, control_variate: bool = True, seed: int = None, workers: int = None) -> MonteCarloResult:
+    """Prices an average price asian option by Monte Carlo. Paths are simulated in chunks of at most chunk_size so memory
+    stays bounded, and the chunks can be fanned out over a process pool. Each chunk draws from its own child of one
+    SeedSequence, so a given seed gives the same answer whatever the number of workers.
+
+    For arithmetic averaging the geometric average option, which has a closed form, is used as a control variate.
+
+    Args:
+        S (float): Underlying price
+        K (float): Strike price
+        sigma (float): Volatility
+        r (float): Risk free rate
+        T (float): Time to expiry in years
+        steps (int): Number of evenly spaced fixings in the average
+        q (float, optional): Continuous dividend yield. Defaults to 0.
+        is_call (bool, optional): True for a call on the average, False for a put. Defaults to True.
+        averaging (AveragingType, optional): Arithmetic or geometric average. Defaults to AveragingType.ARITHMETIC.
+        paths (int, optional): Total number of simulated paths. Defaults to 100_000.
+        chunk_size (int, optional): Maximum number of paths held in memory by one chunk. Defaults to 10_000.
+        antithetic (bool, optional): Whether to use antithetic variates. Defaults to True.
+        control_variate (bool, optional): Whether to use the geometric control variate. Defaults to True.
+        seed (int, optional): Seed for reproducible results. Defaults to None.
+        workers (int, optional): Number of worker processes. None or 1 simulates in this process. Defaults to None.
+
+    Returns:
+        MonteCarloResult: Price estimate, its standard error and the number of independent samples
+    """
+
+    chunk_paths = [chunk_size] * (paths // chunk_size)
+    remainder = paths % chunk_size
+    if remainder:
+        chunk_paths.append(remainder)
+
+    if antithetic:
+        # Every chunk needs whole antithetic pairs
+        chunk_paths = [n + n % 2 for n in chunk_paths]
+
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_paths))
+    arguments = [(child, n, S, K, sigma, r, T, steps, q, is_call, averaging, antithetic) for child, n in zip(seeds, chunk_paths)]
+
+    if workers is None or workers <= 1:
+        chunks = [_simulate_chunk(*args) for args in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, *zip(*arguments)))
+
+    count = sum(chunk.count for chunk in chunks)
+    payoff_mean = sum(chunk.payoff for chunk in chunks) / count
+    payoff_variance = sum(chunk.payoff_squared for chunk in chunks) / count - payoff_mean**2
+
+    if not control_variate or averaging == AveragingType.GEOMETRIC:
+        return MonteCarloResult(price=payoff_mean, standard_error=float(np.sqrt(max(payoff_variance, 0) / count)), samples=count)
+
+    control_mean = sum(chunk.control for chunk in chunks) / count
+    control_variance = sum(chunk.control_squared for chunk in chunks) / count - control_mean**2
+    covariance = sum(chunk.cross for chunk in chunks) / count - payoff_mean * control_mean
+
+    beta = covariance / control_variance if control_variance > 0 else 0.0
+    exact_control = geometric_asian_price(S=S, K=K, sigma=sigma, r=r, T=T, steps=steps, q=q, is_call=is_call)
+
+    price = payoff_mean - beta * (control_mean - exact_control)
+    variance = payoff_variance - beta * covariance
+
+    return MonteCarloResult(price=float(price), standard_error=float(np.sqrt(max(variance, 0) / count)), samples=count)
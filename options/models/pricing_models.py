@@ -1,74 +1,237 @@
+import math
+import warnings
 import numpy as np
 
-from scipy.stats import norm
+from options.instrumentation import instrumented
+from options.models.numerics import exp, is_scalar, norm_cdf
 
+@instrumented
 def black_scholes_call_price(S: float, K: float, sigma: float, r: float, T: float, q: float = 0) -> float:
 
-    d_one = d1(S, K, sigma, r, T)
-    d_two = d2(S, K, sigma, r, T)
+    d_one = d1(S, K, sigma, r, T, q)
+    d_two = d_one - sigma * (T ** 0.5)
 
-    return S * np.exp(-q * T) * norm.cdf(d_one) - K * np.exp(-r * T) * norm.cdf(d_two)
+    return S * exp(-q * T) * norm_cdf(d_one) - K * exp(-r * T) * norm_cdf(d_two)
 
+@instrumented
 def black_scholes_put_price(S: float, K: float, sigma: float, r: float, T: float, q: float = 0) -> float:
-    d_one = d1(S, K, sigma, r, T)
-    d_two = d2(S, K, sigma, r, T)
+    d_one = d1(S, K, sigma, r, T, q)
+    d_two = d_one - sigma * (T ** 0.5)
 
-    return -S * np.exp(-q * T) * norm.cdf(-d_one) + K * np.exp(-r * T) * norm.cdf(-d_two)
+    return -S * exp(-q * T) * norm_cdf(-d_one) + K * exp(-r * T) * norm_cdf(-d_two)
 
 
-def d1(S: float, K: float, sigma: float, r: float, T: float) -> float:
+@instrumented
+def d1(S: float, K: float, sigma: float, r: float, T: float, q: float = 0) -> float:
     # assert S > 0, "Underlying price must be greater than 0"
     # assert K > 0, "Strike price must be greater than 0"
     # assert sigma > 0, "Volatility must be greater than 0"
     # assert T > 0, "Time to expiry must be greater than 0"
-    num = np.log(S/K) + (r + (sigma **2))*(T)
+
+    # Single contracts skip NumPy dispatch. Degenerate inputs take the NumPy path, which returns inf or nan instead of raising.
+    if is_scalar(S, K, sigma, T) and S > 0 and K > 0 and sigma > 0 and T > 0:
+        return (math.log(S/K) + (r - q + 0.5 * (sigma **2))*(T)) / (sigma * math.sqrt(T))
+
+    num = np.log(S/K) + (r - q + 0.5 * (sigma **2))*(T)
     denom = sigma * (T ** 0.5)
 
     return num/denom
 
-def d2(S: float, K: float, sigma: float, r: float, T: float) -> float:
+@instrumented
+def d2(S: float, K: float, sigma: float, r: float, T: float, q: float = 0) -> float:
 
-    d = d1(S, K, sigma, r, T)
+    d = d1(S, K, sigma, r, T, q)
 
     return d - sigma * (T ** 0.5)
 
-def bjerskund_stensland_2002_call(S: float, K: float, T: float, r: float, b: float, sigma: float, X: float) -> float:
-
-    def beta() -> float:
-        return (0.5 - (b/(sigma**2))) + ((2*r)/(sigma**2) + ((b/sigma**2) - 0.5)**2)**0.5
-
-    def alpha(X: float) -> float:
-
-        b = beta()
-        return (X - K) * X ** (-b)
-
-    def phi(gamma: float, H: float) -> float:
-
-        def lam_da() -> float:
-            return -r + gamma*b + 0.5*gamma*(gamma-1)*sigma**2
-
-        def kappa() -> float:
-            return (2*b/sigma**2) + (2 * gamma - 1)
-
-        lam = lam_da()
-        kap = kappa()
-
-        outer = np.exp(lam * T) * S ** gamma
-        first = norm.cdf(-(np.log(S/H) + (b + (gamma-0.5)*sigma**2)*T)/(sigma * (T**0.5)))
-        second = (X/S)**kap * norm.cdf(-(np.log(X**2/S*H) + (b + (gamma-0.5)*sigma**2)*T)/(sigma * (T**0.5)))
+# Gauss-Legendre nodes and weights on [-1, 1] used to integrate the bivariate normal density
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(20)
 
-        return outer * (first - second)
+def _bvn_low_correlation(h: np.ndarray, k: np.ndarray, rho: np.ndarray) -> np.ndarray:
+    """P(X > h, Y > k) for |rho| < 0.925, integrating over arcsin(rho)"""
 
-    a = alpha(X)
-    b = beta()
+    arcsin_rho = np.arcsin(rho)[:, np.newaxis]
+    sin_theta = np.sin(arcsin_rho * (_GL_NODES + 1) / 2)
+    integrand = np.exp((h[:, np.newaxis] * k[:, np.newaxis] * sin_theta - (h[:, np.newaxis]**2 + k[:, np.newaxis]**2) / 2) / (1 - sin_theta**2))
+    integral = arcsin_rho[:, 0] * np.sum(_GL_WEIGHTS * integrand, axis=-1) / (4 * np.pi)
 
-    first_term = a*S**b
-    second_term = a*phi(gamma = b, H = X)
-    third_term = phi(gamma = 1, H = X)
-    fourth_term = phi(gamma = 1, H = K)
-    fifth_term = K * phi(gamma = 0, H = X)
-    sixth_term = K * phi(gamma = 0, H = K)
+    return integral + norm_cdf(-h) * norm_cdf(-k)
 
-    total = first_term - second_term + third_term - fourth_term - fifth_term + sixth_term
+def _bvn_high_correlation(h: np.ndarray, k: np.ndarray, rho: np.ndarray) -> np.ndarray:
+    """P(X > h, Y > k) for |rho| >= 0.925, integrating over the distance to perfect correlation with the singular part
+    expanded, as in Genz's bvnu. rho of exactly +-1 reduces to the univariate limits.
+    """
 
-    return total
\ No newline at end of file
+    k = np.where(rho < 0, -k, k)
+    hk = h * k
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        a_squared = 1 - rho**2
+        a = np.sqrt(a_squared)
+        b_squared = (h - k)**2
+        b = np.sqrt(b_squared)
+        c = (4 - hk) / 8
+        d = (12 - hk) / 16
+
+        bvn = a * np.exp(-(b_squared / a_squared + hk) / 2) * (1 - c * (b_squared - a_squared) * (1 - d * b_squared / 5) / 3 + c * d * a_squared**2 / 5)
+        bvn -= np.where(hk > -160, np.exp(-hk / 2) * np.sqrt(2 * np.pi) * norm_cdf(-b / a) * b * (1 - c * b_squared * (1 - d * b_squared / 5) / 3), 0)
+
+        half_a = (a / 2)[:, np.newaxis]
+        xs = (half_a * (_GL_NODES + 1))**2
+        rs = np.sqrt(1 - xs)
+        singular = np.exp(-(b_squared[:, np.newaxis] / xs + hk[:, np.newaxis]) / 2)
+        expansion = 1 + c[:, np.newaxis] * xs * (1 + d[:, np.newaxis] * xs)
+        bvn += np.sum(half_a * _GL_WEIGHTS * singular * (np.exp(-hk[:, np.newaxis] * xs / (2 * (1 + rs)**2)) / rs - expansion), axis=-1)
+
+    bvn = np.where(np.abs(rho) < 1, -bvn / (2 * np.pi), 0)
+
+    spread = np.where(h < 0, norm_cdf(k) - norm_cdf(h), norm_cdf(-h) - norm_cdf(-k))
+    return np.where(rho > 0, bvn + norm_cdf(-np.maximum(h, k)), np.where(h >= k, -bvn, spread - bvn))
+
+@instrumented
+def bivariate_normal_cdf(a: np.ndarray, b: np.ndarray, rho: np.ndarray) -> np.ndarray:
+    """P(X < a, Y < b) for standard normals with correlation rho, vectorized over all three arguments. Follows Genz (2004):
+    20 point Gauss-Legendre quadrature over arcsin(rho) for |rho| < 0.925, and for higher correlations quadrature over
+    the distance to perfect correlation, accurate to about 1e-15 for any rho in [-1, 1].
+    """
+
+    a, b, rho = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float), np.asarray(rho, dtype=float))
+    if np.any(np.abs(rho) > 1):
+        raise ValueError("The correlation rho has to lie in [-1, 1]")
+
+    h, k, rho = (-a).ravel(), (-b).ravel(), rho.ravel()
+    low = np.abs(rho) < 0.925
+
+    cdf = np.empty(h.shape)
+    cdf[low] = _bvn_low_correlation(h[low], k[low], rho[low])
+    cdf[~low] = _bvn_high_correlation(h[~low], k[~low], rho[~low])
+
+    return cdf.reshape(a.shape) if a.ndim else cdf[0]
+
+@instrumented
+def _bs2002_phi(S, T, gamma, H, I, r, b, sigma):
+
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    lam = (-r + gamma * b + 0.5 * gamma * (gamma - 1) * sigma**2) * T
+    d = -(np.log(S / H) + (b + (gamma - 0.5) * sigma**2) * T) / sigma_sqrt_T
+    kappa = 2 * b / sigma**2 + (2 * gamma - 1)
+
+    return np.exp(lam) * S**gamma * (norm_cdf(d) - (I / S)**kappa * norm_cdf(d - 2 * np.log(I / S) / sigma_sqrt_T))
+
+@instrumented
+def _bs2002_psi(S, T, gamma, H, I2, I1, t1, r, b, sigma):
+
+    drift_t1 = (b + (gamma - 0.5) * sigma**2) * t1
+    drift_T = (b + (gamma - 0.5) * sigma**2) * T
+    sigma_sqrt_t1 = sigma * np.sqrt(t1)
+    sigma_sqrt_T = sigma * np.sqrt(T)
+
+    e1 = (np.log(S / I1) + drift_t1) / sigma_sqrt_t1
+    e2 = (np.log(I2**2 / (S * I1)) + drift_t1) / sigma_sqrt_t1
+    e3 = (np.log(S / I1) - drift_t1) / sigma_sqrt_t1
+    e4 = (np.log(I2**2 / (S * I1)) - drift_t1) / sigma_sqrt_t1
+
+    f1 = (np.log(S / H) + drift_T) / sigma_sqrt_T
+    f2 = (np.log(I2**2 / (S * H)) + drift_T) / sigma_sqrt_T
+    f3 = (np.log(I1**2 / (S * H)) + drift_T) / sigma_sqrt_T
+    f4 = (np.log(S * I1**2 / (H * I2**2)) + drift_T) / sigma_sqrt_T
+
+    rho = np.sqrt(t1 / T)
+    lam = -r + gamma * b + 0.5 * gamma * (gamma - 1) * sigma**2
+    kappa = 2 * b / sigma**2 + (2 * gamma - 1)
+
+    return np.exp(lam * T) * S**gamma * (
+        bivariate_normal_cdf(-e1, -f1, rho)
+        - (I2 / S)**kappa * bivariate_normal_cdf(-e2, -f2, rho)
+        - (I1 / S)**kappa * bivariate_normal_cdf(-e3, -f3, -rho)
+        + (I1 / I2)**kappa * bivariate_normal_cdf(-e4, -f4, -rho)
+    )
+
+@instrumented
+def _bs2002_call(S, K, T, r, b, sigma) -> np.ndarray:
+    """Bjerksund-Stensland (2002) american call in terms of the cost of carry b, vectorized over every argument"""
+
+    S, K, T, r, b, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r, b, sigma)))
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Two step exercise boundary, flat on [0, t1] and on [t1, T]
+        t1 = 0.5 * (np.sqrt(5) - 1) * T
+        beta = (0.5 - b / sigma**2) + np.sqrt((b / sigma**2 - 0.5)**2 + 2 * r / sigma**2)
+        B_infinity = beta / (beta - 1) * K
+        B_zero = np.where(r - b > 0, np.maximum(K, r / (r - b) * K), K)
+
+        h1 = -(b * t1 + 2 * sigma * np.sqrt(t1)) * K**2 / ((B_infinity - B_zero) * B_zero)
+        h2 = -(b * T + 2 * sigma * np.sqrt(T)) * K**2 / ((B_infinity - B_zero) * B_zero)
+        I1 = B_zero + (B_infinity - B_zero) * (1 - np.exp(h1))
+        I2 = B_zero + (B_infinity - B_zero) * (1 - np.exp(h2))
+        alpha1 = (I1 - K) * I1**(-beta)
+        alpha2 = (I2 - K) * I2**(-beta)
+
+        early_exercise = (
+            alpha2 * S**beta
+            - alpha2 * _bs2002_phi(S, t1, beta, I2, I2, r, b, sigma)
+            + _bs2002_phi(S, t1, 1, I2, I2, r, b, sigma)
+            - _bs2002_phi(S, t1, 1, I1, I2, r, b, sigma)
+            - K * _bs2002_phi(S, t1, 0, I2, I2, r, b, sigma)
+            + K * _bs2002_phi(S, t1, 0, I1, I2, r, b, sigma)
+            + alpha1 * _bs2002_phi(S, t1, beta, I1, I2, r, b, sigma)
+            - alpha1 * _bs2002_psi(S, T, beta, I1, I2, I1, t1, r, b, sigma)
+            + _bs2002_psi(S, T, 1, I1, I2, I1, t1, r, b, sigma)
+            - _bs2002_psi(S, T, 1, K, I2, I1, t1, r, b, sigma)
+            - K * _bs2002_psi(S, T, 0, I1, I2, I1, t1, r, b, sigma)
+            + K * _bs2002_psi(S, T, 0, K, I2, I1, t1, r, b, sigma)
+        )
+
+        # Without a positive dividend yield the call is never exercised early and is worth the european price
+        european = black_scholes_call_price(S=S, K=K, sigma=sigma, r=r, T=T, q=r - b)
+        price = np.where(S >= I2, S - K, early_exercise)
+        price = np.where(b >= r, european, price)
+
+    return np.maximum(price, np.maximum(S - K, 0))
+
+@instrumented
+def bjerksund_stensland_2002_call(S: float, K: float, sigma: float, r: float, T: float, q: float = 0) -> float:
+    """Bjerksund-Stensland (2002) approximation of an american call. Every argument may be an array, in which case the
+    whole set of contracts is priced at once.
+
+    Args:
+        S (float): Underlying price
+        K (float): Strike price
+        sigma (float): Volatility
+        r (float): Risk free rate
+        T (float): Time to expiry in years
+        q (float, optional): Continuous dividend yield. Defaults to 0.
+
+    Returns:
+        float: American call price
+    """
+
+    return _bs2002_call(S=S, K=K, T=T, r=r, b=np.subtract(r, q), sigma=sigma)
+
+@instrumented
+def bjerksund_stensland_2002_put(S: float, K: float, sigma: float, r: float, T: float, q: float = 0) -> float:
+    """Bjerksund-Stensland (2002) approximation of an american put through the put-call transformation
+    P(S, K, T, r, b, sigma) = C(K, S, T, r - b, -b, sigma). Every argument may be an array.
+
+    Args:
+        S (float): Underlying price
+        K (float): Strike price
+        sigma (float): Volatility
+        r (float): Risk free rate
+        T (float): Time to expiry in years
+        q (float, optional): Continuous dividend yield. Defaults to 0.
+
+    Returns:
+        float: American put price
+    """
+
+    b = np.subtract(r, q)
+    return _bs2002_call(S=K, K=S, T=T, r=np.subtract(r, b), b=-b, sigma=sigma)
+
+def bjerskund_stensland_2002_call(S: float, K: float, T: float, r: float, b: float, sigma: float, X: float = None) -> float:
+    """Deprecated misspelled name of the american call pricer with its original argument order. The exercise trigger X is
+    now computed internally and ignored if given. Use bjerksund_stensland_2002_call instead.
+    """
+
+    warnings.warn("bjerskund_stensland_2002_call is deprecated, use bjerksund_stensland_2002_call", DeprecationWarning, stacklevel=2)
+    return _bs2002_call(S=S, K=K, T=T, r=r, b=b, sigma=sigma)
@@ -0,0 +1,269 @@
+import numpy as np
+
+from scipy.optimize import minimize
+from typing import Dict, List, NamedTuple, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+# Log-moneyness grid on which the no-arbitrage conditions are checked
+ARBITRAGE_CHECK_GRID = np.linspace(-1.5, 1.5, 301)
+
+class SVIParameters(NamedTuple):
+    """Raw SVI slice w(k) = a + b * (rho * (k - m) + sqrt((k - m)**2 + sigma**2)), total implied variance against log
+    forward moneyness k = log(K / F)
+    """
+
+    a: float
+    b: float
+    rho: float
+    m: float
+    sigma: float
+
+class SmileFit(NamedTuple):
+    """Fitted slice of one expiry with its root mean square error in implied vol"""
+
+    T: float
+    parameters: SVIParameters
+    rmse: float
+
+class ArbitrageCheck(NamedTuple):
+    """Static arbitrage diagnostics of a surface. min_density holds the smallest value of Gatheral's g(k) per expiry, which
+    has to stay non-negative for the slice to imply a positive density, and min_calendar_gap the smallest increase in total
+    variance from each expiry to the next, which has to stay non-negative for calendar spreads to have positive value.
+    """
+
+    expiries: np.ndarray
+    min_density: np.ndarray
+    min_calendar_gap: np.ndarray
+
+    @property
+    def butterfly_free(self) -> np.ndarray:
+        return self.min_density >= 0
+
+    @property
+    def calendar_free(self) -> np.ndarray:
+        return self.min_calendar_gap >= 0
+
+    @property
+    def is_arbitrage_free(self) -> bool:
+        return bool(np.all(self.butterfly_free) and np.all(self.calendar_free))
+
+def svi_total_variance(k: ArrayLike, a: ArrayLike, b: ArrayLike, rho: ArrayLike, m: ArrayLike, sigma: ArrayLike) -> ArrayLike:
+
+    shifted = k - m
+    return a + b * (rho * shifted + np.sqrt(shifted * shifted + sigma * sigma))
+
+def svi_density(k: np.ndarray, parameters: SVIParameters) -> np.ndarray:
+    """Gatheral's g(k) of a slice, proportional to the risk neutral density. Negative values are butterfly arbitrage."""
+
+    a, b, rho, m, sigma = parameters
+    shifted = k - m
+    root = np.sqrt(shifted**2 + sigma**2)
+
+    w = a + b * (rho * shifted + root)
+    dw = b * (rho + shifted / root)
+    d2w = b * sigma**2 / root**3
+
+    return (1 - k * dw / (2 * w))**2 - dw**2 / 4 * (1 / w + 0.25) + d2w / 2
+
+def _svi_inner_fit(k: np.ndarray, w: np.ndarray, weights: np.ndarray, m: float, sigma: float):
+    """Best a, b and rho for a fixed m and sigma. With y = (k - m) / sigma the slice is linear in (a, b * rho * sigma,
+    b * sigma), so this is a weighted least squares solve, projected onto b >= 0, |rho| <= 1 and a non-negative minimum
+    variance.
+    """
+
+    y = (k - m) / sigma
+    root = np.sqrt(y * y + 1)
+    design = np.stack([np.ones_like(y), y, root], axis=1)
+
+    coefficients = np.linalg.lstsq(design * weights[:, np.newaxis], w * weights, rcond=None)[0]
+    _, d, c = coefficients
+    c = max(c, 0.0)
+    d = min(max(d, -c), c)
+
+    # Refit the level given the projected slope and curvature, then keep the lowest variance non-negative
+    a = np.sum(weights**2 * (w - d * y - c * root)) / np.sum(weights**2)
+    a = max(a, -np.sqrt(max(c * c - d * d, 0.0)))
+
+    residual = weights * (a + d * y + c * root - w)
+    return SVIParameters(a=a, b=c / sigma, rho=d / c if c > 0 else 0.0, m=m, sigma=sigma), float(residual @ residual)
+
+def fit_svi(k: np.ndarray, total_variance: np.ndarray, weights: np.ndarray = None, initial: SVIParameters = None, max_iterations: int = 400) -> SVIParameters:
+    """Fits a raw SVI slice to one expiry with the quasi-explicit method of Zeliade (2009): a Nelder-Mead search over m
+    and sigma, each step solving for the remaining three parameters in closed form.
+
+    Args:
+        k (np.ndarray): Log forward moneyness of every quote
+        total_variance (np.ndarray): Total implied variance iv**2 * T of every quote
+        weights (np.ndarray, optional): Weight of every quote, e.g. its vega or inverse spread. Defaults to None.
+        initial (SVIParameters, optional): Previous fit to start from, which makes refits after small quote changes
+            converge in a few iterations. Defaults to None.
+        max_iterations (int, optional): Iteration cap of the outer search. Defaults to 400.
+
+    Returns:
+        SVIParameters: Fitted slice
+    """
+
+    k = np.asarray(k, dtype=float)
+    w = np.asarray(total_variance, dtype=float)
+    weights = np.ones_like(k) if weights is None else np.sqrt(np.asarray(weights, dtype=float))
+
+    assert len(k) >= 3, "An SVI slice needs at least three quotes"
+
+    if initial is None:
+        start = np.array([k[np.argmin(w)], np.log(0.1)])
+    else:
+        start = np.array([initial.m, np.log(initial.sigma)])
+
+    def objective(x: np.ndarray) -> float:
+        return _svi_inner_fit(k, w, weights, x[0], np.exp(x[1]))[1]
+
+    result = minimize(objective, start, method='Nelder-Mead', options={'maxiter': max_iterations, 'xatol': 1e-8, 'fatol': 1e-14})
+    return _svi_inner_fit(k, w, weights, result.x[0], np.exp(result.x[1]))[0]
+
+class VolSurface:
+    """Implied volatility surface built from per expiry SVI smiles and interpolated linearly in total variance across
+    expiries at fixed log forward moneyness, which carries calendar arbitrage freedom of the slices over to the whole
+    surface. Before the first expiry total variance shrinks to zero with T, after the last one the vol is held flat.
+
+    Quotes are kept per expiry, and changing a few of them only marks their expiry for refitting; refit() warm starts
+    those slices from their previous fit and leaves the rest alone. Queries read the fitted parameters from arrays, so a
+    batch of (K, T) pairs costs a few vectorized operations and a new spot price needs no refit at all.
+
+        surface = VolSurface.from_quotes(S=100, r=0.03, K=strikes, T=expiries, iv=ivs)
+        sigma = surface.vol(chain.strike, chain.time_to_expiry(date.today()))
+    """
+
+    def __init__(self, S: float, r: float, q: float = 0) -> None:
+        self.S = S
+        self.r = r
+        self.q = q
+
+        self._quotes: Dict[float, Dict[float, float]] = {}
+        self._weights: Dict[float, Dict[float, float]] = {}
+        self._fits: Dict[float, SmileFit] = {}
+        self._dirty = set()
+
+        self.expiries = np.empty(0)
+        self._table = np.empty((5, 0))
+
+    @classmethod
+    def from_quotes(cls, S: float, r: float, K: np.ndarray, T: np.ndarray, iv: np.ndarray, q: float = 0, weights: np.ndarray = None) -> 'VolSurface':
+        """Builds and fits a surface from implied vols, one per (K, T) quote"""
+
+        surface = cls(S=S, r=r, q=q)
+        surface.update_quotes(K=K, T=T, iv=iv, weights=weights)
+        surface.refit()
+
+        return surface
+
+    def forward(self, T: ArrayLike) -> ArrayLike:
+        return self.S * np.exp((self.r - self.q) * T)
+
+    def set_spot(self, S: float) -> None:
+        """Moves the underlying price. Smiles are held in forward moneyness, so they move with the spot without a refit."""
+
+        self.S = S
+
+    def update_quotes(self, K: np.ndarray, T: np.ndarray, iv: np.ndarray, weights: np.ndarray = None) -> None:
+        """Adds or overwrites quotes and marks their expiries for refitting. A nan vol removes the quote."""
+
+        K, T, iv = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float), np.asarray(iv, dtype=float))
+        weights = np.broadcast_to(np.asarray(1.0 if weights is None else weights, dtype=float), K.shape)
+
+        for strike, expiry, vol, weight in zip(K.ravel().tolist(), T.ravel().tolist(), iv.ravel().tolist(), weights.ravel().tolist()):
+            quotes = self._quotes.setdefault(expiry, {})
+            if np.isnan(vol):
+                quotes.pop(strike, None)
+                self._weights.get(expiry, {}).pop(strike, None)
+            else:
+                quotes[strike] = vol
+                self._weights.setdefault(expiry, {})[strike] = weight
+
+            self._dirty.add(expiry)
+
+    def refit(self) -> List[float]:
+        """Refits the expiries whose quotes changed since the last fit and returns them. Expiries left with fewer than three
+        quotes are dropped from the surface.
+        """
+
+        refitted = sorted(self._dirty)
+        for expiry in refitted:
+            quotes = self._quotes.get(expiry, {})
+            if len(quotes) < 3:
+                self._fits.pop(expiry, None)
+                continue
+
+            strikes = np.fromiter(quotes.keys(), dtype=float)
+            vols = np.fromiter(quotes.values(), dtype=float)
+            weights = np.fromiter((self._weights[expiry][strike] for strike in quotes), dtype=float)
+
+            k = np.log(strikes / self.forward(expiry))
+            previous = self._fits.get(expiry)
+            parameters = fit_svi(k, vols**2 * expiry, weights=weights, initial=previous.parameters if previous else None)
+
+            fitted_vols = np.sqrt(np.maximum(svi_total_variance(k, *parameters), 0) / expiry)
+            rmse = float(np.sqrt(np.mean((fitted_vols - vols)**2)))
+            self._fits[expiry] = SmileFit(T=expiry, parameters=parameters, rmse=rmse)
+
+        self._dirty.clear()
+
+        # Parameter table with one column per expiry, the cache every query reads from
+        self.expiries = np.array(sorted(self._fits), dtype=float)
+        self._table = np.array([self._fits[expiry].parameters for expiry in self.expiries], dtype=float).reshape(-1, 5).T
+
+        return refitted
+
+    @property
+    def fits(self) -> List[SmileFit]:
+        return [self._fits[expiry] for expiry in self.expiries]
+
+    def _slice_variance(self, k: np.ndarray, index: np.ndarray) -> np.ndarray:
+        a, b, rho, m, sigma = self._table[:, index]
+        return svi_total_variance(k, a, b, rho, m, sigma)
+
+    def total_variance(self, K: ArrayLike, T: ArrayLike) -> np.ndarray:
+        """Total implied variance at every (K, T), broadcast against each other"""
+
+        assert len(self.expiries) > 0, "The surface has no fitted expiries, add quotes and call refit() first"
+
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = np.log(K / self.forward(T))
+
+        # Bracketing slices, clamped to the first and last expiry outside of the quoted range
+        upper = np.clip(np.searchsorted(self.expiries, T), 0, len(self.expiries) - 1)
+        lower = np.maximum(upper - 1, 0)
+        lower_T, upper_T = self.expiries[lower], self.expiries[upper]
+
+        lower_w = self._slice_variance(k, lower)
+        upper_w = self._slice_variance(k, upper)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(upper > lower, (T - lower_T) / (upper_T - lower_T), 1.0)
+        w = lower_w + weight * (upper_w - lower_w)
+
+        # Outside the quoted expiries the nearest slice is scaled to hold its implied vol at that moneyness
+        outside = (T < self.expiries[0]) | (T > self.expiries[-1])
+        w = np.where(outside, upper_w * T / upper_T, w)
+
+        return np.maximum(w, 0)
+
+    def vol(self, K: ArrayLike, T: ArrayLike) -> ArrayLike:
+        """Implied vol at every (K, T). Returns a float for scalar inputs and an array otherwise."""
+
+        vols = np.sqrt(self.total_variance(K, T) / T)
+        return float(vols) if vols.ndim == 0 else vols
+
+    def check_arbitrage(self, k: np.ndarray = ARBITRAGE_CHECK_GRID) -> ArbitrageCheck:
+        """Checks every slice for butterfly arbitrage and every pair of consecutive slices for calendar arbitrage on a log
+        forward moneyness grid
+        """
+
+        min_density = np.array([np.min(svi_density(k, fit.parameters)) for fit in self.fits])
+        slices = np.array([svi_total_variance(k, *fit.parameters) for fit in self.fits])
+        min_calendar_gap = np.min(np.diff(slices, axis=0), axis=1) if len(slices) > 1 else np.empty(0)
+
+        return ArbitrageCheck(expiries=self.expiries.copy(), min_density=min_density, min_calendar_gap=min_calendar_gap)
+
+    def __repr__(self) -> str:
+        return f"VolSurface({len(self.expiries)} expiries, S={self.S})"
@@ -1,9 +1,16 @@
 import pandas as pd
 import numpy as np
 
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
 def gk_element(bar: pd.Series) -> float:
 
-    elem = 0.511 * (np.log(bar.high/bar.low))**2 - 0.019*np.log(bar.close/bar.open)*np.log(bar.high*bar.low/bar.open**2) - 2*np.log(bar.high/bar.open)*np.log(bar.low/bar.open)
+    u = np.log(bar.high/bar.open)
+    d = np.log(bar.low/bar.open)
+    c = np.log(bar.close/bar.open)
+
+    elem = 0.511*(u - d)**2 - 0.019*(c*(u + d) - 2*u*d) - 0.383*c**2
 
     return elem
 
@@ -17,14 +24,107 @@ def roger_satchell_element(bar: pd.Series) -> float:
 
     return np.log(bar.high/bar.close)*np.log(bar.high/bar.open) + np.log(bar.low/bar.close)*np.log(bar.low/bar.open)
 
+def _ohlc_arrays(ohlc_bars: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
 
-def garman_klass_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_period: int = 30) -> float:
+    return tuple(ohlc_bars[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close'))
+
+class _CumulativeSums:
+    """Cumulative sums of a series and of its squares. Any trailing window sum is then a single subtraction, so every
+    rolling window of every length comes out of one pass over the data.
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        missing = np.isnan(values)
+        clean = np.where(missing, 0.0, values)
+
+        self.length = len(values)
+        self.sums = np.concatenate([[0.0], np.cumsum(clean)])
+        self.squares = np.concatenate([[0.0], np.cumsum(clean**2)])
+        self.missing = np.concatenate([[0], np.cumsum(missing)])
+
+    def window(self, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Trailing window sums of the values and of their squares. Windows that are incomplete or contain a nan come
+        back as nan, matching DataFrame.rolling(window).
+        """
+
+        assert window >= 1, "The rolling window has to be at least one bar long"
+
+        sums = np.full(self.length, np.nan)
+        squares = np.full(self.length, np.nan)
+        sums[window - 1:] = self.sums[window:] - self.sums[:-window]
+        squares[window - 1:] = self.squares[window:] - self.squares[:-window]
+
+        incomplete = np.ones(self.length, dtype=bool)
+        incomplete[window - 1:] = (self.missing[window:] - self.missing[:-window]) > 0
+        sums[incomplete] = np.nan
+        squares[incomplete] = np.nan
+
+        return sums, squares
+
+    def mean(self, window: int) -> np.ndarray:
+
+        sums, _ = self.window(window)
+        return sums / window
+
+    def variance(self, window: int) -> np.ndarray:
+        """Rolling sample variance with an n - 1 denominator"""
+
+        assert window >= 2, "A sample variance needs a window of at least two bars"
+
+        sums, squares = self.window(window)
+        return np.maximum(squares - sums**2 / window, 0) / (window - 1)
+
+ESTIMATORS = ['garman_klass', 'parkinson', 'roger_satchell', 'close_to_close', 'yang_zhang']
+
+def _rolling_variances(ohlc_bars: pd.DataFrame, estimator: str, rolling_periods: List[int]) -> Dict[int, np.ndarray]:
+    """Per bar variance of an estimator over each rolling period, computed column-wise on the raw arrays"""
+
+    assert estimator in ESTIMATORS, f"The estimator must be one of {', '.join(ESTIMATORS)}"
+
+    open_, high, low, close = _ohlc_arrays(ohlc_bars)
+    log_high_low = np.log(high / low)
+    log_high_open = np.log(high / open_)
+    log_low_open = np.log(low / open_)
+    log_close_open = np.log(close / open_)
+    previous_close = np.concatenate([[np.nan], close[:-1]])
 
-    assert trading_days >= 1
+    if estimator == 'parkinson':
+        elements = (1/(4*np.log(2))) * log_high_low**2
+    elif estimator == 'garman_klass':
+        elements = (0.511 * log_high_low**2 - 0.019 * (log_close_open * (log_high_open + log_low_open) - 2 * log_high_open * log_low_open)
+                    - 0.383 * log_close_open**2)
+    elif estimator in ('roger_satchell', 'yang_zhang'):
+        elements = (log_high_open - log_close_open) * log_high_open + (log_low_open - log_close_open) * log_low_open
+    else:
+        elements = np.log(close / previous_close)
 
-    gk_elements = ohlc_bars.apply(ohlc_bars, axis = 0)
-    gk_variances = gk_elements.rolling(rolling_period).mean()
-    gk_vol = gk_variances.apply(np.sqrt) * np.sqrt(trading_days)
+    sums = _CumulativeSums(elements)
+    if estimator == 'yang_zhang':
+        overnight_sums = _CumulativeSums(np.log(open_ / previous_close))
+        open_to_close_sums = _CumulativeSums(log_close_open)
+
+    variances = {}
+    for window in rolling_periods:
+        if estimator == 'close_to_close':
+            variances[window] = sums.variance(window)
+        elif estimator == 'yang_zhang':
+            # Overnight variance plus a mix of the open to close and Rogers-Satchell variances weighted to minimise the estimator variance
+            k = 0.34 / (1.34 + (window + 1) / (window - 1))
+            variances[window] = overnight_sums.variance(window) + k * open_to_close_sums.variance(window) + (1 - k) * sums.mean(window)
+        else:
+            variances[window] = sums.mean(window)
+
+    return variances
+
+def _rolling_vol(ohlc_bars: pd.DataFrame, estimator: str, trading_days: int, rolling_period: int) -> pd.Series:
+
+    variances = _rolling_variances(ohlc_bars, estimator, [rolling_period])[rolling_period]
+    return pd.Series(np.sqrt(variances) * np.sqrt(trading_days), index=ohlc_bars.index)
+
+def garman_klass_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_period: int = 30) -> float:
+
+    assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
+    gk_vol = _rolling_vol(ohlc_bars, 'garman_klass', trading_days, rolling_period)
 
     return gk_vol
 
@@ -32,17 +132,185 @@ def garman_klass_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_pe
 def parkinson_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_period: int = 30) -> float:
 
     assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
-    parkinson_variances = (1/(4*np.log(2)))*ohlc_bars.apply(parkinson_element, axis = 1).rolling(rolling_period).mean()
-    parkinson_vol = (parkinson_variances ** 0.5 ) * np.sqrt(trading_days)
+    parkinson_vol = _rolling_vol(ohlc_bars, 'parkinson', trading_days, rolling_period)
 
     return parkinson_vol
 
 def roger_satchell_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_period: int = 30) -> float:
 
     assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
-    roger_satchell_variances = ohlc_bars.apply(roger_satchell_element, axis = 1).rolling(rolling_period).mean()
-    roger_satchell_vol = roger_satchell_variances ** 0.5 * np.sqrt(trading_days)
+    roger_satchell_vol = _rolling_vol(ohlc_bars, 'roger_satchell', trading_days, rolling_period)
 
     return roger_satchell_vol
 
+def close_to_close_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_period: int = 30) -> float:
+
+    assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
+    close_to_close_vol = _rolling_vol(ohlc_bars, 'close_to_close', trading_days, rolling_period)
+
+    return close_to_close_vol
+
+def yang_zhang_vol(ohlc_bars: pd.DataFrame, trading_days: int = 21, rolling_period: int = 30) -> float:
+
+    assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
+    yang_zhang_vol = _rolling_vol(ohlc_bars, 'yang_zhang', trading_days, rolling_period)
+
+    return yang_zhang_vol
+
+def rolling_vols(ohlc_bars: pd.DataFrame, rolling_periods: List[int], estimator: str = 'parkinson', trading_days: int = 21) -> pd.DataFrame:
+    """Computes one estimator over several rolling windows at once. The log price relatives and their cumulative sums are
+    built once and every window is read off them, so each extra window costs a subtraction rather than another pass.
+
+    Args:
+        ohlc_bars (pd.DataFrame): Bars with open, high, low and close columns
+        rolling_periods (List[int]): Window lengths in bars
+        estimator (str, optional): One of ESTIMATORS. Defaults to 'parkinson'.
+        trading_days (int, optional): Annualisation factor in bars. Defaults to 21.
+
+    Returns:
+        pd.DataFrame: One column of vols per rolling period, indexed like the bars
+    """
+
+    assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
+
+    variances = _rolling_variances(ohlc_bars, estimator, rolling_periods)
+    vols = {window: np.sqrt(variance) * np.sqrt(trading_days) for window, variance in variances.items()}
+
+    return pd.DataFrame(vols, index=ohlc_bars.index)
+
+class StreamingVolEstimator(ABC):
+    """Incremental rolling range-based vol estimator for live bar feeds. The per bar variance contributions of the last
+    rolling_period bars are kept in a ring buffer alongside their running sum, so each new bar updates the vol in constant
+    time instead of re-scanning history. The running sum is re-added from the buffer every time the ring wraps around,
+    which stops floating point drift from building up over a long session.
+
+    A bar with a missing or non-finite price is held in the window as nan and left out of the running sum, so the vol is
+    nan while it is in the window and recovers once it rolls out, like DataFrame.rolling.
+    """
+
+    def __init__(self, rolling_period: int = 30, trading_days: int = 21) -> None:
+
+        assert rolling_period >= 1, "The rolling window has to be at least one bar long"
+        assert trading_days >= 1, "The trading days have to be greater than or equal to 1"
+
+        self.rolling_period = rolling_period
+        self.trading_days = trading_days
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = np.zeros(self.rolling_period)
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._missing = 0
+
+    @abstractmethod
+    def elements(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        """Per bar variance contribution of the estimator"""
+
+    def _to_vol(self, variance_sums):
+        return np.sqrt(np.maximum(variance_sums / self.rolling_period, 0)) * np.sqrt(self.trading_days)
+
+    @property
+    def is_ready(self) -> bool:
+        return self._count == self.rolling_period
+
+    @property
+    def vol(self) -> float:
+        """Current rolling vol, nan until a full window of bars has been seen"""
+
+        if not self.is_ready or self._missing:
+            return np.nan
+
+        return float(self._to_vol(self._sum))
+
+    def _history(self) -> np.ndarray:
+        """Elements currently in the window, oldest first"""
+
+        if not self.is_ready:
+            return self._buffer[:self._count]
+
+        return np.concatenate([self._buffer[self._index:], self._buffer[:self._index]])
+
+    def update(self, open_, high, low, close):
+        """Adds one bar, or a micro-batch of bars as arrays, to the window
+
+        Args:
+            open_: Open price or array of open prices
+            high: High price or array of high prices
+            low: Low price or array of low prices
+            close: Close price or array of close prices
+
+        Returns:
+            The updated vol for a single bar, or an array holding the vol after each bar of a micro-batch
+        """
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            elements = self.elements(*(np.asarray(x, dtype=float) for x in (open_, high, low, close)))
+        elements = np.where(np.isfinite(elements), elements, np.nan)
+
+        if np.ndim(elements) == 0:
+            element = float(elements)
+            leaving = self._buffer[self._index] if self.is_ready else 0.0
+
+            if np.isnan(leaving):
+                self._missing -= 1
+            else:
+                self._sum -= leaving
+
+            if np.isnan(element):
+                self._missing += 1
+            else:
+                self._sum += element
+
+            self._buffer[self._index] = element
+            self._index = (self._index + 1) % self.rolling_period
+            self._count = min(self._count + 1, self.rolling_period)
+
+            if self._index == 0:
+                self._sum = float(np.nansum(self._buffer))
+
+            return self.vol
+
+        history = self._history()
+        combined = np.concatenate([history, elements])
+        missing = np.isnan(combined)
+        cumulative = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, combined))])
+        cumulative_missing = np.concatenate([[0], np.cumsum(missing)])
+
+        ends = np.arange(len(history) + 1, len(combined) + 1)
+        starts = np.maximum(ends - self.rolling_period, 0)
+        complete = (ends - self.rolling_period >= 0) & (cumulative_missing[ends] == cumulative_missing[starts])
+        window_sums = np.where(complete, cumulative[ends] - cumulative[starts], np.nan)
+
+        tail = combined[-self.rolling_period:]
+        self._buffer[:len(tail)] = tail
+        self._count = len(tail)
+        self._index = self._count % self.rolling_period
+        self._sum = float(np.nansum(tail))
+        self._missing = int(np.isnan(tail).sum())
+
+        return self._to_vol(window_sums)
+
+    def update_bar(self, bar) -> float:
+        """Adds one bar given as anything with open, high, low and close attributes, such as a row of a bar DataFrame"""
+
+        return self.update(bar.open, bar.high, bar.low, bar.close)
+
+class StreamingParkinsonVol(StreamingVolEstimator):
+
+    def elements(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        return (1/(4*np.log(2))) * np.log(high/low)**2
+
+class StreamingGarmanKlassVol(StreamingVolEstimator):
+
+    def elements(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        u = np.log(high/open_)
+        d = np.log(low/open_)
+        c = np.log(close/open_)
+        return 0.511*(u - d)**2 - 0.019*(c*(u + d) - 2*u*d) - 0.383*c**2
+
+class StreamingRogerSatchellVol(StreamingVolEstimator):
 
+    def elements(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        return np.log(high/close)*np.log(high/open_) + np.log(low/close)*np.log(low/open_)
@@ -1,10 +1,35 @@
+import functools
 import numpy as np
 
 from options.funcs import time_to_expiry
-from options.models.pricing_models import black_scholes_call_price, black_scholes_put_price
+from options.models.pricing_models import black_scholes_call_price, black_scholes_put_price, bjerksund_stensland_2002_call, bjerksund_stensland_2002_put
 from options.models.greeks import delta_bs, gamma_bs, vega_bs, theta_bs, rho_bs
+from options.models.lattice import binomial_greeks, LatticeGreeks
 from datetime import date
 from options.enums import OptionClass, OptionExerciseType
+from options.cache import cached_pricing
+
+@functools.lru_cache(maxsize=1024)
+def _scalar_lattice_greeks(S: float, K: float, sigma: float, r: float, T: float, q: float, is_call: bool) -> LatticeGreeks:
+    return LatticeGreeks(*(float(x) for x in binomial_greeks(S=S, K=K, sigma=sigma, r=r, T=T, q=q, is_call=is_call)))
+
+def _lattice_greeks(option, S, sigma, r, T, q) -> LatticeGreeks:
+    """Greeks of an american contract from one binomial tree. Scalar inputs are memoised on the contract and market state,
+    so delta, gamma, theta, vega and rho of one contract share a single tree.
+    """
+
+    is_call = option.option_class == OptionClass.CALL
+    if all(np.ndim(x) == 0 for x in (S, sigma, r, T, q)):
+        return _scalar_lattice_greeks(float(S), float(option.strike), float(sigma), float(r), float(T), float(q), is_call)
+
+    return binomial_greeks(S=S, K=option.strike, sigma=sigma, r=r, T=T, q=q, is_call=is_call)
+
+def _no_greeks(exercise_type: OptionExerciseType) -> ValueError:
+
+    if exercise_type == OptionExerciseType.BERMUDAN:
+        return ValueError("bermudan options carry no exercise dates, use options.models.lattice.binomial_greeks with their exercise times")
+
+    return ValueError(f"{exercise_type.name.lower()} options have no closed form greeks, use options.models.monte_carlo instead")
 
 class CallOption:
 
@@ -25,64 +50,86 @@ class CallOption:
     def time_to_expiry(self, start_date: date) -> float:
         return time_to_expiry(expiry_date=self.expiry_date, start_date=start_date)
 
+    @cached_pricing('price')
     def black_scholes_price(self, S: float, sigma: float, r: float, T: float = None, q: float = 0) -> float:
         if T is None:
             T = self.time_to_expiry(start_date=date.today())
 
-        if OptionExerciseType.EUROPEAN:
-            vals = black_scholes_call_price(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
-        elif OptionExerciseType.AMERICAN:
-            # TODO implement the american call option scheme
+        if self.exercise_type == OptionExerciseType.AMERICAN:
+            vals = bjerksund_stensland_2002_call(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
+        elif self.exercise_type in (OptionExerciseType.EUROPEAN, OptionExerciseType.BERMUDAN):
+            # Without its exercise dates a bermudan option is priced at its european lower bound, as it always was
             vals = black_scholes_call_price(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
+        else:
+            raise ValueError(f"{self.exercise_type.name.lower()} options have no closed form price, use options.models.monte_carlo instead")
 
         return vals
 
+    @cached_pricing('delta')
     def delta(self, S, sigma: float, r: float, T: float, q: float):
 
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            # Need to implement a method for getting the delta for american options that is not black scholes
-            delta = delta_bs(option_type='call', S = S, sigma = sigma, K = self.strike, r = r, T = T, q = q)
+            delta = _lattice_greeks(self, S, sigma, r, T, q).delta
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             delta = delta_bs(option_type='call', S = S, sigma = sigma, K = self.strike, r = r, T = T, q = q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return delta
 
+    @cached_pricing('gamma')
     def gamma(self, S, sigma: float, r: float, T: float, q: float) -> float:
 
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            gamma = gamma_bs(S, self.strike, sigma, r, T, q)
+            gamma = _lattice_greeks(self, S, sigma, r, T, q).gamma
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             gamma = gamma_bs(S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return gamma
 
+    @cached_pricing('vega')
     def vega(self, S, sigma: float, r: float, T: float, q: float) -> float:
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            vega = vega_bs(S, self.strike, sigma, r, T, q)
+            vega = _lattice_greeks(self, S, sigma, r, T, q).vega
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             vega = vega_bs(S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return vega
 
+    @cached_pricing('rho')
     def rho(self, S, sigma: float, r: float, T: float, q: float) -> float:
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            rho = rho_bs('call', S, self.strike, sigma, r, T, q)
+            rho = _lattice_greeks(self, S, sigma, r, T, q).rho
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             rho = rho_bs('call', S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return rho
 
+    @cached_pricing('theta')
     def theta(self, S, sigma: float, r: float, T: float, q: float) -> float:
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            theta = theta_bs('call', S, self.strike, sigma, r, T, q)
+            theta = _lattice_greeks(self, S, sigma, r, T, q).theta
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             theta = theta_bs('call', S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return theta
 
     def __repr__(self) -> str:
@@ -115,62 +162,86 @@ class PutOption:
     def time_to_expiry(self, start_date: date) -> float:
         return time_to_expiry(expiry_date=self.expiry_date, start_date=start_date)
 
+    @cached_pricing('price')
     def black_scholes_price(self, S: float, sigma: float, r: float, T: float = None, q: float = 0) -> float:
         if T is None:
             T = self.time_to_expiry(start_date=date.today())
 
-        if OptionExerciseType.EUROPEAN:
-            black_scholes_put_price(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
-        elif OptionExerciseType.AMERICAN:
-            # TODO implement the american call option scheme
-            black_scholes_put_price(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
+        if self.exercise_type == OptionExerciseType.AMERICAN:
+            vals = bjerksund_stensland_2002_put(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
+        elif self.exercise_type in (OptionExerciseType.EUROPEAN, OptionExerciseType.BERMUDAN):
+            # Without its exercise dates a bermudan option is priced at its european lower bound, as it always was
+            vals = black_scholes_put_price(S = S, K = self.strike, sigma = sigma, r = r, T = T, q = q)
+        else:
+            raise ValueError(f"{self.exercise_type.name.lower()} options have no closed form price, use options.models.monte_carlo instead")
+
+        return vals
 
+    @cached_pricing('delta')
     def delta(self, S, sigma: float, r: float, T: float, q: float):
 
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            # Need to implement a method for getting the delta for american options that is not black scholes
-            delta = delta_bs(option_type='put', S = S, sigma = sigma, K = self.strike, r = r, T = T, q = q)
+            delta = _lattice_greeks(self, S, sigma, r, T, q).delta
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             delta = delta_bs(option_type='put', S = S, sigma = sigma, K = self.strike, r = r, T = T, q = q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return delta
 
+    @cached_pricing('gamma')
     def gamma(self, S, sigma: float, r: float, T: float, q: float) -> float:
 
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            gamma = gamma_bs(S, self.strike, sigma, r, T, q)
+            gamma = _lattice_greeks(self, S, sigma, r, T, q).gamma
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             gamma = gamma_bs(S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return gamma
 
+    @cached_pricing('vega')
     def vega(self, S, sigma: float, r: float, T: float, q: float) -> float:
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            vega = vega_bs(S, self.strike, sigma, r, T, q)
+            vega = _lattice_greeks(self, S, sigma, r, T, q).vega
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             vega = vega_bs(S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return vega
 
+    @cached_pricing('rho')
     def rho(self, S, sigma: float, r: float, T: float, q: float) -> float:
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            rho = rho_bs('put', S, self.strike, sigma, r, T, q)
+            rho = _lattice_greeks(self, S, sigma, r, T, q).rho
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             rho = rho_bs('put', S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return rho
 
+    @cached_pricing('theta')
     def theta(self, S, sigma: float, r: float, T: float, q: float) -> float:
         if self.exercise_type == OptionExerciseType.AMERICAN:
-            theta = theta_bs('put', S, self.strike, sigma, r, T, q)
+            theta = _lattice_greeks(self, S, sigma, r, T, q).theta
 
         elif self.exercise_type == OptionExerciseType.EUROPEAN:
             theta = theta_bs('put', S, self.strike, sigma, r, T, q)
 
+        else:
+            raise _no_greeks(self.exercise_type)
+
         return theta
 
     def __repr__(self) -> str:
@@ -0,0 +1,145 @@
+import numpy as np
+
+from options.enums import OptionClass
+from typing import List
+
+class PiecewiseLinearPayoff:
+    """Expiry P&L of a book of options as a continuous piecewise linear function of the underlying price. The function is
+    stored as its kinks, which sit at the strikes, the P&L at every kink and the slope on every interval, so evaluating it
+    on n prices is a binary search per price rather than a pass over every leg.
+
+    slopes[0] applies below the first breakpoint, slopes[i] between breakpoints[i - 1] and breakpoints[i], and slopes[-1]
+    above the last breakpoint. Prices are on [0, inf).
+    """
+
+    def __init__(self, breakpoints: np.ndarray, values: np.ndarray, slopes: np.ndarray) -> None:
+
+        self.breakpoints = np.asarray(breakpoints, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self.slopes = np.asarray(slopes, dtype=float)
+
+        assert len(self.breakpoints) >= 1, "A payoff needs at least one breakpoint"
+        assert len(self.values) == len(self.breakpoints), "There has to be one value per breakpoint"
+        assert len(self.slopes) == len(self.breakpoints) + 1, "There has to be one slope per interval between and around the breakpoints"
+
+    @classmethod
+    def from_legs(cls, strikes: np.ndarray, is_call: np.ndarray, weights: np.ndarray, cost: float = 0) -> 'PiecewiseLinearPayoff':
+        """Builds the payoff of a set of option legs in O(n log n)
+
+        Args:
+            strikes (np.ndarray): Strike of every leg
+            is_call (np.ndarray): True for calls, False for puts
+            weights (np.ndarray): Signed quantity of every leg, negative for short legs
+            cost (float, optional): Net cost of the book, subtracted from the payoff everywhere. Defaults to 0.
+
+        Returns:
+            PiecewiseLinearPayoff: Expiry P&L of the legs
+        """
+
+        strikes = np.asarray(strikes, dtype=float)
+        is_call = np.asarray(is_call, dtype=bool)
+        weights = np.asarray(weights, dtype=float)
+
+        if len(strikes) == 0:
+            return cls(breakpoints=[0.0], values=[-cost], slopes=[0.0, 0.0])
+
+        breakpoints, leg_index = np.unique(strikes, return_inverse=True)
+        leg_index = leg_index.ravel()
+
+        # Below every strike only the puts pay off, each with slope -weight. Crossing a strike adds the weight of every leg
+        # struck there: a call starts rising and a put stops falling.
+        kink = np.bincount(leg_index, weights=weights, minlength=len(breakpoints))
+        slopes = np.concatenate([[-np.sum(weights[~is_call])], kink]).cumsum()
+
+        first_value = np.sum(weights[~is_call] * (strikes[~is_call] - breakpoints[0])) - cost
+        values = first_value + np.concatenate([[0.0], np.cumsum(slopes[1:-1] * np.diff(breakpoints))])
+
+        return cls(breakpoints=breakpoints, values=values, slopes=slopes)
+
+    @classmethod
+    def from_chain(cls, chain) -> 'PiecewiseLinearPayoff':
+        """Payoff of an OptionChain, net of the costs and transaction costs of its rows"""
+
+        cost = np.sum(chain.side * chain.cost) + np.sum(chain.transaction_cost)
+        return cls.from_legs(strikes=chain.strike, is_call=chain.is_call, weights=chain.signed_quantity, cost=cost)
+
+    @classmethod
+    def from_positions(cls, positions: List) -> 'PiecewiseLinearPayoff':
+        """Payoff of a list of positions, net of their costs and transaction costs"""
+
+        return cls.from_legs(
+            strikes=[position.option.strike for position in positions],
+            is_call=[position.option.option_class == OptionClass.CALL for position in positions],
+            weights=[position.side.value * position.quantity for position in positions],
+            cost=sum(position.side.value * position.cost + position.transaction_cost for position in positions)
+        )
+
+    def evaluate(self, prices: np.ndarray) -> np.ndarray:
+        """P&L at each price, in O(n log k) for n prices and k breakpoints"""
+
+        prices = np.asarray(prices, dtype=float)
+        interval = np.searchsorted(self.breakpoints, prices, side='right')
+        anchor = np.clip(interval - 1, 0, len(self.breakpoints) - 1)
+
+        return self.values[anchor] + self.slopes[interval] * (prices - self.breakpoints[anchor])
+
+    def __call__(self, prices: np.ndarray) -> np.ndarray:
+        return self.evaluate(prices)
+
+    def __add__(self, other: 'PiecewiseLinearPayoff') -> 'PiecewiseLinearPayoff':
+        """Payoff of two books held together"""
+
+        breakpoints = np.union1d(self.breakpoints, other.breakpoints)
+        values = self.evaluate(breakpoints) + other.evaluate(breakpoints)
+
+        # One point inside every interval of the merged breakpoints picks out the slope of each payoff there
+        midpoints = np.concatenate([[breakpoints[0] - 1], (breakpoints[:-1] + breakpoints[1:]) / 2, [breakpoints[-1] + 1]])
+        slopes = self.slopes[np.searchsorted(self.breakpoints, midpoints)] + other.slopes[np.searchsorted(other.breakpoints, midpoints)]
+
+        return PiecewiseLinearPayoff(breakpoints=breakpoints, values=values, slopes=slopes)
+
+    def _nodes(self) -> np.ndarray:
+        """Zero price and every breakpoint, the only places a bounded extremum can sit"""
+
+        return np.union1d([0.0], self.breakpoints[self.breakpoints >= 0])
+
+    @property
+    def max_profit(self) -> float:
+        """Largest P&L over all prices, inf if the book gains without bound as the price rises"""
+
+        if self.slopes[-1] > 0:
+            return np.inf
+
+        return float(np.max(self.evaluate(self._nodes())))
+
+    @property
+    def max_loss(self) -> float:
+        """Smallest P&L over all prices as a negative number for a loss, -inf if the loss is unbounded"""
+
+        if self.slopes[-1] < 0:
+            return -np.inf
+
+        return float(np.min(self.evaluate(self._nodes())))
+
+    def breakevens(self) -> np.ndarray:
+        """Sorted prices at which the P&L crosses or touches zero"""
+
+        nodes = self._nodes()
+        values = self.evaluate(nodes)
+        roots = [nodes[values == 0]]
+
+        # Crossings strictly inside a segment between consecutive nodes
+        crossing = values[:-1] * values[1:] < 0
+        left, right = nodes[:-1][crossing], nodes[1:][crossing]
+        left_value, right_value = values[:-1][crossing], values[1:][crossing]
+        roots.append(left - left_value * (right - left) / (right_value - left_value))
+
+        # Crossing on the ray above the last breakpoint
+        last_value, last_slope = values[-1], self.slopes[-1]
+        if last_value * last_slope < 0:
+            roots.append([nodes[-1] - last_value / last_slope])
+
+        return np.unique(np.concatenate(roots))
+
+    def __repr__(self) -> str:
+        return f"PiecewiseLinearPayoff({len(self.breakpoints)} breakpoints, max profit {self.max_profit:.4g}, max loss {self.max_loss:.4g})"
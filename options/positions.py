@@ -4,6 +4,29 @@ from datetime import date
 from typing import Union, List
 from options.options import CallOption, PutOption
 from options.enums import TradeSide
+from options.payoff import PiecewiseLinearPayoff
+
+def _position_fields(position: 'Position') -> tuple:
+    option = position.option
+    return (id(position), position.side, position.quantity, position.cost, position.transaction_cost, id(option),
+            option.strike, option.expiry_date, option.option_class, option.exercise_type)
+
+def positions_key(positions: List['Position']) -> List[tuple]:
+    """Identity and contents of every leg, so caches built from a list of positions notice legs being replaced or edited
+    in place as well as added or removed
+    """
+
+    return [_position_fields(position) for position in positions]
+
+def positions_unchanged(positions: List['Position'], key: List[tuple]) -> bool:
+    """Whether the positions still match a key from positions_key. Legs are compared one at a time, so checking a large
+    book allocates nothing that grows with its size.
+    """
+
+    if key is None or len(key) != len(positions):
+        return False
+
+    return all(_position_fields(position) == fields for position, fields in zip(positions, key))
 
 class Position:
 
@@ -19,10 +42,10 @@ class Position:
         return self.side.value * self.quantity * self.option.intrinsic_value(price = price)
 
     def values_at_expiry(self, prices: np.array) -> np.array:
-        return self.side.value * self.option.values_at_expiry(prices=prices)
+        return self.side.value * self.quantity * self.option.values_at_expiry(prices=prices)
 
     def black_scholes_value(self, S: float, sigma: float, r: float, T: float = None, q: float = 0) -> float:
-        return self.side.value * self.option.black_scholes_price(S, sigma, r, T, q)
+        return self.side.value * self.quantity * self.option.black_scholes_price(S, sigma, r, T, q)
 
     def delta(self, S, sigma: float, r: float, T: float, q: float) -> float:
         return self.side.value * self.quantity * self.option.delta(S, sigma, r, T, q)
@@ -31,13 +54,13 @@ class Position:
         return self.side.value * self.quantity * self.option.gamma(S, sigma, r, T, q)
 
     def vega(self, S, sigma: float, r: float, T: float, q: float) -> float:
-        return self.side.value * self.quantity * self.vega(S, sigma, r, T, q)
+        return self.side.value * self.quantity * self.option.vega(S, sigma, r, T, q)
 
     def rho(self, S, sigma: float, r: float, T: float, q: float) -> float:
-        return self.side.value * self.quantity * self.rho(S, sigma, r, T, q)
+        return self.side.value * self.quantity * self.option.rho(S, sigma, r, T, q)
 
     def theta(self, S, sigma: float, r: float, T: float, q: float) -> float:
-        return self.side.value * self.quantity * self.theta(S, sigma, r, T, q)
+        return self.side.value * self.quantity * self.option.theta(S, sigma, r, T, q)
 
     def profit_at_expiry(self, price: float) -> float:
         """Calculates the profit at expiry for this trade
@@ -61,32 +84,25 @@ class Position:
         Returns:
             np.array: Profits at expiry as a numpy array
         """
-        values_at_expiry = self.position.values_at_expiry(prices=prices)
+        values_at_expiry = self.values_at_expiry(prices=prices)
 
         return values_at_expiry - self.side.value * self.cost - self.transaction_cost
 
     def black_scholes_profit(self, S: float, sigma: float, r: float, T: float = None, q: float = 0):
 
-        position_value = self.position.black_scholes_value(S, sigma, r, T, q)
+        position_value = self.black_scholes_value(S, sigma, r, T, q)
 
         return position_value - self.side.value * self.cost
 
-    def intrinsic_value(self, price: float) -> float:
-        """Returns the intrinsic value of this trade which is inherited by the underlying position object
-
-        Args:
-            price (float): _description_
-
-        Returns:
-            float: _description_
-        """
-
-        return self.position.intrinsic_value(price=price)
+# Strategies with at most this many legs sum their legs in profits_at_expiry instead of evaluating the payoff
+SMALL_STRATEGY_LEGS = 8
 
 class Strategy:
 
     def __init__(self, positions: List[Position]) -> None:
         self.positions = positions
+        self._payoff = None
+        self._payoff_key = None
 
     def profit_at_expiry(self, price: float) -> float:
 
@@ -96,12 +112,26 @@ class Strategy:
 
         return profit
 
+    def payoff(self) -> PiecewiseLinearPayoff:
+        """Expiry P&L of the strategy as a piecewise linear function, with its break-evens and max profit and loss. Rebuilt
+        whenever positions are added, removed, replaced or edited.
+        """
+
+        if self._payoff is None or not positions_unchanged(self.positions, self._payoff_key):
+            self._payoff = PiecewiseLinearPayoff.from_positions(self.positions)
+            self._payoff_key = positions_key(self.positions)
+
+        return self._payoff
+
     def profits_at_expiry(self, prices: np.array) -> np.array:
 
-        profits = np.zeros(shape = prices.shape)
+        if len(self.positions) > SMALL_STRATEGY_LEGS:
+            return self.payoff().evaluate(prices)
 
-        for trade in self.positions:
-            profits += trade.profits_at_expiry(prices=prices)
+        # A handful of legs is cheaper to sum directly than to check and evaluate the payoff
+        profits = np.zeros(shape=np.shape(prices))
+        for position in self.positions:
+            profits += position.profits_at_expiry(prices=prices)
 
         return profits
 
@@ -0,0 +1,120 @@
+import numpy as np
+
+from datetime import date
+from typing import Dict, List, NamedTuple, Union
+from options.chain import OptionChain, model_batch
+from options.positions import Position
+from options.models.batch import BlackScholesBatch
+
+MarketInput = Union[float, np.ndarray, Dict[str, float]]
+
+# Floors keeping today's valuation and the shocked scenarios inside the domain of the pricing models. A contract whose
+# remaining time hits the floor is valued at its intrinsic value.
+MIN_SCENARIO_VOL = 1e-6
+MIN_SCENARIO_TIME = 1e-10
+
+# Upper bound on contracts x scenarios evaluated at once, which caps the memory of a risk matrix run at a few hundred MB
+MAX_BLOCK_ELEMENTS = 2_000_000
+
+class RiskMatrix(NamedTuple):
+    """P&L and greek cubes of a book indexed by [spot shock, vol shock, time step]"""
+
+    spot_shocks: np.ndarray
+    vol_shocks: np.ndarray
+    time_steps: np.ndarray
+    pnl: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    rho: np.ndarray
+    theta: np.ndarray
+
+def risk_matrix(positions: Union[List[Position], OptionChain], S: MarketInput, sigma: MarketInput, r: float, spot_shocks: np.ndarray,
+                vol_shocks: np.ndarray = (0.0,), time_steps: np.ndarray = (0.0,), T: np.ndarray = None, q: MarketInput = 0) -> RiskMatrix:
+    """Revalues a book over every combination of spot shock, vol shock and elapsed time. The scenario grid is broadcast
+    against the contracts and evaluated with model_batch, which uses Black-Scholes for european legs and the models of the
+    option classes for american ones, in blocks of contracts so memory stays bounded however large the book.
+
+    Args:
+        positions (Union[List[Position], OptionChain]): Positions of the book, or the book already packed into a chain
+        S (MarketInput): Underlying price, one per position, or a dictionary of prices keyed by underlying
+        sigma (MarketInput): Volatility, one per position, or a dictionary keyed by underlying
+        r (float): Risk free rate
+        spot_shocks (np.ndarray): Relative moves of every underlying, e.g. -0.1 for a 10% drop
+        vol_shocks (np.ndarray, optional): Absolute vol moves, e.g. 0.05 for five vol points up. Defaults to (0.0,).
+        time_steps (np.ndarray, optional): Elapsed time in years. Defaults to (0.0,).
+        T (np.ndarray, optional): Time to expiry per position. Defaults to None, which uses each position's time to expiry from today.
+        q (MarketInput, optional): Dividend yield, one per position, or a dictionary keyed by underlying. Defaults to 0.
+
+    Returns:
+        RiskMatrix: P&L against today's model value and position greeks, each of shape (spot shocks, vol shocks, time steps)
+    """
+
+    chain = positions if isinstance(positions, OptionChain) else OptionChain.from_positions(positions)
+
+    spot_shocks = np.atleast_1d(np.asarray(spot_shocks, dtype=float))
+    vol_shocks = np.atleast_1d(np.asarray(vol_shocks, dtype=float))
+    time_steps = np.atleast_1d(np.asarray(time_steps, dtype=float))
+
+    S = chain.market_array(S)
+    sigma = chain.market_array(sigma)
+    q = chain.market_array(q)
+    if T is None:
+        T = chain.time_to_expiry(start_date=date.today())
+    T = chain.market_array(T)
+
+    # Positions in the same contract under the same market inputs revalue identically, so net them before the grid is applied
+    contracts = np.stack([S, chain.strike, sigma, T, q, chain.is_call.astype(float), chain.exercise_type.astype(float)], axis=1)
+    contracts, contract_index = np.unique(contracts, axis=0, return_inverse=True)
+    weights = np.bincount(contract_index.ravel(), weights=chain.signed_quantity, minlength=len(contracts))
+    S, K, sigma, T, q = contracts[:, :5].T
+    is_call = contracts[:, 5].astype(bool)
+    exercise_type = contracts[:, 6].astype(np.int8)
+
+    # Today's value goes through the same floors as the scenarios, so a leg expiring today is worth its intrinsic value
+    # rather than nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base_prices = model_batch(
+            S=S, K=K, sigma=np.maximum(sigma, MIN_SCENARIO_VOL), r=r, T=np.maximum(T, MIN_SCENARIO_TIME), q=q, is_call=is_call,
+            exercise_type=exercise_type
+        ).price
+    base_value = np.sum(weights * base_prices)
+
+    grid_shape = (len(spot_shocks), len(vol_shocks), len(time_steps))
+    cubes = {name: np.zeros(grid_shape) for name in BlackScholesBatch._fields}
+
+    # Scenario axes first, contracts along the last axis so each block reduces with one sum
+    spot_factor = (1 + spot_shocks)[:, np.newaxis, np.newaxis, np.newaxis]
+    vol_shift = vol_shocks[np.newaxis, :, np.newaxis, np.newaxis]
+    time_shift = time_steps[np.newaxis, np.newaxis, :, np.newaxis]
+
+    block_size = max(1, MAX_BLOCK_ELEMENTS // int(np.prod(grid_shape)))
+    for start in range(0, len(contracts), block_size):
+        block = slice(start, start + block_size)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            batch = model_batch(
+                S=S[block] * spot_factor,
+                K=K[block],
+                sigma=np.maximum(sigma[block] + vol_shift, MIN_SCENARIO_VOL),
+                r=r,
+                T=np.maximum(T[block] - time_shift, MIN_SCENARIO_TIME),
+                q=q[block],
+                is_call=is_call[block],
+                exercise_type=exercise_type[block]
+            )
+
+        for name, values in zip(batch._fields, batch):
+            cubes[name] += np.sum(values * weights[block], axis=-1)
+
+    return RiskMatrix(
+        spot_shocks=spot_shocks,
+        vol_shocks=vol_shocks,
+        time_steps=time_steps,
+        pnl=cubes['price'] - base_value,
+        delta=cubes['delta'],
+        gamma=cubes['gamma'],
+        vega=cubes['vega'],
+        rho=cubes['rho'],
+        theta=cubes['theta']
+    )
@@ -1,94 +1,412 @@
+import numpy as np
+
+from options.cache import cached_batch
 from options.options import CallOption, PutOption
-from options.enums import TradeSide
+from options.enums import TradeSide, OptionClass
 from options.positions import Position
 from options.enums import OptionExerciseType
+from options.funcs import time_to_expiry_vectorized
+from options.models.batch import black_scholes_batch, BlackScholesBatch
+from options.payoff import PiecewiseLinearPayoff
+from options.strategy import BookGreeks
 from datetime import date
+from typing import List, NamedTuple, Sequence, Tuple, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+class SpreadLeg(NamedTuple):
+    """One leg of a spread template. strike and expiry index the strike and expiry columns of the spread, so a butterfly
+    has three strike columns and a calendar spread two expiry columns. An option class of None takes the class the spread
+    is built with, which lets one template serve both the call and the put version.
+    """
+
+    option_class: OptionClass
+    ratio: int
+    strike: int = 0
+    expiry: int = 0
+
+class SpreadTemplate(NamedTuple):
+    """Legs of a multi-leg strategy, held long. Selling the spread flips the side of every leg."""
+
+    name: str
+    legs: Tuple[SpreadLeg, ...]
+
+    @property
+    def n_strikes(self) -> int:
+        return max(leg.strike for leg in self.legs) + 1
+
+    @property
+    def n_expiries(self) -> int:
+        return max(leg.expiry for leg in self.legs) + 1
+
+STRADDLE = SpreadTemplate('straddle', (SpreadLeg(OptionClass.CALL, 1), SpreadLeg(OptionClass.PUT, 1)))
+STRANGLE = SpreadTemplate('strangle', (SpreadLeg(OptionClass.PUT, 1, strike=0), SpreadLeg(OptionClass.CALL, 1, strike=1)))
+BUTTERFLY = SpreadTemplate('butterfly', (SpreadLeg(None, 1, strike=0), SpreadLeg(None, -2, strike=1), SpreadLeg(None, 1, strike=2)))
+CONDOR = SpreadTemplate('condor', (SpreadLeg(None, 1, strike=0), SpreadLeg(None, -1, strike=1), SpreadLeg(None, -1, strike=2), SpreadLeg(None, 1, strike=3)))
+IRON_CONDOR = SpreadTemplate('iron condor', (
+    SpreadLeg(OptionClass.PUT, 1, strike=0), SpreadLeg(OptionClass.PUT, -1, strike=1),
+    SpreadLeg(OptionClass.CALL, -1, strike=2), SpreadLeg(OptionClass.CALL, 1, strike=3)
+))
+CALENDAR_SPREAD = SpreadTemplate('calendar spread', (SpreadLeg(None, -1, expiry=0), SpreadLeg(None, 1, expiry=1)))
+BULL_SPREAD = SpreadTemplate('bull spread', (SpreadLeg(None, 1, strike=0), SpreadLeg(None, -1, strike=1)))
+BEAR_SPREAD = SpreadTemplate('bear spread', (SpreadLeg(None, -1, strike=0), SpreadLeg(None, 1, strike=1)))
+
+def strike_combinations(strikes: np.ndarray, count: int, max_width: float = np.inf) -> np.ndarray:
+    """Every combination of count distinct strikes in increasing order, e.g. count=4 for every condor in a chain
+
+    Args:
+        strikes (np.ndarray): Listed strikes, duplicates are dropped
+        count (int): Number of strikes per combination
+        max_width (float, optional): Drop combinations whose outer strikes are further apart than this. Defaults to np.inf.
+
+    Returns:
+        np.ndarray: Array of shape (n_combinations, count)
+    """
+
+    assert count >= 1, "A combination needs at least one strike"
+
+    strikes = np.unique(np.asarray(strikes, dtype=float))
+
+    # End of the strikes within max_width of each strike. Combinations grow one column at a time from the prefixes that can
+    # still be completed inside that window, so nothing wider than max_width is ever built.
+    window_end = np.searchsorted(strikes, strikes + max_width, side='right')
+
+    first = np.arange(len(strikes))
+    index = first[window_end - first >= count][:, np.newaxis]
+
+    for column in range(1, count):
+        lower = index[:, -1] + 1
+        upper = window_end[index[:, 0]] - (count - column - 1)
+        choices = np.maximum(upper - lower, 0)
+
+        rows = np.repeat(np.arange(len(index)), choices)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(choices) - choices, choices)
+        index = np.column_stack([index[rows], lower[rows] + offsets])
+
+    return strikes[index]
+
+class SpreadBatch:
+    """Any number of instances of one spread template, stored as arrays and evaluated together. Prices, greeks and expiry
+    payoffs of every instance come out of one black_scholes_batch call over an (instances, legs) grid, so scoring every
+    iron condor in a chain costs a handful of array operations rather than a method call per leg per spread.
+
+    Args:
+        template (SpreadTemplate): Legs of the spread
+        strikes (np.ndarray): Strikes of shape (instances, template.n_strikes), one column per strike of the template
+        option_class (OptionClass, optional): Class of the legs the template leaves open. Defaults to OptionClass.CALL.
+        side (ArrayLike, optional): TradeSide, or +1/-1 per instance. Defaults to TradeSide.LONG.
+        quantity (ArrayLike, optional): Number of spreads held per instance. Defaults to 1.
+        cost (ArrayLike, optional): Net amount paid for each instance, negative for a credit. Defaults to 0.
+    """
+
+    def __init__(self, template: SpreadTemplate, strikes: np.ndarray, option_class: OptionClass = OptionClass.CALL,
+                 side: Union[TradeSide, ArrayLike] = TradeSide.LONG, quantity: ArrayLike = 1, cost: ArrayLike = 0) -> None:
+
+        self.template = template
+        self.strikes = np.atleast_2d(np.asarray(strikes, dtype=float))
+        self.option_class = option_class
+
+        assert self.strikes.shape[1] == template.n_strikes, f"A {template.name} needs {template.n_strikes} strike columns"
+
+        n = len(self.strikes)
+        side = side.value if isinstance(side, TradeSide) else side
+        self.side = np.broadcast_to(np.asarray(side, dtype=float), (n,))
+        self.quantity = np.broadcast_to(np.asarray(quantity, dtype=float), (n,))
+        self.cost = np.broadcast_to(np.asarray(cost, dtype=float), (n,))
+
+        # Leg level columns, shape (legs,) for the template and (instances, legs) once laid over the strikes
+        self.leg_is_call = np.array([(leg.option_class or option_class) == OptionClass.CALL for leg in template.legs])
+        self.leg_expiry = np.array([leg.expiry for leg in template.legs])
+        self.leg_strikes = self.strikes[:, [leg.strike for leg in template.legs]]
+        self.leg_weights = (self.side * self.quantity)[:, np.newaxis] * np.array([leg.ratio for leg in template.legs], dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+    def __getitem__(self, key) -> 'SpreadBatch':
+        """Sub-batch selected by an index array, boolean mask or slice, e.g. the top scoring instances"""
+
+        if isinstance(key, (int, np.integer)):
+            key = [key]
+
+        return SpreadBatch(template=self.template, strikes=self.strikes[key], option_class=self.option_class,
+                           side=self.side[key], quantity=self.quantity[key], cost=self.cost[key])
+
+    def __repr__(self) -> str:
+        return f"SpreadBatch({len(self)} {self.template.name} instances)"
+
+    def _leg_market(self, value: ArrayLike, columns: np.ndarray = None) -> np.ndarray:
+        """Expands a scalar, one value per instance or one value per instance and column to shape (instances, legs)"""
+
+        value = np.asarray(value, dtype=float)
+        if value.ndim == 2:
+            if value.shape[1] == 1:
+                return np.broadcast_to(value, self.leg_strikes.shape)
+            return value if columns is None else value[:, columns]
+
+        return np.broadcast_to(value.reshape(-1, 1) if value.ndim == 1 else value, self.leg_strikes.shape)
+
+    def black_scholes(self, S: ArrayLike, sigma: ArrayLike, r: float, T: ArrayLike, q: ArrayLike = 0) -> BlackScholesBatch:
+        """Model value and greeks of every instance, signed by side and scaled by quantity
+
+        Args:
+            S (ArrayLike): Underlying price, or one per instance
+            sigma (ArrayLike): Volatility, one per instance, or one per instance and leg to price along a smile
+            r (float): Risk free rate
+            T (ArrayLike): Time to expiry, one per instance, or one per instance and expiry column of the template
+            q (ArrayLike, optional): Dividend yield, or one per instance. Defaults to 0.
+
+        Returns:
+            BlackScholesBatch: price, delta, gamma, vega, theta and rho arrays of shape (instances,)
+        """
+
+        legs = black_scholes_batch(
+            S=self._leg_market(S), K=self.leg_strikes, sigma=self._leg_market(sigma), r=r,
+            T=self._leg_market(T, columns=self.leg_expiry), q=self._leg_market(q), is_call=self.leg_is_call
+        )
+
+        return BlackScholesBatch(*(np.sum(self.leg_weights * values, axis=1) for values in legs))
+
+    def prices(self, S: ArrayLike, sigma: ArrayLike, r: float, T: ArrayLike, q: ArrayLike = 0) -> np.ndarray:
+        return self.black_scholes(S, sigma, r, T, q).price
+
+    def _values_at(self, prices: np.ndarray) -> np.ndarray:
+        """Expiry value of every instance at its own row of prices, prices of shape (instances, m)"""
+
+        assert self.template.n_expiries == 1, f"The legs of a {self.template.name} do not expire together, so it has no single expiry payoff"
+
+        moneyness = prices[:, :, np.newaxis] - self.leg_strikes[:, np.newaxis, :]
+        payoffs = np.maximum(np.where(self.leg_is_call, moneyness, -moneyness), 0)
+
+        return np.einsum('nml,nl->nm', payoffs, self.leg_weights)
+
+    def values_at_expiry(self, prices: np.ndarray) -> np.ndarray:
+        """Expiry value of every instance at every price, of shape (instances, len(prices))"""
+
+        prices = np.asarray(prices, dtype=float)
+        return self._values_at(np.broadcast_to(prices, (len(self), len(prices))))
 
-class Staddle:
+    def profits_at_expiry(self, prices: np.ndarray) -> np.ndarray:
+        """Expiry P&L of every instance at every price net of its cost, of shape (instances, len(prices))"""
+
+        return self.values_at_expiry(prices) - self.cost[:, np.newaxis]
+
+    def _node_profits(self) -> np.ndarray:
+        """P&L of every instance at zero and at each of its strikes, where its extrema sit"""
+
+        nodes = np.concatenate([np.zeros((len(self), 1)), self.strikes], axis=1)
+        return self._values_at(nodes) - self.cost[:, np.newaxis]
+
+    def _slope_above_strikes(self) -> np.ndarray:
+        return np.sum(self.leg_weights * self.leg_is_call, axis=1)
+
+    @property
+    def max_profit(self) -> np.ndarray:
+        """Largest expiry P&L of every instance, inf where the profit is unbounded"""
+
+        return np.where(self._slope_above_strikes() > 0, np.inf, self._node_profits().max(axis=1))
+
+    @property
+    def max_loss(self) -> np.ndarray:
+        """Smallest expiry P&L of every instance as a negative number for a loss, -inf where the loss is unbounded"""
+
+        return np.where(self._slope_above_strikes() < 0, -np.inf, self._node_profits().min(axis=1))
+
+    def payoff(self, index: int) -> PiecewiseLinearPayoff:
+        """Expiry P&L of one instance as a piecewise linear function, for its break-evens"""
+
+        return PiecewiseLinearPayoff.from_legs(strikes=self.leg_strikes[index], is_call=self.leg_is_call,
+                                               weights=self.leg_weights[index], cost=self.cost[index])
+
+class MultiLegSpread:
+    """A single spread built from a template. Its positions are ordinary Position objects, and its prices, greeks and
+    payoff go through a one instance SpreadBatch, the same path used for batches of thousands.
+    """
+
+    template: SpreadTemplate = None
+
+    def __init__(self, underlying: str, strikes: Sequence[float], quantity: int, exercise_type: OptionExerciseType,
+                 expiry_dates: Sequence[date], trade_side: TradeSide = TradeSide.LONG, option_class: OptionClass = OptionClass.CALL,
+                 cost: float = 0) -> None:
+
+        assert list(strikes) == sorted(strikes), "The strikes have to be given in increasing order"
+        assert list(expiry_dates) == sorted(expiry_dates), "The expiry dates have to be given in increasing order"
 
-    def __init__(self, underlying: str, strike: float, quantity: int, exercise_type: OptionExerciseType, expiry_date: date, trade_side: TradeSide = TradeSide.LONG) -> None:
         self.underlying = underlying
-        self.strike = strike
-        self.trade_side = trade_side
+        self.strikes = tuple(strikes)
         self.quantity = quantity
         self.exercise_type = exercise_type
-        self.expiry_date = expiry_date
+        self.expiry_dates = tuple(expiry_dates)
+        self.trade_side = trade_side
+        self.option_class = option_class
+        self.cost = cost
 
-        call = self._create_call()
-        put = self._create_put()
+        self.batch = SpreadBatch(template=self.template, strikes=[self.strikes], option_class=option_class, side=trade_side,
+                                 quantity=quantity, cost=cost)
+        self.positions = self._create_positions()
 
-        self.call_position = Position(side = self.trade_side, quantity = self.quantity, option = call)
-        self.put_position = Position(sdie = self.trade_side, quantity = self.quantity, option=put)
+    def _create_positions(self) -> List[Position]:
+        """One Position per leg holding the leg's ratio times the spread quantity. Positions hold whole contracts, so a
+        quantity leaving any leg with a fractional number of contracts is rejected rather than truncated.
+        """
 
-        self.positions = [self.call_position, self.put_position]
+        if not np.all(self.batch.leg_weights == np.round(self.batch.leg_weights)):
+            raise ValueError(f"A quantity of {self.quantity} leaves the legs of the {self.template.name} with fractional contracts, "
+                             "use a SpreadBatch for fractional quantities")
 
-    def _create_call(self) -> CallOption:
-        call_option = CallOption(
-            underlying=self.underlying,
-            strike=self.strike,
-            exercise_type=self.exercise_type,
-            expiry_date=self.expiry_date
-        )
+        positions = []
+        for leg, is_call, weight in zip(self.template.legs, self.batch.leg_is_call, self.batch.leg_weights[0]):
+            option_type = CallOption if is_call else PutOption
+            option = option_type(
+                underlying=self.underlying,
+                strike=self.strikes[leg.strike],
+                exercise_type=self.exercise_type,
+                expiry_date=self.expiry_dates[leg.expiry]
+            )
+            side = TradeSide.LONG if weight > 0 else TradeSide.SHORT
+            positions.append(Position(side=side, quantity=int(round(abs(weight))), option=option))
 
-        return call_option
+        return positions
 
-    def _create_put(self) -> PutOption:
-        put_option = PutOption(
-            underlying=self.underlying,
-            strike=self.strike,
-            exercise_type=self.exercise_type,
-            expiry_date=self.expiry_date
-        )
+    def _market_inputs(self, sigma: ArrayLike, T: ArrayLike = None) -> Tuple[np.ndarray, np.ndarray]:
+        """sigma and T as a single row of the batch, one vol per leg and one time per expiry date if given as sequences"""
+
+        if T is None:
+            T = time_to_expiry_vectorized(expiry_dates=list(self.expiry_dates), start_dates=date.today())
 
-        return put_option
+        return np.atleast_2d(np.asarray(sigma, dtype=float)), np.atleast_2d(np.asarray(T, dtype=float))
 
     def intrinsic_value(self, price: float) -> float:
         value = 0
         for pos in self.positions:
-            value +=  pos.intrinsic_value(price = price)
+            value += pos.intrinsic_value(price = price)
 
         return value
 
-    def delta(self) -> float:
-        pass
+    def payoff(self) -> PiecewiseLinearPayoff:
+        """Expiry P&L of the spread net of its cost as a piecewise linear function, with its break-evens and max profit and loss"""
+
+        return self.batch.payoff(0)
+
+    def profits_at_expiry(self, prices: np.array) -> np.array:
+        return self.batch.profits_at_expiry(prices)[0]
+
+    def _black_scholes(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> BlackScholesBatch:
+        """Value and greeks of the spread's single batch row, through the pricing cache when one is enabled"""
+
+        sigma, T = self._market_inputs(sigma, T)
+        contracts = (self.batch.leg_strikes, self.batch.leg_weights, self.batch.leg_is_call, self.batch.leg_expiry)
+
+        return cached_batch('spread_greeks', (self.underlying,), contracts, (S, sigma, r, T, q),
+                            lambda: self.batch.black_scholes(S, sigma, r, T, q))
+
+    def black_scholes_value(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> float:
+        return float(self._black_scholes(S, sigma, r, T, q).price[0])
+
+    def greeks(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> BookGreeks:
+        """Black-Scholes greeks of the whole spread, signed by side and scaled by quantity. sigma may give one vol per leg
+        and T one time per expiry date of the spread.
+        """
+
+        batch = self._black_scholes(S, sigma, r, T, q)
+        return BookGreeks(delta=float(batch.delta[0]), gamma=float(batch.gamma[0]), vega=float(batch.vega[0]),
+                          rho=float(batch.rho[0]), theta=float(batch.theta[0]))
+
+    def delta(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).delta
+
+    def gamma(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).gamma
+
+    def vega(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).vega
+
+    def rho(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).rho
+
+    def theta(self, S: float, sigma: ArrayLike, r: float, T: ArrayLike = None, q: float = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).theta
+
+    def __repr__(self) -> str:
+        strikes = '/'.join(f"{strike:g}" for strike in self.strikes)
+        expiries = '/'.join(str(expiry_date) for expiry_date in self.expiry_dates)
+        return f"{self.trade_side.name} {self.quantity} {self.underlying} {expiries} {strikes} {self.template.name}"
+
+class Straddle(MultiLegSpread):
+
+    template = STRADDLE
+
+    def __init__(self, underlying: str, strike: float, quantity: int, exercise_type: OptionExerciseType, expiry_date: date, trade_side: TradeSide = TradeSide.LONG, cost: float = 0) -> None:
+        super().__init__(underlying, [strike], quantity, exercise_type, [expiry_date], trade_side=trade_side, cost=cost)
+        self.strike = strike
+        self.expiry_date = expiry_date
+
+        self.call_position, self.put_position = self.positions
+
+# Kept under its original, misspelled name so existing imports keep working
+Staddle = Straddle
+
+class Strangle(MultiLegSpread):
+
+    template = STRANGLE
+
+    def __init__(self, underlying: str, put_strike: float, call_strike: float, quantity: int, exercise_type: OptionExerciseType, expiry_date: date, trade_side: TradeSide = TradeSide.LONG, cost: float = 0) -> None:
+        super().__init__(underlying, [put_strike, call_strike], quantity, exercise_type, [expiry_date], trade_side=trade_side, cost=cost)
+
+class Butterfly(MultiLegSpread):
 
-    def vega(self) -> float:
-        pass
+    template = BUTTERFLY
 
-    def rho(self) -> float:
-        pass
+    def __init__(self, underlying: str, low_strike: float, middle_strike: float, high_strike: float, quantity: int, exercise_type: OptionExerciseType, expiry_date: date,
+                 option_class: OptionClass = OptionClass.CALL, trade_side: TradeSide = TradeSide.LONG, cost: float = 0) -> None:
+        super().__init__(underlying, [low_strike, middle_strike, high_strike], quantity, exercise_type, [expiry_date], trade_side=trade_side, option_class=option_class, cost=cost)
 
-    def theta(self) -> float:
-        pass
+class Condor(MultiLegSpread):
 
+    template = CONDOR
 
-class Strangle:
+    def __init__(self, underlying: str, strikes: Sequence[float], quantity: int, exercise_type: OptionExerciseType, expiry_date: date,
+                 option_class: OptionClass = OptionClass.CALL, trade_side: TradeSide = TradeSide.LONG, cost: float = 0) -> None:
+        super().__init__(underlying, strikes, quantity, exercise_type, [expiry_date], trade_side=trade_side, option_class=option_class, cost=cost)
 
-    def __init__(self) -> None:
-        pass
+class IronCondor(MultiLegSpread):
+    """Short put spread below the market and short call spread above it, entered for a credit. It keeps the credit when the
+    price ends between the two short strikes. Sell it for a reverse iron condor.
+    """
 
+    template = IRON_CONDOR
 
-class Butterfly:
+    def __init__(self, underlying: str, strikes: Sequence[float], quantity: int, exercise_type: OptionExerciseType, expiry_date: date, trade_side: TradeSide = TradeSide.LONG, cost: float = 0) -> None:
+        super().__init__(underlying, strikes, quantity, exercise_type, [expiry_date], trade_side=trade_side, cost=cost)
 
-    def __init__(self) -> None:
-        pass
+class CalendarSpread(MultiLegSpread):
+    """Sells the near expiry and buys the far expiry at the same strike. The legs expire apart, so it has greeks and a model
+    value but no expiry payoff.
+    """
 
-class Condor:
+    template = CALENDAR_SPREAD
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, underlying: str, strike: float, quantity: int, exercise_type: OptionExerciseType, near_expiry_date: date, far_expiry_date: date,
+                 option_class: OptionClass = OptionClass.CALL, trade_side: TradeSide = TradeSide.LONG, cost: float = 0) -> None:
+        assert near_expiry_date < far_expiry_date, "The near expiry has to come before the far expiry"
+        super().__init__(underlying, [strike], quantity, exercise_type, [near_expiry_date, far_expiry_date], trade_side=trade_side, option_class=option_class, cost=cost)
 
-class CalendarSpread:
+class BullSpread(MultiLegSpread):
+    """Long the low strike and short the high strike, with calls for a debit or puts for a credit"""
 
-    def __init__(self) -> None:
-        pass
+    template = BULL_SPREAD
 
-class BullSpread:
+    def __init__(self, underlying: str, low_strike: float, high_strike: float, quantity: int, exercise_type: OptionExerciseType, expiry_date: date,
+                 option_class: OptionClass = OptionClass.CALL, cost: float = 0) -> None:
+        assert low_strike < high_strike, "The low strike has to be strictly less than the high strike!"
+        super().__init__(underlying, [low_strike, high_strike], quantity, exercise_type, [expiry_date], option_class=option_class, cost=cost)
 
-    def __init__(self) -> None:
-        pass
+class BearSpread(MultiLegSpread):
+    """Short the low strike and long the high strike, with puts for a debit or calls for a credit"""
 
-class BearSpread:
+    template = BEAR_SPREAD
 
-    def __init__(self) -> None:
-        pass
\ No newline at end of file
+    def __init__(self, underlying: str, low_strike: float, high_strike: float, quantity: int, exercise_type: OptionExerciseType, expiry_date: date,
+                 option_class: OptionClass = OptionClass.PUT, cost: float = 0) -> None:
+        assert low_strike < high_strike, "The low strike has to be strictly less than the high strike!"
+        super().__init__(underlying, [low_strike, high_strike], quantity, exercise_type, [expiry_date], option_class=option_class, cost=cost)
@@ -1,70 +1,152 @@
-from options.positions import Position
-from typing import List
+import numpy as np
 
-def get_total_delta(positions: List[Position]) -> float:
+from datetime import date
+from options.positions import Position, positions_key, positions_unchanged
+from options.chain import OptionChain
+from options.payoff import PiecewiseLinearPayoff
+from options.risk import risk_matrix, RiskMatrix
+from typing import Dict, List, NamedTuple, Tuple, Union
 
-    delta = 0
-    for pos in positions:
-        delta += pos.delta()
+MarketInput = Union[float, np.ndarray, Dict[str, float]]
 
-    return delta
+class BookGreeks(NamedTuple):
+    """Position level greeks, signed by trade side and scaled by quantity"""
 
-def get_total_gamma(positions: List[Position]) -> float:
+    delta: float
+    gamma: float
+    vega: float
+    rho: float
+    theta: float
 
-    gamma = 0
-    for pos in positions:
-        gamma += pos.gamma()
+def _position_greeks(chain: OptionChain, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> np.ndarray:
+    """Signed, quantity scaled greeks of every row of the chain as an array of shape (5, len(chain)), from the same models
+    as the greeks of the option classes
+    """
 
-    return gamma
+    batch = chain.model_greeks(S=chain.market_array(S), sigma=chain.market_array(sigma), r=r, T=T, q=chain.market_array(q))
+    per_contract = np.stack([batch.delta, batch.gamma, batch.vega, batch.rho, batch.theta])
 
-def get_total_vega(positions: List[Position]) -> float:
+    return per_contract * chain.signed_quantity
 
-    vega = 0
-    for pos in positions:
-        vega += pos.vega()
+def get_total_greeks(positions: Union[List[Position], OptionChain], S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> BookGreeks:
+    """Computes all five greeks for a whole book in a single batched call. European legs use Black-Scholes and american
+    legs the binomial tree greeks of the option classes, one tree per expiry.
 
-    return vega
+    Args:
+        positions (Union[List[Position], OptionChain]): Positions of the book, or the book already packed into a chain
+        S (MarketInput): Underlying price, one per position, or a dictionary of prices keyed by underlying
+        sigma (MarketInput): Volatility, one per position, or a dictionary keyed by underlying
+        r (float): Risk free rate
+        T (float, optional): Time to expiry. Defaults to None, which uses each position's time to expiry from today.
+        q (MarketInput, optional): Dividend yield, one per position, or a dictionary keyed by underlying. Defaults to 0.
 
-def get_total_rho(positions: List[Position]) -> float:
-    rho = 0
-    for pos in positions:
-        rho += pos.rho()
+    Returns:
+        BookGreeks: Total delta, gamma, vega, rho and theta of the book
+    """
 
-    return rho
+    chain = positions if isinstance(positions, OptionChain) else OptionChain.from_positions(positions)
+    totals = _position_greeks(chain, S, sigma, r, T, q).sum(axis=1)
 
-def get_total_theta(positions: List[Position]) -> float:
-    theta = 0
-    for pos in positions:
-        theta += pos.theta()
+    return BookGreeks(*(float(total) for total in totals))
 
-    return theta
+def get_total_delta(positions: List[Position], S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+    return get_total_greeks(positions, S, sigma, r, T, q).delta
+
+def get_total_gamma(positions: List[Position], S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+    return get_total_greeks(positions, S, sigma, r, T, q).gamma
+
+def get_total_vega(positions: List[Position], S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+    return get_total_greeks(positions, S, sigma, r, T, q).vega
+
+def get_total_rho(positions: List[Position], S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+    return get_total_greeks(positions, S, sigma, r, T, q).rho
+
+def get_total_theta(positions: List[Position], S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+    return get_total_greeks(positions, S, sigma, r, T, q).theta
 
 class Strategy:
 
     def __init__(self, positions: List[Position]) -> None:
         self.positions = positions
+        self._chain = None
+        self._chain_key = None
+
+    @property
+    def chain(self) -> OptionChain:
+        """Columnar copy of the positions, rebuilt whenever a position is added, removed, replaced or edited"""
+
+        if self._chain is None or not positions_unchanged(self.positions, self._chain_key):
+            self._chain = OptionChain.from_positions(self.positions)
+            self._chain_key = positions_key(self.positions)
+
+        return self._chain
+
+    def save(self, path: str) -> None:
+        """Saves the legs of the strategy in the binary book format. OptionChain.load(path) maps them straight back into
+        the batched pricing functions without rebuilding any Position objects.
+        """
+
+        self.chain.save(path)
+
+    def payoff(self) -> PiecewiseLinearPayoff:
+        """Expiry P&L of the strategy as a piecewise linear function, with its break-evens and max profit and loss"""
+
+        return PiecewiseLinearPayoff.from_chain(self.chain)
+
+    def profits_at_expiry(self, prices: np.array) -> np.array:
+        return self.payoff().evaluate(prices)
 
     def intrinsic_value(self, price: float) -> float:
 
         value = 0
         for pos in self.positions:
-            value += pos.quantity * pos.side.value * pos.intrinsic_value(price=price)
+            value += pos.intrinsic_value(price=price)
 
         return value
 
-    def delta(self) -> float:
-        return get_total_delta(positions=self.positions)
+    def greeks(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> BookGreeks:
+        return get_total_greeks(self.chain, S, sigma, r, T, q)
+
+    def greeks_by_underlying_and_expiry(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> Dict[Tuple[str, date], BookGreeks]:
+        """Greeks of the book aggregated per underlying and expiry, from the same single batched evaluation as greeks()
+
+        Returns:
+            Dict[Tuple[str, date], BookGreeks]: Greeks keyed by (underlying, expiry date)
+        """
+
+        chain = self.chain
+        position_greeks = _position_greeks(chain, S, sigma, r, T, q)
+
+        keys = np.stack([chain.underlying_id.astype(np.int64), chain.expiry_ordinal.astype(np.int64)], axis=1)
+        groups, group_index = np.unique(keys, axis=0, return_inverse=True)
+        group_index = group_index.ravel()
+
+        totals = np.zeros((position_greeks.shape[0], len(groups)))
+        for row in range(position_greeks.shape[0]):
+            totals[row] = np.bincount(group_index, weights=position_greeks[row], minlength=len(groups))
+
+        return {
+            (chain.underlyings[underlying_id], date.fromordinal(int(expiry_ordinal))): BookGreeks(*(float(total) for total in totals[:, i]))
+            for i, (underlying_id, expiry_ordinal) in enumerate(groups)
+        }
+
+    def delta(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).delta
 
-    def gamma(self) -> float:
-        return get_total_gamma(positions=self.positions)
+    def gamma(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).gamma
 
-    def vega(self) -> float:
-        return get_total_vega(positions=self.positions)
+    def vega(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).vega
 
-    def rho(self) -> float:
-        return get_total_rho(positions=self.positions)
+    def rho(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).rho
 
-    def theta(self) -> float:
-        return get_total_theta(positions=self.positions)
+    def theta(self, S: MarketInput, sigma: MarketInput, r: float, T: float = None, q: MarketInput = 0) -> float:
+        return self.greeks(S, sigma, r, T, q).theta
 
+    def risk_matrix(self, S: MarketInput, sigma: MarketInput, r: float, spot_shocks: np.ndarray, vol_shocks: np.ndarray = (0.0,),
+                    time_steps: np.ndarray = (0.0,), T: np.ndarray = None, q: MarketInput = 0) -> RiskMatrix:
+        """P&L and greeks of the strategy over a grid of spot shocks, vol shocks and elapsed time. See options.risk.risk_matrix."""
 
+        return risk_matrix(self.chain, S, sigma, r, spot_shocks, vol_shocks, time_steps, T, q)
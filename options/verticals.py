@@ -1,8 +1,16 @@
+import numpy as np
+
 from options.options import CallOption, PutOption
 from options.positions import Position
+from options.chain import OptionChain
 from options.enums import OptionExerciseType, TradeSide, OptionClass
+from options.models.numerics import norm_cdf
 from datetime import date
-from typing import List
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+SCREEN_SORT_KEYS = ['return_on_risk', 'max_profit', 'probability_of_profit', 'expected_profit']
 
 class VerticalSpread:
 
@@ -36,14 +44,14 @@ class VerticalSpread:
             low_strike_option = CallOption(
             underlying=self.underlying,
             strike = self.low_strike,
-            exercise_type=self.exercise_type,
+            exercise_type=self.option_exercise_type,
             expiry_date=self.expiry
             )
 
             high_strike_option = CallOption(
                 underlying=self.underlying,
-                strike=self.low_strike,
-                exercise_type=self.exercise_type,
+                strike=self.high_strike,
+                exercise_type=self.option_exercise_type,
                 expiry_date=self.expiry
             )
 
@@ -51,14 +59,14 @@ class VerticalSpread:
             low_strike_option = PutOption(
                 underlying=self.underlying,
                 strike = self.low_strike,
-                exercise_type=self.exercise_type,
+                exercise_type=self.option_exercise_type,
                 expiry_date=self.expiry
                 )
 
             high_strike_option = PutOption(
                 underlying=self.underlying,
-                strike=self.low_strike,
-                exercise_type=self.exercise_type,
+                strike=self.high_strike,
+                exercise_type=self.option_exercise_type,
                 expiry_date=self.expiry
             )
 
@@ -84,6 +92,11 @@ class VerticalSpread:
 
         return [low_strike_position, high_strike_position]
 
+    def save(self, path: str) -> None:
+        """Saves both legs of the spread, see OptionChain.save"""
+
+        OptionChain.from_book(self).save(path)
+
 class LongCallVerticalSpread(VerticalSpread):
 
     def __init__(self, underlying: str, expiry: date, low_strike: float, high_strike: float, low_strike_cost: float = 0, high_strike_cost: float = 0, low_strike_transaction_cost: float = 0, high_strike_transaction_cost: float = 0, option_exercise_type: OptionExerciseType = OptionExerciseType.EUROPEAN, quantity: int = 1) -> None:
@@ -105,4 +118,151 @@ class ShortCallVerticalSpread(VerticalSpread):
 class ShortPutVerticalSpread(VerticalSpread):
 
     def __init__(self, underlying: str, expiry: date, low_strike: float, high_strike: float, low_strike_cost: float = 0, high_strike_cost: float = 0, low_strike_transaction_cost: float = 0, high_strike_transaction_cost: float = 0, option_exercise_type: OptionExerciseType = OptionExerciseType.EUROPEAN, quantity: int = 1) -> None:
-        super().__init__(underlying, expiry, low_strike, high_strike, TradeSide.SHORT, TradeSide.LONG, OptionClass.PUT, low_strike_cost, high_strike_cost, low_strike_transaction_cost, high_strike_transaction_cost, option_exercise_type, quantity)
\ No newline at end of file
+        super().__init__(underlying, expiry, low_strike, high_strike, TradeSide.SHORT, TradeSide.LONG, OptionClass.PUT, low_strike_cost, high_strike_cost, low_strike_transaction_cost, high_strike_transaction_cost, option_exercise_type, quantity)
+
+class VerticalScreenResult(NamedTuple):
+    """Top ranked vertical spreads as parallel arrays, best first. Indices point into the quote arrays given to the screener.
+    net_cost is positive for a debit and negative for a credit, and max_loss is negative for a loss.
+    """
+
+    low_index: np.ndarray
+    high_index: np.ndarray
+    low_strike: np.ndarray
+    high_strike: np.ndarray
+    net_cost: np.ndarray
+    max_profit: np.ndarray
+    max_loss: np.ndarray
+    breakeven: np.ndarray
+    probability_of_profit: np.ndarray
+    return_on_risk: np.ndarray
+    expected_profit: np.ndarray
+    greeks: Dict[str, np.ndarray]
+
+def _strike_pairs(strikes: np.ndarray, expiry_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices of every (low strike, high strike) pair of quotes sharing an expiry"""
+
+    order = np.lexsort((strikes, expiry_ids))
+    group_starts = np.flatnonzero(np.concatenate([[True], np.diff(expiry_ids[order]) != 0, [True]]))
+
+    lows, highs = [], []
+    for start, end in zip(group_starts[:-1], group_starts[1:]):
+        low, high = np.triu_indices(end - start, k=1)
+        lows.append(order[start + low])
+        highs.append(order[start + high])
+
+    low = np.concatenate(lows)
+    high = np.concatenate(highs)
+
+    # Quotes repeating a strike do not form a spread
+    distinct = strikes[low] < strikes[high]
+    return low[distinct], high[distinct]
+
+def screen_vertical_spreads(strikes: np.ndarray, bids: np.ndarray, asks: np.ndarray, S: ArrayLike, sigma: ArrayLike, r: float, T: ArrayLike,
+                            option_class: OptionClass, low_strike_side: TradeSide, q: float = 0, expiry_ids: np.ndarray = None,
+                            greeks: Dict[str, np.ndarray] = None, top_k: int = 10, sort_by: str = 'return_on_risk',
+                            min_probability_of_profit: float = 0, max_width: float = np.inf) -> VerticalScreenResult:
+    """Scores every vertical spread in a chain at once and returns the best top_k, without building any spread objects.
+    Every pair of quotes with the same expiry and different strikes is entered at the touch: legs bought pay the ask and
+    legs sold receive the bid.
+
+    The probability of profit is the risk neutral probability of finishing beyond the break-even, with the vol of each
+    pair read off the sigma smile at its break-even. The expected profit is the probability weighted average of the
+    max profit and max loss, a quick ranking score rather than a valuation.
+
+    Args:
+        strikes (np.ndarray): Strike of every quote
+        bids (np.ndarray): Bid of every quote
+        asks (np.ndarray): Ask of every quote
+        S (ArrayLike): Underlying price, or one per quote
+        sigma (ArrayLike): Implied vol, or one per quote to interpolate across strikes of the same expiry
+        r (float): Risk free rate
+        T (ArrayLike): Time to expiry, or one per quote
+        option_class (OptionClass): Whether the quotes are calls or puts
+        low_strike_side (TradeSide): Side of the low strike leg, the high strike leg takes the other side as in VerticalSpread
+        q (float, optional): Dividend yield. Defaults to 0.
+        expiry_ids (np.ndarray, optional): Expiry label of every quote, spreads only pair quotes of one expiry. Defaults to
+            None, which treats every quote as the same expiry.
+        greeks (Dict[str, np.ndarray], optional): Per quote greeks, e.g. {'delta': ..., 'vega': ...}, netted over both legs
+            of the selected spreads. Defaults to None.
+        top_k (int, optional): Number of spreads to return. Defaults to 10.
+        sort_by (str, optional): One of SCREEN_SORT_KEYS. Defaults to 'return_on_risk'.
+        min_probability_of_profit (float, optional): Drop spreads less likely than this to profit. Defaults to 0.
+        max_width (float, optional): Drop spreads whose strikes are further apart than this. Defaults to np.inf.
+
+    Returns:
+        VerticalScreenResult: The top_k spreads, best first
+    """
+
+    assert sort_by in SCREEN_SORT_KEYS, f"The sort key must be one of {', '.join(SCREEN_SORT_KEYS)}"
+    assert top_k >= 1, "The screener has to return at least one spread"
+
+    strikes = np.asarray(strikes, dtype=float)
+    bids = np.asarray(bids, dtype=float)
+    asks = np.asarray(asks, dtype=float)
+    S, sigma, T = (np.broadcast_to(np.asarray(x, dtype=float), strikes.shape) for x in (S, sigma, T))
+    # Expiries may be dates or labels, only equality between them matters
+    expiry_ids = np.zeros(len(strikes), dtype=np.int64) if expiry_ids is None else np.unique(expiry_ids, return_inverse=True)[1].ravel()
+
+    low, high = _strike_pairs(strikes, expiry_ids)
+    low_strike, high_strike = strikes[low], strikes[high]
+    width = high_strike - low_strike
+
+    # Long legs pay the ask and short legs receive the bid
+    side = low_strike_side.value
+    if side == TradeSide.LONG.value:
+        net_cost = asks[low] - bids[high]
+    else:
+        net_cost = asks[high] - bids[low]
+
+    # The expiry payoff runs linearly between the strikes, rising for a long low strike and falling for a short one
+    is_call = option_class == OptionClass.CALL
+    top_payoff = width if is_call == (side == TradeSide.LONG.value) else np.zeros_like(width)
+    max_profit = top_payoff - net_cost
+    max_loss = top_payoff - width - net_cost
+
+    payoff_at_low_strike = top_payoff - width if side == TradeSide.LONG.value else top_payoff
+    breakeven = low_strike + (net_cost - payoff_at_low_strike) / side
+
+    # Vol at the break-even from the smile of the low strike's expiry, interpolated between the two legs
+    weight = np.clip((breakeven - low_strike) / width, 0, 1)
+    breakeven_sigma = sigma[low] + weight * (sigma[high] - sigma[low])
+
+    S_pair, T_pair = S[low], T[low]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_two = (np.log(S_pair / breakeven) + (r - q - 0.5 * breakeven_sigma**2) * T_pair) / (breakeven_sigma * np.sqrt(T_pair))
+        probability_of_profit = norm_cdf(side * d_two)
+        return_on_risk = max_profit / -max_loss
+
+    expected_profit = probability_of_profit * max_profit + (1 - probability_of_profit) * max_loss
+
+    # Pairs that cannot both make and lose money are mispriced quotes or cannot profit at all
+    valid = (max_profit > 0) & (max_loss < 0) & (width <= max_width) & (probability_of_profit >= min_probability_of_profit)
+    scores = {
+        'return_on_risk': return_on_risk,
+        'max_profit': max_profit,
+        'probability_of_profit': probability_of_profit,
+        'expected_profit': expected_profit,
+    }[sort_by]
+    scores = np.where(valid, scores, -np.inf)
+
+    k = min(top_k, int(np.count_nonzero(valid)))
+    best = np.argpartition(-scores, k - 1)[:k] if k > 0 else np.array([], dtype=np.int64)
+    best = best[np.argsort(-scores[best], kind='stable')]
+
+    low_best, high_best = low[best], high[best]
+    net_greeks = {name: side * (np.asarray(values, dtype=float)[low_best] - np.asarray(values, dtype=float)[high_best]) for name, values in (greeks or {}).items()}
+
+    return VerticalScreenResult(
+        low_index=low_best,
+        high_index=high_best,
+        low_strike=low_strike[best],
+        high_strike=high_strike[best],
+        net_cost=net_cost[best],
+        max_profit=max_profit[best],
+        max_loss=max_loss[best],
+        breakeven=breakeven[best],
+        probability_of_profit=probability_of_profit[best],
+        return_on_risk=return_on_risk[best],
+        expected_profit=expected_profit[best],
+        greeks=net_greeks
+    )
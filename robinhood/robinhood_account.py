@@ -1,27 +1,350 @@
 import os 
+import time
+import threading
+import warnings
+import numpy as np 
 import pandas as pd 
 import robin_stocks 
 import robin_stocks.robinhood as rs
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from dotenv import load_dotenv
+from typing import Dict, List
 
-class RobinHoodAccount: 
+class EmptyResponseError(Exception): 
+    """Raised when the broker answers a request without any data. robin_stocks logs HTTP errors and returns None, or a
+    list of None for endpoints returning lists, instead of raising.
+    """
 
-    def __init__(self, username: str, password: str) -> None:
-        self.username = username
-        self.password = password
+def require_data(data, request_name: str, key): 
+    """Returns the response of a broker request, raising EmptyResponseError if it is None or a list holding None"""
+
+    if data is None or (isinstance(data, list) and (len(data) == 0 or any(item is None for item in data))): 
+        raise EmptyResponseError(f"{request_name} returned no data for {key}")
 
+    return data
+
+class RobinStocksTransport: 
+    """Every call the account makes to the broker goes through a transport, so tests can swap in a local fake with the
+    same methods instead of hitting Robinhood.
+    """
+
+    def login(self, username: str, password: str) -> None: 
         rs.login(
             username=username, 
             password=password
         )
 
-        self.account_information = rs.build_user_profile() 
-        self.holdings = rs.build_holdings()
+    def build_user_profile(self) -> Dict: 
+        return rs.build_user_profile()
+
+    def build_holdings(self) -> Dict: 
+        return rs.build_holdings()
+
+    def get_open_option_positions(self) -> List[Dict]: 
+        return rs.get_open_option_positions()
+
+    def get_option_market_data_by_id(self, option_id: str) -> List[Dict]: 
+        return require_data(rs.get_option_market_data_by_id(id = option_id), 'get_option_market_data_by_id', option_id)
+
+    def get_option_instrument_data_by_id(self, option_id: str) -> Dict: 
+        return require_data(rs.get_option_instrument_data_by_id(id = option_id), 'get_option_instrument_data_by_id', option_id)
+
+    def get_latest_price(self, symbols: List[str]) -> List[str]: 
+        return rs.get_latest_price(symbols)
+
+class RateLimiter: 
+    """Thread safe limiter spacing requests at least 1 / requests_per_second seconds apart"""
+
+    def __init__(self, requests_per_second: float) -> None:
+        assert requests_per_second > 0, "The request rate has to be positive"
+
+        self.interval = 1 / requests_per_second
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None: 
+        with self._lock: 
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        if slot > now: 
+            time.sleep(slot - now)
+
+def fetch_concurrently(request, keys: List, max_workers: int = 8, max_retries: int = 3, backoff: float = 0.5, 
+                       requests_per_second: float = None, return_exceptions: bool = False) -> List: 
+    """Calls request once per key over a bounded thread pool, so the total time is bounded by the slowest request rather
+    than the sum of all of them. Failed requests are retried with exponential backoff.
+
+    Args:
+        request: Function of one key making a single broker request
+        keys (List): Arguments to call request with
+        max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+        max_retries (int, optional): Retries per key before giving up. Defaults to 3.
+        backoff (float, optional): Seconds to wait before the first retry, doubling on every retry. Defaults to 0.5.
+        requests_per_second (float, optional): Rate limit across all workers, None for no limit. Defaults to None.
+        return_exceptions (bool, optional): Whether a key still failing after its retries gets its exception in place of
+            a result instead of raising it and losing the rest of the batch. Defaults to False.
+
+    Returns:
+        List: Result of every request, in the order of keys
+    """
+
+    rate_limiter = RateLimiter(requests_per_second) if requests_per_second else None
+
+    def fetch(key): 
+        for attempt in range(max_retries + 1): 
+            if rate_limiter is not None: 
+                rate_limiter.wait()
+            try: 
+                return request(key)
+            except Exception as error: 
+                if attempt == max_retries: 
+                    if return_exceptions: 
+                        return error
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor: 
+        return list(executor.map(fetch, keys))
+
+def fetch_option_market_data(transport, option_ids: List[str], max_workers: int = 8, max_retries: int = 3, backoff: float = 0.5, 
+                             requests_per_second: float = None) -> List[Dict]: 
+    """Fetches the market data of many options concurrently, see fetch_concurrently. An empty response counts as a failed
+    request and is retried. Options whose data still can not be fetched are left out of the result with a warning naming
+    them, rather than failing the whole batch.
+
+    Args:
+        transport: Object exposing get_option_market_data_by_id, such as RobinStocksTransport
+        option_ids (List[str]): Ids of the options to fetch
+        max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+        max_retries (int, optional): Retries per option before giving up. Defaults to 3.
+        backoff (float, optional): Seconds to wait before the first retry, doubling on every retry. Defaults to 0.5.
+        requests_per_second (float, optional): Rate limit across all workers, None for no limit. Defaults to None.
+
+    Returns:
+        List[Dict]: Market data records of every option fetched, in the order of option_ids
+    """
+
+    request = lambda option_id: require_data(transport.get_option_market_data_by_id(option_id), 'get_option_market_data_by_id', option_id)
+    results = fetch_concurrently(
+        request = request, 
+        keys = option_ids, 
+        max_workers = max_workers, 
+        max_retries = max_retries, 
+        backoff = backoff, 
+        requests_per_second = requests_per_second, 
+        return_exceptions = True
+    )
+
+    option_market_data = []
+    failures = {}
+    for option_id, data in zip(option_ids, results): 
+        if isinstance(data, Exception): 
+            failures[option_id] = data
+        else: 
+            option_market_data.extend(data)
+
+    if failures: 
+        details = ', '.join(f'{option_id} ({error})' for option_id, error in failures.items())
+        warnings.warn(f"Could not fetch the market data of {len(failures)} of {len(option_ids)} options: {details}")
+
+    return option_market_data
+
+def fetch_latest_prices(transport, symbols: List[str], max_workers: int = 8, max_retries: int = 3, backoff: float = 0.5, 
+                        requests_per_second: float = None) -> Dict[str, float]: 
+    """Fetches the latest price of many underlyings concurrently, see fetch_concurrently. The broker returns None for a
+    symbol it can not quote, which counts as a failed request and is retried. Symbols whose price still can not be fetched
+    are left out of the result with a warning naming them.
+
+    Args:
+        transport: Object exposing get_latest_price, such as RobinStocksTransport
+        symbols (List[str]): Ticker symbols of the underlyings
+        max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+        max_retries (int, optional): Retries per symbol before giving up. Defaults to 3.
+        backoff (float, optional): Seconds to wait before the first retry, doubling on every retry. Defaults to 0.5.
+        requests_per_second (float, optional): Rate limit across all workers, None for no limit. Defaults to None.
+
+    Returns:
+        Dict[str, float]: Latest price of every symbol fetched
+    """
+
+    request = lambda symbol: float(require_data(transport.get_latest_price([symbol]), 'get_latest_price', symbol)[0])
+    results = fetch_concurrently(
+        request = request, 
+        keys = symbols, 
+        max_workers = max_workers, 
+        max_retries = max_retries, 
+        backoff = backoff, 
+        requests_per_second = requests_per_second, 
+        return_exceptions = True
+    )
+
+    latest_prices = {}
+    failures = {}
+    for symbol, price in zip(symbols, results): 
+        if isinstance(price, Exception): 
+            failures[symbol] = price
+        else: 
+            latest_prices[symbol] = price
+
+    if failures: 
+        details = ', '.join(f'{symbol} ({error})' for symbol, error in failures.items())
+        warnings.warn(f"Could not fetch the latest price of {len(failures)} of {len(symbols)} underlyings: {details}")
+
+    return latest_prices
+
+SNAPSHOT_POSITION_COLUMNS = ['chain_symbol', 'type', 'quantity', 'trade_value_multiplier', 'average_price', 'position_fetched_at']
+SNAPSHOT_INSTRUMENT_COLUMNS = ['strike_price', 'expiration_date', 'option_type']
+SNAPSHOT_MARKET_COLUMNS = ['adjusted_mark_price', 'implied_volatility', 'underlying_price', 'market_fetched_at']
+
+class PortfolioSnapshot: 
+    """Local copy of the option legs of the portfolio with the marks, implied vols and underlying prices last fetched for
+    them. Legs older than ttl_seconds are stale and get refetched, fresh legs are served from the file.
+
+    The format follows the file extension: .parquet and .feather are written through pandas and need pyarrow, anything
+    else is a pickle.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 300) -> None:
+        assert ttl_seconds >= 0, "The time to live can not be negative"
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+    def load(self) -> pd.DataFrame: 
+        """Legs indexed by option id, or None if no snapshot has been saved yet"""
+
+        if not os.path.exists(self.path): 
+            return None
+
+        if self.path.endswith('.parquet'): 
+            return pd.read_parquet(self.path)
+        if self.path.endswith('.feather'): 
+            return pd.read_feather(self.path).set_index('option_id')
+
+        return pd.read_pickle(self.path)
+
+    def save(self, legs: pd.DataFrame) -> None: 
+
+        if self.path.endswith('.parquet'): 
+            legs.to_parquet(self.path)
+        elif self.path.endswith('.feather'): 
+            legs.reset_index().to_feather(self.path)
+        else: 
+            legs.to_pickle(self.path)
+
+    def is_stale(self, fetched_at: pd.Series, now: float) -> pd.Series: 
+        """Whether each timestamp is missing or older than the time to live"""
+
+        return fetched_at.isna() | (now - fetched_at > self.ttl_seconds)
+
+def add_position_greeks(options_portfolio_df: pd.DataFrame) -> pd.DataFrame: 
+    """Scales the per contract greeks of every leg by its quantity, contract multiplier and side"""
+
+    options_portfolio_df['position_side'] = options_portfolio_df['type'].apply(lambda x: 1 if x == 'long' else -1)
+    options_portfolio_df['quantity'] = options_portfolio_df['quantity'].astype(float)
+    options_portfolio_df['trade_value_multiplier'] = options_portfolio_df['trade_value_multiplier'].astype(float)
+
+    scale = options_portfolio_df['quantity'] * options_portfolio_df['trade_value_multiplier'] * options_portfolio_df['position_side']
+    for greek in ['delta', 'gamma', 'theta', 'rho', 'vega']: 
+        options_portfolio_df[f'position_{greek}'] = options_portfolio_df[greek] * scale
+
+    return options_portfolio_df
+
+def local_option_greeks(legs: pd.DataFrame, r: float, q: float = 0, start_date: date = None) -> pd.DataFrame: 
+    """Recomputes the greeks of snapshot legs with the batched Black-Scholes engine of the options package, from the cached
+    underlying prices and implied vols. Theta is per trading day and vega and rho per vol or rate point, the conventions of
+    the broker supplied greeks, so the two reports line up.
+
+    Args:
+        legs (pd.DataFrame): Legs of a PortfolioSnapshot
+        r (float): Risk free rate
+        q (float, optional): Dividend yield. Defaults to 0.
+        start_date (date, optional): Date to measure the time to expiry from. Defaults to None, which uses today.
+
+    Returns:
+        pd.DataFrame: The legs with model_price, delta, gamma, theta, rho and vega columns and their position level greeks
+    """
+
+    # Imported here so the broker report above still runs as a standalone script without the options package installed
+    from options.constants import NUMBER_OF_TRADING_DAYS
+    from options.funcs import time_to_expiry_vectorized
+    from options.models.batch import black_scholes_batch
+
+    start_date = date.today() if start_date is None else start_date
+    T = time_to_expiry_vectorized(legs['expiration_date'].to_numpy(dtype=str), start_date)
+
+    # Legs expiring today still have part of a session left
+    T = np.maximum(T, 0.5 / NUMBER_OF_TRADING_DAYS)
 
-    def get_options_portfolio(self) -> pd.DataFrame: 
+    batch = black_scholes_batch(
+        S = legs['underlying_price'].to_numpy(dtype=float), 
+        K = legs['strike_price'].to_numpy(dtype=float), 
+        sigma = legs['implied_volatility'].to_numpy(dtype=float), 
+        r = r, 
+        T = T, 
+        q = q, 
+        is_call = (legs['option_type'] == 'call').to_numpy()
+    )
 
-        option_positions = rs.get_open_option_positions()
+    options_portfolio_df = legs.copy()
+    options_portfolio_df['model_price'] = batch.price
+    options_portfolio_df['delta'] = batch.delta
+    options_portfolio_df['gamma'] = batch.gamma
+    options_portfolio_df['theta'] = batch.theta / NUMBER_OF_TRADING_DAYS
+    options_portfolio_df['rho'] = batch.rho / 100
+    options_portfolio_df['vega'] = batch.vega / 100
+
+    return add_position_greeks(options_portfolio_df)
+
+def greeks_report(options_portfolio_df: pd.DataFrame) -> pd.DataFrame: 
+    return options_portfolio_df.groupby('chain_symbol')[['position_delta', 'position_gamma', 'position_theta', 'position_vega']].sum().round(2)
+
+class RobinHoodAccount: 
+
+    def __init__(self, username: str, password: str, transport = None, lazy_login: bool = False) -> None:
+        """
+        Args:
+            username (str): Robinhood username
+            password (str): Robinhood password
+            transport (optional): Broker transport, defaults to RobinStocksTransport. Defaults to None.
+            lazy_login (bool, optional): Whether to postpone logging in until the first request to the broker, so reports
+                served entirely from a local snapshot never log in. Defaults to False.
+        """
+
+        self.username = username
+        self.password = password
+        self.transport = transport if transport is not None else RobinStocksTransport()
+
+        self.logged_in = False
+        self.account_information = None
+        self.holdings = None
+
+        if not lazy_login: 
+            self.login()
+
+    def login(self) -> None: 
+
+        if self.logged_in: 
+            return
+
+        self.transport.login(
+            username=self.username, 
+            password=self.password
+        )
+        self.logged_in = True
+
+        self.account_information = self.transport.build_user_profile() 
+        self.holdings = self.transport.build_holdings()
+
+    def get_options_portfolio(self, max_workers: int = 8, requests_per_second: float = None) -> pd.DataFrame: 
+
+        self.login()
+
+        option_positions = self.transport.get_open_option_positions()
         option_position_df = pd.DataFrame.from_records(option_positions)
         option_position_df.set_index('option_id', inplace=True)
 
@@ -29,48 +352,166 @@ class RobinHoodAccount:
         condensed_options_data = option_position_df[cols]
 
         # Getting the market data on each of the options in our portfolio
-        option_market_data = [] 
-        for option_id in condensed_options_data.index: 
-            data = rs.get_option_market_data_by_id(
-                id = option_id
-            )
-
-            option_market_data = option_market_data + data
+        option_market_data = fetch_option_market_data(
+            transport = self.transport, 
+            option_ids = list(condensed_options_data.index), 
+            max_workers = max_workers, 
+            requests_per_second = requests_per_second
+        )
 
-        option_market_data_df = pd.DataFrame.from_records(option_market_data).set_index('instrument_id')
         option_data_cols = ['adjusted_mark_price', 'break_even_price', 'volume', 'delta', 'gamma', 'implied_volatility', 'rho', 'theta', 'vega']
+        option_market_data_df = pd.DataFrame.from_records(option_market_data, columns=['instrument_id'] + option_data_cols).set_index('instrument_id')
         portfolio_option_market_data = option_market_data_df[option_data_cols]
 
         # Changing the values to float
         portfolio_option_market_data = portfolio_option_market_data.astype(float)
         options_portfolio_df = condensed_options_data.merge(portfolio_option_market_data, left_index = True, right_index = True)
 
-        options_portfolio_df['position_side'] = options_portfolio_df['type'].apply(lambda x: 1 if x == 'long' else -1)
-        options_portfolio_df['quantity'] = options_portfolio_df['quantity'].astype(float)
-        options_portfolio_df['trade_value_multiplier'] = options_portfolio_df['trade_value_multiplier'].astype(float)
+        return add_position_greeks(options_portfolio_df)
+
+    def get_options_portfolio_greeks(self, max_workers: int = 8, requests_per_second: float = None) -> pd.DataFrame: 
+
+        options_portfolio_df = self.get_options_portfolio(max_workers=max_workers, requests_per_second=requests_per_second) 
+        return greeks_report(options_portfolio_df)
+
+    def refresh_snapshot(self, snapshot: PortfolioSnapshot, max_workers: int = 8, requests_per_second: float = None) -> pd.DataFrame: 
+        """Brings a portfolio snapshot up to date and returns its legs. The position list is refetched once it is older than
+        the time to live, contract terms only for legs not seen before since they never change, and marks, implied vols
+        and underlying prices only for the legs that went stale. Nothing is requested while the whole snapshot is fresh.
+
+        Args:
+            snapshot (PortfolioSnapshot): Snapshot to refresh, saved back to its file if anything was refetched
+            max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+            requests_per_second (float, optional): Rate limit across all workers, None for no limit. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Legs indexed by option id
+        """
+
+        now = time.time()
+        legs = snapshot.load()
+        refetched = False
 
-        options_portfolio_df['position_delta'] = options_portfolio_df['delta'] * options_portfolio_df['quantity'] * options_portfolio_df['trade_value_multiplier'] * options_portfolio_df['position_side']
-        options_portfolio_df['position_gamma'] = options_portfolio_df['gamma'] * options_portfolio_df['quantity'] * options_portfolio_df['trade_value_multiplier'] * options_portfolio_df['position_side']
-        options_portfolio_df['position_theta'] = options_portfolio_df['theta'] * options_portfolio_df['quantity'] * options_portfolio_df['trade_value_multiplier'] * options_portfolio_df['position_side']
-        options_portfolio_df['position_rho'] = options_portfolio_df['rho'] * options_portfolio_df['quantity'] * options_portfolio_df['trade_value_multiplier'] * options_portfolio_df['position_side']
-        options_portfolio_df['position_vega'] = options_portfolio_df['vega'] * options_portfolio_df['quantity'] * options_portfolio_df['trade_value_multiplier'] * options_portfolio_df['position_side']
-        
-        return options_portfolio_df
+        if legs is None or legs.empty or snapshot.is_stale(legs['position_fetched_at'], now).any(): 
+            self.login()
 
-    def get_options_portfolio_greeks(self) -> pd.DataFrame: 
+            position_cols = ['option_id'] + SNAPSHOT_POSITION_COLUMNS[:-1]
+            positions = pd.DataFrame.from_records(self.transport.get_open_option_positions(), columns=position_cols).set_index('option_id')
+            positions[['quantity', 'trade_value_multiplier', 'average_price']] = positions[['quantity', 'trade_value_multiplier', 'average_price']].astype(float)
+            positions['position_fetched_at'] = now
 
-        options_portfolio_df = self.get_options_portfolio() 
+            # Legs still open keep their cached contract terms and market data, closed legs drop out
+            if legs is None: 
+                legs = positions.reindex(columns=SNAPSHOT_POSITION_COLUMNS + SNAPSHOT_INSTRUMENT_COLUMNS + SNAPSHOT_MARKET_COLUMNS)
+            else: 
+                legs = positions.join(legs.drop(columns=SNAPSHOT_POSITION_COLUMNS))
+
+            refetched = True
+
+        instruments = legs[SNAPSHOT_INSTRUMENT_COLUMNS].dropna()
+        new_legs = legs.index.difference(instruments.index)
+        if len(new_legs): 
+            self.login()
+
+            instrument_data = fetch_concurrently(
+                request = self.transport.get_option_instrument_data_by_id, 
+                keys = list(new_legs), 
+                max_workers = max_workers, 
+                requests_per_second = requests_per_second
+            )
+            fetched = pd.DataFrame({
+                'strike_price': [float(data['strike_price']) for data in instrument_data], 
+                'expiration_date': [data['expiration_date'] for data in instrument_data], 
+                'option_type': [data['type'] for data in instrument_data]
+            }, index = new_legs)
+
+            instruments = fetched if instruments.empty else pd.concat([instruments, fetched])
+            legs = legs.drop(columns=SNAPSHOT_INSTRUMENT_COLUMNS).join(instruments)
+            refetched = True
+
+        stale_legs = legs.index[snapshot.is_stale(legs['market_fetched_at'], now)]
+        if len(stale_legs): 
+            self.login()
+
+            option_market_data = fetch_option_market_data(
+                transport = self.transport, 
+                option_ids = list(stale_legs), 
+                max_workers = max_workers, 
+                requests_per_second = requests_per_second
+            )
+            market_cols = ['instrument_id', 'adjusted_mark_price', 'implied_volatility']
+            market = pd.DataFrame.from_records(option_market_data, columns=market_cols).set_index('instrument_id').astype(float)
+            market = market[market.index.isin(stale_legs)]
+
+            # Legs the broker sent nothing back for keep their cached market data and timestamp, so they are retried on the
+            # next refresh
+            missing_legs = stale_legs.difference(market.index)
+            if len(missing_legs): 
+                warnings.warn(f"No market data for {len(missing_legs)} legs, keeping their cached data: {', '.join(missing_legs)}")
+
+            # Underlyings the broker can not quote keep their cached price
+            latest_prices = fetch_latest_prices(
+                transport = self.transport, 
+                symbols = list(legs.loc[stale_legs, 'chain_symbol'].unique()), 
+                max_workers = max_workers, 
+                requests_per_second = requests_per_second
+            )
+            market['underlying_price'] = market.index.map(legs['chain_symbol']).map(latest_prices)
+            market['underlying_price'] = market['underlying_price'].fillna(legs['underlying_price'])
+            market['market_fetched_at'] = now
 
-        greeks_report = options_portfolio_df.groupby('chain_symbol').sum()[['position_delta', 'position_gamma', 'position_theta', 'position_vega']].round(2)
-        return greeks_report
+            fresh = legs.loc[legs.index.difference(market.index), SNAPSHOT_MARKET_COLUMNS]
+            market = market if fresh.empty else pd.concat([fresh, market])
+            legs = legs.drop(columns=SNAPSHOT_MARKET_COLUMNS).join(market)
+
+            # Fresh legs on the same underlyings pick up the newer underlying price too
+            refreshed_symbols = legs['chain_symbol'].isin(list(latest_prices))
+            legs.loc[refreshed_symbols, 'underlying_price'] = legs.loc[refreshed_symbols, 'chain_symbol'].map(latest_prices)
+            refetched = True
+
+        if refetched: 
+            snapshot.save(legs)
+
+        return legs
+
+    def get_local_options_portfolio(self, snapshot_path: str = 'options_snapshot.pkl', ttl_seconds: float = 300, r: float = 0.05, 
+                                    q: float = 0, max_workers: int = 8, requests_per_second: float = None) -> pd.DataFrame: 
+        """Options portfolio with greeks recomputed locally from a snapshot of the portfolio instead of taken from the broker.
+        Repeated calls within the time to live are served from the snapshot file without any request.
+
+        Args:
+            snapshot_path (str, optional): File holding the snapshot. Defaults to 'options_snapshot.pkl'.
+            ttl_seconds (float, optional): Age in seconds after which cached data is refetched. Defaults to 300.
+            r (float, optional): Risk free rate. Defaults to 0.05.
+            q (float, optional): Dividend yield. Defaults to 0.
+            max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+            requests_per_second (float, optional): Rate limit across all workers, None for no limit. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Legs with their model greeks and position level greeks
+        """
+
+        snapshot = PortfolioSnapshot(path=snapshot_path, ttl_seconds=ttl_seconds)
+        legs = self.refresh_snapshot(snapshot, max_workers=max_workers, requests_per_second=requests_per_second)
+
+        return local_option_greeks(legs, r=r, q=q)
+
+    def get_local_options_portfolio_greeks(self, snapshot_path: str = 'options_snapshot.pkl', ttl_seconds: float = 300, r: float = 0.05, 
+                                           q: float = 0, max_workers: int = 8, requests_per_second: float = None) -> pd.DataFrame: 
+
+        options_portfolio_df = self.get_local_options_portfolio(
+            snapshot_path=snapshot_path, ttl_seconds=ttl_seconds, r=r, q=q, max_workers=max_workers, requests_per_second=requests_per_second
+        )
+        return greeks_report(options_portfolio_df)
     
     @classmethod 
-    def from_dotenv_file(cls, dotenv_path: str = None): 
+    def from_dotenv_file(cls, dotenv_path: str = None, lazy_login: bool = False): 
         """Class method for instantiating your robinhood account object from a dotenv file path
 
         Args:
             dotenv_path (str, optional): Path to your dotenv file. If you do not supply a path, the default path of None is used. This looks for a .env file 
             in your home directory. Defaults to None.
+            lazy_login (bool, optional): Whether to postpone logging in until the first request to the broker. Defaults to False.
 
         Returns:
             _type_: _description_
@@ -80,7 +521,7 @@ class RobinHoodAccount:
 
         username = os.environ['ROBINHOOD_USERNAME']
         password = os.environ['ROBINHOOD_PASSWORD']
-        return cls(username, password)
+        return cls(username, password, lazy_login=lazy_login)
 
 
 if __name__ == "__main__": 